@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+from engine.frames import FrameRenderer
+from engine.features import analyze
+from engine import registry
+
+# --- CONFIG ---
+SR = 44100
+FPS = 30
+FRAMES = 90
+STRENGTHS = [0.0, 0.5, 1.0]
+THRESHOLD = 0.15  # 15% trager dan de baseline = regressie
+
+
+def synth_audio(kind, seconds, sr=SR):
+    # Synthetische testsignalen, zonder audiobestanden
+    n = int(seconds * sr)
+    t = np.arange(n, dtype=np.float32) / sr
+    if kind == "silence":
+        return np.zeros(n, dtype=np.float32)
+    if kind == "sine":
+        return (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    if kind == "noise":
+        rng = np.random.default_rng(0)
+        return (0.3 * rng.standard_normal(n)).clip(-1, 1).astype(np.float32)
+    if kind == "drums":
+        # Kick op elke tel, hihat op de achtsten, 120 bpm
+        y = np.zeros(n, dtype=np.float32)
+        beat = int(sr * 0.5)
+        kick_t = np.arange(int(sr * 0.15)) / sr
+        kick = np.sin(2 * np.pi * (50 + 100 * np.exp(-kick_t * 30)) * kick_t) * np.exp(-kick_t * 20)
+        rng = np.random.default_rng(1)
+        hat = rng.standard_normal(int(sr * 0.03)) * np.exp(-np.arange(int(sr * 0.03)) / (sr * 0.005)) * 0.3
+        for start in range(0, n, beat):
+            k = kick[:n - start]
+            y[start:start + len(k)] += k
+            h_start = start + beat // 2
+            if h_start < n:
+                h = hat[:n - h_start]
+                y[h_start:h_start + len(h)] += h
+        return y.clip(-1, 1)
+    raise ValueError(f"Onbekend signaal: {kind}")
+
+SIGNALS = ["silence", "sine", "noise", "drums"]
+
+
+def discover_effects():
+    return registry.available_effects()
+
+
+def encoder_cmd(width, height, fps):
+    # Encodeert naar de null-muxer: meet de encode-kosten zonder bestand te schrijven
+    return [
+        "ffmpeg", "-v", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgba",
+        "-s", f"{width}x{height}", "-framerate", str(fps), "-i", "-",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-f", "null", "-"
+    ]
+
+
+def bench_case(effect, y, strength, frames, fps, backend, image=None, encode=True):
+    samples_per_frame = int(SR / fps)
+    features = analyze(y, SR, samples_per_frame, frames)
+    # Zonder dedupe: bij stilte en andere stabiele signalen zouden we anders cache-hits meten
+    renderer = FrameRenderer([effect], opacity=0.8, color="#FFFFFF", bg_color="#000000",
+                             strength=strength, image=image, backend=backend, dedupe=False)
+    width, height = renderer.size()
+    timings = {}
+    renderer.timings = timings
+    proc = None
+    if encode:
+        proc = subprocess.Popen(encoder_cmd(width, height, fps), stdin=subprocess.PIPE)
+
+    t_start = time.perf_counter()
+    for i in range(frames):
+        chunk = y[i * samples_per_frame:(i+1) * samples_per_frame]
+        frame = renderer.render(chunk, features.frame(i))
+        t0 = time.perf_counter()
+        data = frame.tobytes()
+        t1 = time.perf_counter()
+        timings["serialise"] = timings.get("serialise", 0.0) + t1 - t0
+        if proc is not None:
+            proc.stdin.write(data)
+            timings["encode"] = timings.get("encode", 0.0) + time.perf_counter() - t1
+    if proc is not None:
+        t0 = time.perf_counter()
+        proc.stdin.close()
+        proc.wait()
+        timings["encode"] = timings.get("encode", 0.0) + time.perf_counter() - t0
+    total = time.perf_counter() - t_start
+    renderer.close()
+    return {
+        "fps": frames / total if total > 0 else 0.0,
+        "seconds": total,
+        "stages_ms_per_frame": {k: 1000.0 * v / frames for k, v in sorted(timings.items())},
+    }
+
+
+def run_suite(effects, signals, strengths, frames, fps, backend, image=None, encode=True):
+    results = {}
+    for effect in effects:
+        for signal in signals:
+            y = synth_audio(signal, frames / fps + 1)
+            for strength in strengths:
+                key = f"{effect}/{signal}/{strength:.2f}"
+                try:
+                    results[key] = bench_case(effect, y, strength, frames, fps, backend, image, encode)
+                    print(f"{key:40s} {results[key]['fps']:8.1f} fps  {results[key]['stages_ms_per_frame']}", flush=True)
+                except Exception as e:
+                    results[key] = {"error": str(e)}
+                    print(f"{key:40s} ❌ {e}", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Regressie: fps meer dan `threshold` lager dan in de baseline
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        cur = results.get(key)
+        if not cur or "fps" not in cur or "fps" not in base or base["fps"] <= 0:
+            continue
+        change = (cur["fps"] - base["fps"]) / base["fps"]
+        if change < -threshold:
+            regressions.append((key, base["fps"], cur["fps"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark for all effects.")
+    parser.add_argument("--effects", nargs="*", default=None, help="Effect names (default: all in effects/)")
+    parser.add_argument("--signals", nargs="*", default=SIGNALS, choices=SIGNALS, help="Synthetic audio signals")
+    parser.add_argument("--strengths", nargs="*", type=float, default=STRENGTHS, help="Strength values")
+    parser.add_argument("--frames", type=int, default=FRAMES, help="Frames per case")
+    parser.add_argument("--fps", type=int, default=FPS, help="Frames per second of the synthetic render")
+    parser.add_argument("--backend", default="matplotlib", choices=["matplotlib", "raster"], help="Drawing backend")
+    parser.add_argument("--image", default=None, help="Image for photo-based effects (optional)")
+    parser.add_argument("--no-encode", action="store_true", help="Skip the ffmpeg encode stage")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed fps drop vs baseline (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    effects = args.effects or discover_effects()
+    results = run_suite(effects, args.signals, args.strengths, args.frames, args.fps,
+                        args.backend, args.image, encode=not args.no_encode)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {"frames": args.frames, "fps": args.fps, "backend": args.backend, "encode": not args.no_encode},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Resultaten opgeslagen: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, old, new, change in regressions:
+            print(f"⚠️ Regressie {key}: {old:.1f} -> {new:.1f} fps ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("✅ Geen regressies t.o.v. de baseline")
+
+if __name__ == "__main__":
+    main()
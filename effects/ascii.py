@@ -1,9 +1,10 @@
 import numpy as np
 
-def render(ax, chunk, opacity=1.0, color="#FFFFFF", strength=0.5):
+def render(ax, chunk, opacity=1.0, color="#FFFFFF", strength=0.5, detail=1.0):
     chars = " .:-=+*#%@"
-    num_cols = 28
-    num_rows = 14
+    # Minder cellen bij een lager detailniveau (draft)
+    num_cols = max(4, int(28 * detail))
+    num_rows = max(2, int(14 * detail))
     block = chunk[:num_cols * num_rows]
     if len(block) < num_cols * num_rows:
         block = np.pad(block, (0, num_cols * num_rows - len(block)))
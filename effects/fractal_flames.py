@@ -1,19 +1,34 @@
 import numpy as np
 from matplotlib.patches import Circle
 
-def render(ax, chunk, opacity=0.5, color="#FF6600", strength=0.5):
-    energy = np.mean(np.abs(chunk))
+def _circles(energy, opacity, strength, detail=1.0):
     np.random.seed(int(energy * 10000) % 100000)
-    # Laat aantal cirkels en grootte afhangen van strength
-    n_circles = int(20 + energy * (50 + 200 * strength))
+    # Laat aantal cirkels en grootte afhangen van strength (en detail: minder deeltjes in draft)
+    n_circles = int((20 + energy * (50 + 200 * strength)) * detail)
     for _ in range(n_circles):
         r = 0.01 + np.random.rand() * (0.07 + 0.15 * strength)
         x = np.random.normal(0, 0.5)
         y = np.sin(x * np.pi * 2 + energy * 5) * 0.5
         alpha = opacity * (0.2 + 0.8 * np.random.rand())
+        yield x, y, r, alpha
+
+def render(ax, chunk, opacity=0.5, color="#FF6600", strength=0.5, features=None, detail=1.0):
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
+    for x, y, r, alpha in _circles(energy, opacity, strength, detail):
         circle = Circle((x, y), r, color=color, alpha=alpha, linewidth=0)
         ax.add_patch(circle)
     ax.set_xlim(-1.2, 1.2)
     ax.set_ylim(-1.2, 1.2)
     ax.set_aspect('equal')
     ax.axis('off')
+
+def frame_key(chunk, params, features=None):
+    # Beeld hangt alleen af van de energie
+    return features.mean_abs if features is not None else np.mean(np.abs(chunk))
+
+def draw(canvas, chunk, params, features=None):
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
+    color = params.get("color", "#FF6600")
+    canvas.set_limits((-1.2, 1.2), (-1.2, 1.2), equal=True)
+    for x, y, r, alpha in _circles(energy, params.get("opacity", 0.5), params.get("strength", 0.5), params.get("detail", 1.0)):
+        canvas.circle(x, y, r, color, alpha=alpha)
@@ -1,10 +1,35 @@
 import numpy as np
 
-def render(ax, chunk, opacity=0.65, color="#FFFFFF", strength=0.5):
+def _curve(chunk, strength, features=None):
     t = np.linspace(0, 2 * np.pi, len(chunk))
     # Laat amplitude en lijndikte afhangen van strength
-    amp = np.clip(np.abs(chunk).mean() * (3 + 7 * strength), 0.5, 2.5 + 3 * strength)
-    lw = 2 + 4 * strength
+    energy = features.mean_abs if features is not None else np.abs(chunk).mean()
+    amp = np.clip(energy * (3 + 7 * strength), 0.5, 2.5 + 3 * strength)
     x = np.sin(3 * t + amp)
     y = np.sin(4 * t)
+    return x, y
+
+def render(ax, chunk, opacity=0.65, color="#FFFFFF", strength=0.5, features=None):
+    x, y = _curve(chunk, strength, features)
+    lw = 2 + 4 * strength
     ax.plot(x, y, color=color, linewidth=lw, alpha=opacity)
+
+def setup(ax, params):
+    opacity = params.get("opacity", 0.65)
+    color = params.get("color", "#FFFFFF")
+    strength = params.get("strength", 0.5)
+    line, = ax.plot([], [], color=color, linewidth=2 + 4 * strength, alpha=opacity)
+    return {"line": line, "strength": strength}
+
+def update(state, chunk, features=None):
+    if len(chunk) == 0:
+        state["line"].set_data([], [])
+        return
+    state["line"].set_data(*_curve(chunk, state["strength"], features))
+
+def draw(canvas, chunk, params, features=None):
+    if len(chunk) == 0:
+        return
+    strength = params.get("strength", 0.5)
+    x, y = _curve(chunk, strength, features)
+    canvas.polyline(x, y, params.get("color", "#FFFFFF"), linewidth=2 + 4 * strength, alpha=params.get("opacity", 0.65))
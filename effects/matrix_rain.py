@@ -1,12 +1,12 @@
 import numpy as np
 
-def render(ax, chunk, opacity=0.7, color="#00FF00", strength=0.5):
-    energy = np.mean(np.abs(chunk))
+def render(ax, chunk, opacity=0.7, color="#00FF00", strength=0.5, features=None, detail=1.0):
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
     np.random.seed(int(energy * 100000) % 100000)
 
     cols = 20
     rows = 15
-    density = int(energy * (50 + 200 * strength))
+    density = int(energy * (50 + 200 * strength) * detail)
 
     ax.set_xlim(0, cols)
     ax.set_ylim(0, rows)
@@ -29,3 +29,7 @@ def render(ax, chunk, opacity=0.7, color="#00FF00", strength=0.5):
             va="center",
             family="monospace"
         )
+
+def frame_key(chunk, params, features=None):
+    # Beeld hangt alleen af van de energie
+    return features.mean_abs if features is not None else np.mean(np.abs(chunk))
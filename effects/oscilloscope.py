@@ -1,12 +1,16 @@
 import numpy as np
 
+def _trace(chunk, strength):
+    chunk = chunk / np.max(np.abs(chunk)) if np.max(np.abs(chunk)) > 0 else chunk
+    x = np.linspace(-1, 1, len(chunk))
+    y = chunk * (1 + 1.5 * strength)  # amplitude afhankelijk van strength
+    return x, y
+
 def render(ax, chunk, opacity=0.65, color="#00FF99", strength=0.5):
     if len(chunk) == 0:
         return
 
-    chunk = chunk / np.max(np.abs(chunk)) if np.max(np.abs(chunk)) > 0 else chunk
-    x = np.linspace(-1, 1, len(chunk))
-    y = chunk * (1 + 1.5 * strength)  # amplitude afhankelijk van strength
+    x, y = _trace(chunk, strength)
 
     # Glow-layer (dikkere, transparante achtergrondlijn)
     ax.plot(x, y, color=color, linewidth=6 + 8 * strength, alpha=opacity * 0.2)
@@ -15,3 +19,32 @@ def render(ax, chunk, opacity=0.65, color="#00FF99", strength=0.5):
     ax.plot(x, y, color=color, linewidth=1.2 + 2 * strength, alpha=opacity)
     ax.set_xlim(-1, 1)
     ax.set_ylim(-1.1 - strength, 1.1 + strength)
+
+def setup(ax, params):
+    opacity = params.get("opacity", 0.65)
+    color = params.get("color", "#00FF99")
+    strength = params.get("strength", 0.5)
+    glow, = ax.plot([], [], color=color, linewidth=6 + 8 * strength, alpha=opacity * 0.2)
+    line, = ax.plot([], [], color=color, linewidth=1.2 + 2 * strength, alpha=opacity)
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1.1 - strength, 1.1 + strength)
+    return {"lines": (glow, line), "strength": strength}
+
+def update(state, chunk):
+    if len(chunk) == 0:
+        x = y = []
+    else:
+        x, y = _trace(chunk, state["strength"])
+    for line in state["lines"]:
+        line.set_data(x, y)
+
+def draw(canvas, chunk, params, features=None):
+    if len(chunk) == 0:
+        return
+    opacity = params.get("opacity", 0.65)
+    color = params.get("color", "#00FF99")
+    strength = params.get("strength", 0.5)
+    canvas.set_limits((-1, 1), (-1.1 - strength, 1.1 + strength))
+    x, y = _trace(chunk, strength)
+    canvas.polyline(x, y, color, linewidth=6 + 8 * strength, alpha=opacity * 0.2)
+    canvas.polyline(x, y, color, linewidth=1.2 + 2 * strength, alpha=opacity)
@@ -1,10 +1,30 @@
 import numpy as np
 
-def render(ax, chunk, opacity=0.6, color="#FFFFFF", strength=0.5):
-    energy = np.mean(np.abs(chunk))
+def render(ax, chunk, opacity=0.6, color="#FFFFFF", strength=0.5, features=None):
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
     flash_threshold = 0.2 + 0.6 * (1 - strength)  # lager bij hogere strength
     if energy > flash_threshold:
         ax.set_facecolor(color)
         ax.patch.set_alpha(min(opacity * (energy * (1.5 + 2 * strength)), 1.0))
     else:
         ax.set_facecolor((0, 0, 0, 0))
+
+def frame_key(chunk, params, features=None):
+    # Beeld hangt alleen af van de energie; onder de drempel altijd leeg
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
+    flash_threshold = 0.2 + 0.6 * (1 - params.get("strength", 0.5))
+    return energy if energy > flash_threshold else "off"
+
+def setup(ax, params):
+    return {
+        "ax": ax,
+        "opacity": params.get("opacity", 0.6),
+        "color": params.get("color", "#FFFFFF"),
+        "strength": params.get("strength", 0.5),
+    }
+
+def update(state, chunk, features=None):
+    # De axes-patch wordt niet meer per frame vervangen: alpha eerst resetten
+    ax = state["ax"]
+    ax.patch.set_alpha(None)
+    render(ax, chunk, state["opacity"], state["color"], state["strength"], features)
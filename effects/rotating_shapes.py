@@ -1,28 +1,30 @@
 import numpy as np
 from matplotlib.patches import RegularPolygon, Circle
 
-def render(ax, chunk, opacity=0.7, color="#00CCFF", strength=0.5):
-    energy = np.mean(np.abs(chunk))
-    if energy == 0:
-        return
-
-    np.random.seed(int(energy * 100000) % 100000)
+def _layout(energy, strength):
     # Laat aantal shapes en grootte afhangen van strength
     n_shapes = 3 + int(3 * strength)
     angles = np.linspace(0, 2*np.pi, n_shapes, endpoint=False)
-
+    radius = 0.15 + 0.1 * energy + 0.15 * strength
     for i, angle in enumerate(angles):
         x = 0.6 * np.cos(angle)
         y = 0.6 * np.sin(angle)
         sides = 3 + (i % 4)  # wisselt tussen driehoek, vierkant, vijfhoek, zeshoek
         rot = (energy * 360 + i * 45) % 360
-        radius = 0.15 + 0.1 * energy + 0.15 * strength
+        yield (x, y), sides, radius, np.deg2rad(rot)
 
+def render(ax, chunk, opacity=0.7, color="#00CCFF", strength=0.5, features=None):
+    energy = features.mean_abs if features is not None else np.mean(np.abs(chunk))
+    if energy == 0:
+        return
+
+    np.random.seed(int(energy * 100000) % 100000)
+    for xy, sides, radius, orientation in _layout(energy, strength):
         shape = RegularPolygon(
-            (x, y),
+            xy,
             numVertices=sides,
             radius=radius,
-            orientation=np.deg2rad(rot),
+            orientation=orientation,
             color=color,
             alpha=opacity,
             linewidth=0
@@ -33,3 +35,55 @@ def render(ax, chunk, opacity=0.7, color="#00CCFF", strength=0.5):
     ax.set_ylim(-1.2, 1.2)
     ax.set_aspect('equal')
     ax.axis('off')
+
+def frame_key(chunk, params, features=None):
+    # Beeld hangt alleen af van de energie
+    if features is not None:
+        return features.mean_abs
+    return np.mean(np.abs(chunk)) if len(chunk) else 0.0
+
+def setup(ax, params):
+    opacity = params.get("opacity", 0.7)
+    color = params.get("color", "#00CCFF")
+    strength = params.get("strength", 0.5)
+    shapes = []
+    for xy, sides, radius, orientation in _layout(0.0, strength):
+        shape = RegularPolygon(xy, numVertices=sides, radius=radius, orientation=orientation,
+                               color=color, alpha=opacity, linewidth=0, visible=False)
+        ax.add_patch(shape)
+        shapes.append(shape)
+    ax.set_xlim(-1.2, 1.2)
+    ax.set_ylim(-1.2, 1.2)
+    ax.set_aspect('equal')
+    return {"shapes": shapes, "strength": strength}
+
+def update(state, chunk, features=None):
+    if features is not None:
+        energy = features.mean_abs
+    else:
+        energy = np.mean(np.abs(chunk)) if len(chunk) else 0.0
+    if energy == 0:
+        for shape in state["shapes"]:
+            shape.set_visible(False)
+        return
+    for shape, (_, _, radius, orientation) in zip(state["shapes"], _layout(energy, state["strength"])):
+        # RegularPolygon bouwt zijn transform opnieuw op uit deze attributen
+        shape.radius = radius
+        shape.orientation = orientation
+        shape.stale = True
+        shape.set_visible(True)
+
+def draw(canvas, chunk, params, features=None):
+    if features is not None:
+        energy = features.mean_abs
+    else:
+        energy = np.mean(np.abs(chunk)) if len(chunk) else 0.0
+    if energy == 0:
+        return
+    opacity = params.get("opacity", 0.7)
+    color = params.get("color", "#00CCFF")
+    canvas.set_limits((-1.2, 1.2), (-1.2, 1.2), equal=True)
+    for (x, y), sides, radius, orientation in _layout(energy, params.get("strength", 0.5)):
+        # Zelfde hoekpunten als matplotlib's RegularPolygon
+        theta = 2 * np.pi / sides * np.arange(sides) + np.pi / 2 + orientation
+        canvas.polygon(x + radius * np.cos(theta), y + radius * np.sin(theta), color, alpha=opacity)
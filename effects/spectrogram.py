@@ -1,14 +1,20 @@
 import numpy as np
 import librosa.display
 
-def render(ax, chunk, opacity=0.8, color="#00FFFF", strength=0.5):
-    if len(chunk) == 0:
-        return
+def _spectrum(chunk, strength, features=None):
+    if features is not None:
+        # Voorberekend mel-spectrogram; strength bepaalt hoeveel frames zichtbaar zijn
+        return features.history(int(16 + 48 * strength))
     # Laat n_fft en kleur afhangen van strength
     n_fft = int(128 + 384 * strength)  # van 128 tot 512
     hop_length = int(n_fft // (2 + 2 * strength))
     S = np.abs(librosa.stft(chunk, n_fft=n_fft, hop_length=hop_length))**2
-    S_db = librosa.power_to_db(S, ref=np.max)
+    return librosa.power_to_db(S, ref=np.max)
+
+def render(ax, chunk, opacity=0.8, color="#00FFFF", strength=0.5, features=None):
+    if len(chunk) == 0:
+        return
+    S_db = _spectrum(chunk, strength, features)
     # Kleurintensiteit via strength
     import matplotlib
     base_cmap = matplotlib.cm.get_cmap("viridis")
@@ -24,3 +30,34 @@ def render(ax, chunk, opacity=0.8, color="#00FFFF", strength=0.5):
     ax.set_xlim(-1, 1)
     ax.set_ylim(-1, 1)
     ax.axis("off")
+
+def setup(ax, params):
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1, 1)
+    strength = params.get("strength", 0.5)
+    return {
+        "ax": ax,
+        "image": None,
+        "strength": strength,
+        "alpha": params.get("opacity", 0.8) * (0.7 + 0.6 * strength),
+    }
+
+def update(state, chunk, features=None):
+    image = state["image"]
+    if len(chunk) == 0:
+        if image is not None:
+            image.set_visible(False)
+        return
+    S_db = _spectrum(chunk, state["strength"], features)
+    if image is None:
+        # Vorm van S_db hangt af van de chunk-lengte of features: bij het eerste frame aanmaken
+        ax = state["ax"]
+        state["image"] = ax.imshow(S_db, cmap="viridis", origin="lower", aspect="auto",
+                                   extent=[-1, 1, -1, 1], alpha=state["alpha"])
+        ax.set_xlim(-1, 1)
+        ax.set_ylim(-1, 1)
+        return
+    image.set_data(S_db)
+    # imshow schaalt bij het aanmaken automatisch: per frame hetzelfde doen
+    image.set_clim(S_db.min(), S_db.max())
+    image.set_visible(True)
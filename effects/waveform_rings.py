@@ -1,17 +1,41 @@
 import numpy as np
 
-def render(ax, chunk, opacity=0.65, color="#FFFFFF", strength=0.5):
-    if len(chunk) == 0:
-        return
-
+def _ring(chunk, strength):
     chunk = chunk / np.max(np.abs(chunk)) if np.max(np.abs(chunk)) > 0 else chunk
     theta = np.linspace(0, 2 * np.pi, len(chunk))
     # Laat ringgrootte en lijndikte afhangen van strength
     base = 0.6 + 0.6 * strength
     scale = 0.3 + 0.5 * strength
     radius = base + scale * chunk
-    x = radius * np.cos(theta)
-    y = radius * np.sin(theta)
+    return radius * np.cos(theta), radius * np.sin(theta)
+
+def render(ax, chunk, opacity=0.65, color="#FFFFFF", strength=0.5):
+    if len(chunk) == 0:
+        return
+
+    x, y = _ring(chunk, strength)
     lw = 1.5 + 3 * strength
     ax.plot(x, y, color=color, linewidth=lw, alpha=opacity)
     ax.set_aspect('equal')
+
+def setup(ax, params):
+    opacity = params.get("opacity", 0.65)
+    color = params.get("color", "#FFFFFF")
+    strength = params.get("strength", 0.5)
+    line, = ax.plot([], [], color=color, linewidth=1.5 + 3 * strength, alpha=opacity)
+    ax.set_aspect('equal')
+    return {"line": line, "strength": strength}
+
+def update(state, chunk):
+    if len(chunk) == 0:
+        state["line"].set_data([], [])
+        return
+    state["line"].set_data(*_ring(chunk, state["strength"]))
+
+def draw(canvas, chunk, params, features=None):
+    if len(chunk) == 0:
+        return
+    strength = params.get("strength", 0.5)
+    canvas.set_limits((-1.2, 1.2), (-1.2, 1.2), equal=True)
+    x, y = _ring(chunk, strength)
+    canvas.polyline(x, y, params.get("color", "#FFFFFF"), linewidth=1.5 + 3 * strength, alpha=params.get("opacity", 0.65))
@@ -0,0 +1,22 @@
+import numpy as np
+
+def parse_key_color(color):
+    # Hex/matplotlib kleur naar (r, g, b) in 0-255
+    if color is None:
+        return None
+    from matplotlib.colors import to_rgb
+    return tuple(int(round(c * 255)) for c in to_rgb(color))
+
+def key_color(frame, color=(255, 255, 255), threshold=8.0, softness=16.0):
+    # Gevectoriseerde color-key op een RGBA uint8 frame.
+    # Pixels binnen `threshold` (RGB-afstand, 0-441) van `color` worden volledig transparant,
+    # daarbuiten loopt de alpha lineair op over `softness` voor een zachte rand.
+    rgb = frame[..., :3].astype(np.float32)
+    dist = np.sqrt(np.sum((rgb - np.asarray(color, dtype=np.float32)) ** 2, axis=-1))
+    if softness > 0:
+        factor = np.clip((dist - threshold) / softness, 0.0, 1.0)
+    else:
+        factor = (dist > threshold).astype(np.float32)
+    out = frame.copy()
+    out[..., 3] = (frame[..., 3] * factor + 0.5).astype(np.uint8)
+    return out
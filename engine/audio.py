@@ -0,0 +1,138 @@
+import subprocess
+import numpy as np
+from . import pcm_cache
+
+def probe_duration(path):
+    # Duur in seconden volgens ffprobe (None als het niet lukt)
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+           "-of", "default=noprint_wrappers=1:nokey=1", path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True).stdout.strip()
+        return float(out)
+    except (OSError, ValueError):
+        return None
+
+class AudioStream:
+    # Decodeert audio als float32 PCM via een ffmpeg pipe (-f f32le), in blokken van
+    # hele videoframes. Elk blok krijgt `pad` samples context vóór en na de frames mee
+    # (stilte aan het begin en eind van het nummer), zodat overlappende analysevensters
+    # kunnen werken. Het geheugen blijft constant, ongeacht de lengte van het nummer.
+    # Met start_frame begint het decoderen daar (ffmpeg -ss, sample-nauwkeurig);
+    # max_frames is het (absolute) framenummer waar de stroom stopt.
+    # Met cache=True komen de blokken uit de gedeelde PCM-cache (engine/pcm_cache.py,
+    # memory-mapped). Bij een miss wordt gewoon gestreamd en, bij een volledige doorgang
+    # vanaf het begin, de gedecodeerde PCM meteen in de cache geschreven.
+    def __init__(self, path, sr=44100, fps=30, pad=0, max_frames=None, start_frame=0, cache=True):
+        self.path = path
+        self.cache = cache
+        self.sr = sr
+        self.samples_per_frame = int(sr / fps)
+        self.pad = pad
+        self.max_frames = max_frames
+        self.start_frame = start_frame
+
+    def estimate_frames(self):
+        # Voor voortgangsmeldingen; het werkelijke aantal volgt uit de decoder
+        duration = probe_duration(self.path)
+        if duration is None:
+            return self.max_frames
+        total = int(duration * self.sr) // self.samples_per_frame
+        return min(total, self.max_frames) if self.max_frames is not None else total
+
+    def blocks(self, frames_per_block=256):
+        # Levert (start_frame, n_frames, block) op; block = samples
+        # [start*spf - pad, (start+n)*spf + pad) van het nummer
+        tee = False
+        if self.cache:
+            try:
+                if pcm_cache.cached(self.path, self.sr):
+                    return self._cached_blocks(pcm_cache.load(self.path, self.sr), frames_per_block)
+                tee = self.start_frame == 0 and self.max_frames is None
+            except (OSError, ValueError) as e:
+                print(f"[WARN] PCM-cache niet bruikbaar ({e}), audio wordt direct gedecodeerd")
+        return self._decoded_blocks(frames_per_block, tee)
+
+    def warm(self):
+        # Cache vooraf vullen (bv. vóór parallelle segmenten, die anders elk zelf decoderen);
+        # False als dat niet lukt, de blokken komen dan gewoon uit de pipe
+        if not self.cache:
+            return False
+        try:
+            pcm_cache.load(self.path, self.sr)
+            return True
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"[WARN] PCM-cache niet gevuld: {e}")
+            return False
+
+    def _cached_blocks(self, pcm, frames_per_block):
+        spf, pad = self.samples_per_frame, self.pad
+        total = len(pcm) // spf
+        if self.max_frames is not None:
+            total = min(total, self.max_frames)
+        for start in range(self.start_frame, total, frames_per_block):
+            n = min(frames_per_block, total - start)
+            lo, hi = start * spf - pad, (start + n) * spf + pad
+            block = np.asarray(pcm[max(0, lo):min(hi, len(pcm))])
+            if lo < 0 or hi > len(pcm):
+                # Stilte vóór het begin en na het eind van het nummer
+                block = np.pad(block, (max(0, -lo), max(0, hi - len(pcm))))
+            yield start, n, block
+
+    def _decoded_blocks(self, frames_per_block, tee=False):
+        # tee: alle gelezen PCM ook naar een PcmWriter; alleen bij een volledige,
+        # foutloze decode wordt die gecommit
+        spf, pad = self.samples_per_frame, self.pad
+        # Eerste sample incl. pad-context; vóór het begin van het nummer is het stilte
+        first = self.start_frame * spf - pad
+        seek = ["-ss", f"{first / self.sr:.9f}"] if first > 0 else []
+        cmd = ["ffmpeg", "-v", "error"] + seek + ["-i", self.path, "-map", "0:a:0", "-vn",
+               "-ac", "1", "-ar", str(self.sr), "-f", "f32le", "-"]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        buf = np.zeros(max(0, -first), dtype=np.float32)  # stilte vóór het begin
+        rest = b""
+        eof = False
+        start = self.start_frame
+        writer = None
+        try:
+            if tee:
+                try:
+                    writer = pcm_cache.PcmWriter(self.path, self.sr)
+                except OSError as e:
+                    print(f"[WARN] PCM-cache niet bruikbaar ({e})")
+            while self.max_frames is None or start < self.max_frames:
+                want = pad + frames_per_block * spf + pad
+                while not eof and len(buf) < want:
+                    raw = proc.stdout.read((want - len(buf)) * 4)
+                    if not raw:
+                        eof = True
+                        break
+                    if writer is not None:
+                        writer.write(raw)
+                    # Een read kan midden in een sample eindigen: de rest bij de volgende
+                    raw = rest + raw
+                    cut = len(raw) // 4 * 4
+                    rest = raw[cut:]
+                    buf = np.concatenate([buf, np.frombuffer(raw[:cut], dtype=np.float32)])
+                n = frames_per_block if not eof else min(frames_per_block, (len(buf) - pad) // spf)
+                if self.max_frames is not None:
+                    n = min(n, self.max_frames - start)
+                if n <= 0:
+                    break
+                block = buf[:pad + n * spf + pad]
+                if len(block) < pad + n * spf + pad:
+                    block = np.pad(block, (0, pad + n * spf + pad - len(block)))
+                yield start, n, block
+                buf = buf[n * spf:]
+                start += n
+            if writer is not None and eof and proc.wait() == 0:
+                try:
+                    writer.commit()
+                except OSError as e:
+                    print(f"[WARN] PCM niet in de cache gezet: {e}")
+                writer = None
+        finally:
+            if writer is not None:
+                writer.discard()
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
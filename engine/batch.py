@@ -0,0 +1,203 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import traceback
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Headless batch-render op basis van run_visual_engine. Een JSON-manifest beschrijft
+# de jobs; jobs met dezelfde audiobron (en fps) vormen een groep waarvan de audio
+# één keer geanalyseerd wordt. Jobs lopen verdeeld over een vaste pool processen die
+# matplotlib en de effecten één keer laden; per job komt er een regel in de samenvatting.
+#
+# Manifest:
+#   {"defaults": {"fps": 30, "opacity": 0.65, ...},
+#    "jobs": [{"input_video": "a.mp4", "effects": ["pulse_flashes"], "output": "a_pulse.mp4", ...}, ...]}
+# of direct een lijst jobs. Velden zijn de argumenten van run_visual_engine (effects mag
+# ook laag-dicts bevatten, zie engine/layers.py), plus optioneel "name". Relatieve
+# invoerpaden gelden ten opzichte van het manifest; relatieve output gaat zoals altijd
+# naar ./output.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Per job: renderen in het eigen proces, de pool verdeelt de cores
+JOB_DEFAULTS = {"fps": 30, "workers": 1, "segment_workers": 1}
+
+def load_manifest(path):
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"jobs": data}
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = dict(JOB_DEFAULTS, **data.get("defaults", {}))
+    jobs = []
+    for i, entry in enumerate(data.get("jobs", [])):
+        job = dict(defaults, **entry)
+        if "input_video" not in job or not job.get("effects"):
+            raise ValueError(f"Job {i} mist input_video of effects")
+        if isinstance(job["effects"], str):
+            job["effects"] = [job["effects"]]
+        for field in ("input_video", "audio_override"):
+            if job.get(field) and not os.path.isabs(job[field]):
+                job[field] = os.path.join(base, job[field])
+        stem = os.path.splitext(os.path.basename(job["input_video"]))[0]
+        names = [e if isinstance(e, str) else e.get("name", "?") for e in job["effects"]]
+        job.setdefault("name", f"{i:03d}_{stem}_{'+'.join(names)}")
+        job.setdefault("output", f"{job['name']}.mp4")
+        jobs.append(job)
+    return jobs
+
+def group_jobs(jobs):
+    # Zelfde audio + render-fps = zelfde analyse (een draft-job rendert op een lagere fps)
+    from .frames import render_fps
+    groups = {}
+    for job in jobs:
+        audio = os.path.abspath(job.get("audio_override") or job["input_video"])
+        groups.setdefault((audio, render_fps(job["fps"], job.get("quality", "final"))), []).append(job)
+    return groups
+
+def _init_process():
+    # Zware modules en alle effecten één keer per proces laden
+    sys.path.insert(0, REPO_ROOT)
+    import matplotlib
+    from . import frames, registry
+    frames.load_effects(registry.available_effects())
+
+def _analyze(audio, fps, path):
+    from .engine import analyze_audio
+    t0 = time.perf_counter()
+    analyze_audio(audio, fps=fps, output=path)
+    return time.perf_counter() - t0
+
+@contextlib.contextmanager
+def _redirect_fds(log):
+    # ffmpeg (en segmentprocessen) schrijven direct naar de geërfde stdout/stderr;
+    # op fd-niveau omleiden zodat hun uitvoer in het log van de job komt en niet
+    # door die van andere jobs heen op de terminal
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    try:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in saved:
+            os.close(fd)
+
+def _run_job(job, analysis, log_path):
+    from .engine import run_visual_engine
+    result = {"name": job["name"], "ok": False, "output": None, "error": None, "frames": None, "stages": {}}
+    timings = {}
+
+    def events(event):
+        if event["event"] == "timings":
+            timings.update(event)
+
+    args = {k: v for k, v in job.items() if k != "name"}
+    t0 = time.perf_counter()
+    with open(log_path, "w", buffering=1) as log, _redirect_fds(log), contextlib.redirect_stdout(log):
+        try:
+            result["output"] = run_visual_engine(events=events, analysis=analysis, **args)
+            result["ok"] = True
+        except Exception as e:
+            traceback.print_exc(file=log)
+            result["error"] = str(e)
+    wall = time.perf_counter() - t0
+    result["wall_time"] = round(wall, 2)
+    result["frames"] = timings.get("frames")
+    result["stages"] = timings.get("stages", {})
+    result["fps"] = round(result["frames"] / wall, 2) if result["frames"] and wall > 0 else None
+    result["size"] = os.path.getsize(result["output"]) if result["ok"] and os.path.exists(result["output"]) else None
+    result["log"] = log_path
+    return result
+
+def run_batch(jobs, concurrency=None, work_dir=None):
+    # Levert de samenvatting per job op (in manifestvolgorde)
+    concurrency = concurrency or os.cpu_count() or 1
+    work_dir = work_dir or tempfile.mkdtemp(prefix="supervisual_batch_")
+    os.makedirs(os.path.join(work_dir, "logs"), exist_ok=True)
+    groups = group_jobs(jobs)
+    print(f"🗂️ {len(jobs)} jobs, {len(groups)} audiobronnen, {concurrency} tegelijk (logs in {work_dir})", flush=True)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process) as pool:
+        # Eerst per groep de analyse; zodra die klaar is gaan de jobs van die groep de pool in
+        pending = {}
+        for g, ((audio, fps), group) in enumerate(groups.items()):
+            path = os.path.join(work_dir, f"analysis_{g:03d}.npz")
+            pending[pool.submit(_analyze, audio, fps, path)] = ("analysis", (audio, path, group))
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                kind, payload = pending.pop(future)
+                if kind == "analysis":
+                    audio, path, group = payload
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        print(f"❌ Analyse van {audio} mislukt: {e}", flush=True)
+                        for job in group:
+                            results[job["name"]] = {"name": job["name"], "ok": False, "output": None,
+                                                    "error": f"Analyse mislukt: {e}"}
+                        continue
+                    print(f"🔎 {os.path.basename(audio)} geanalyseerd in {seconds:.1f}s ({len(group)} jobs)", flush=True)
+                    for job in group:
+                        log_path = os.path.join(work_dir, "logs", f"{job['name']}.log")
+                        pending[pool.submit(_run_job, job, path, log_path)] = ("job", job)
+                else:
+                    job = payload
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"name": job["name"], "ok": False, "output": None, "error": str(e)}
+                    results[job["name"]] = result
+                    if result["ok"]:
+                        print(f"✅ {job['name']}: {result['wall_time']:.1f}s, {result['fps'] or 0:.1f} fps → {result['output']}", flush=True)
+                    else:
+                        print(f"❌ {job['name']}: {result['error']}", flush=True)
+    return [results[job["name"]] for job in jobs]
+
+def _format_size(n):
+    return f"{n / 1024 ** 2:.1f} MB" if n else "-"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a batch of videos x effects from a JSON job manifest.")
+    parser.add_argument("manifest", help="JSON job manifest")
+    parser.add_argument("--jobs", type=int, default=0, help="Jobs running at the same time (0 = all cores)")
+    parser.add_argument("--summary", default=None, help="Write the per-job summary as JSON to this path (default: <manifest>.summary.json)")
+    parser.add_argument("--work-dir", default=None, help="Folder for shared analyses and per-job logs (default: temp folder)")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        parser.error("Jobnamen in het manifest moeten uniek zijn")
+    t0 = time.perf_counter()
+    results = run_batch(jobs, concurrency=args.jobs or None, work_dir=args.work_dir)
+    total = time.perf_counter() - t0
+
+    summary_path = args.summary or os.path.splitext(args.manifest)[0] + ".summary.json"
+    with open(summary_path, "w") as f:
+        json.dump({"wall_time": round(total, 2), "jobs": results}, f, indent=1)
+
+    print()
+    for r in results:
+        status = "ok " if r["ok"] else "ERR"
+        wall = f"{r['wall_time']:.1f}s" if r.get("wall_time") is not None else "-"
+        fps = f"{r['fps']:.1f} fps" if r.get("fps") else "-"
+        print(f"{status}  {r['name']:<40} {wall:>8} {fps:>10} {_format_size(r.get('size')):>10}  {r.get('output') or r.get('error')}")
+    failed = sum(not r["ok"] for r in results)
+    print(f"{len(results) - failed}/{len(results)} jobs gelukt in {total:.1f}s, samenvatting: {summary_path}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    sys.path.insert(0, REPO_ROOT)
+    main()
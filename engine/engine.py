@@ -1,106 +1,330 @@
 import os
-import librosa
-import matplotlib.pyplot as plt
-import importlib
+import math
+import time
+from fractions import Fraction
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import Manager
 from tempfile import mkdtemp
-import subprocess
+from .render import (FrameWriter, composite_cmd, encode_overlay_cmd, write_concat_list, concat_cmd, probe_video_size,
+                     probe_frame_rate, rate_value)
+from .frames import FrameRenderer, quality_tier, render_fps
+from .layers import normalize_layers, needs_layers, layer_settings, layer_renderer, LayerStack, build_renderer
+from .parallel import iter_frames
+from .features import AudioFeatures, FeatureAnalyzer, HISTORY
+from .audio import AudioStream, probe_duration
+from . import overlay_cache
+from .segments import SEGMENT_SECONDS, JobManifest, job_key, plan
+from .events import EventReporter, run_ffmpeg
 
-def run_visual_engine(input_video, effects, opacity=0.65, fps=30, output="final_output.mp4", color="#FFFFFF", bg_color="#000000", strength=0.5, audio_override=None):
-    # Stap 1: Audio extraheren
-    tempdir = mkdtemp()
-    if audio_override:
-        audio_path = audio_override
-    else:
-        audio_path = os.path.join(tempdir, "temp_audio.wav")
-        cmd = ["ffmpeg", "-y", "-i", input_video, "-q:a", "0", "-map", "a", audio_path]
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def _feature_blocks(stream, analyzer, reporter=None, analysis=None):
+    # Audio + features per blok; features houden de laatste HISTORY frames van
+    # het vorige blok vast zodat history() over blokgrenzen heen werkt.
+    # Met `analysis` (features van het hele nummer, zie analyze_audio) wordt niet
+    # opnieuw geanalyseerd maar het bijbehorende stuk eruit gesneden.
+    # Decoderen en analyseren tellen samen als stage "analysis".
+    spf, pad = stream.samples_per_frame, stream.pad
+    tail = None
+    blocks = stream.blocks()
+    while True:
+        t0 = time.perf_counter()
+        item = next(blocks, None)
+        if item is None:
+            return
+        start, n, block = item
+        if analysis is not None:
+            if start + n > analysis.end:
+                raise ValueError(f"Analyse dekt frame {start + n} niet (tot {analysis.end})")
+            features = analysis.slice(start, start + n)
+        else:
+            features = analyzer.analyze(block, start, n)
+        if tail is not None:
+            features = tail.append(features)
+        if reporter is not None:
+            reporter.add("analysis", time.perf_counter() - t0)
+        yield start, block[pad:pad + n * spf], features
+        tail = features.slice(features.end, features.end) if analysis is None else None
 
-    # Stap 2: Audio analyseren
-    y, sr = librosa.load(audio_path, sr=44100)
-    samples_per_frame = int(sr / fps)
-    total_frames = len(y) // samples_per_frame
+def analyze_audio(audio_path, fps=30, sr=44100, output=None, progress=None):
+    # Features van het hele nummer in één stroom; identiek aan wat de engine
+    # blok voor blok berekent. Met `output` ook als .npz opgeslagen (zie load_analysis).
+    # `progress(frame, total)` wordt na elk blok aangeroepen (total kan None zijn).
+    spf = int(sr / fps)
+    analyzer = FeatureAnalyzer(sr, spf)
+    stream = AudioStream(audio_path, sr=sr, fps=fps, pad=analyzer.pad)
+    total = stream.estimate_frames() if progress is not None else None
+    parts = []
+    for start, n, block in stream.blocks():
+        parts.append(analyzer.analyze(block, start, n))
+        if progress is not None:
+            progress(start + n, total)
+    if not parts:
+        raise RuntimeError(f"Geen audio gevonden in {audio_path}")
+    features = AudioFeatures(*(np.concatenate([getattr(p, name) for p in parts], axis=-1)
+                               for name in ("rms", "mean_abs", "peak", "mel_db", "onset")))
+    if output:
+        features.save(output, sr=sr, samples_per_frame=spf)
+    return features
 
-    # Stap 3: Frames renderen met effecten
-    frame_dir = os.path.join(tempdir, "frames")
-    os.makedirs(frame_dir, exist_ok=True)
+def load_analysis(path, sr, samples_per_frame):
+    features, meta = AudioFeatures.load(path)
+    if meta.get("sr") != sr or meta.get("samples_per_frame") != samples_per_frame:
+        raise ValueError(f"Analyse {path} hoort bij sr={meta.get('sr')}, {meta.get('samples_per_frame')} samples per frame")
+    return features
 
-    fig, ax = plt.subplots(figsize=(6.4, 4.8), dpi=100)
-    plt.axis("off")
+def _from_frame(blocks, first, samples_per_frame):
+    # Blokken vanaf frame `first` (de frames ervoor dienden alleen als analysecontext)
+    spf = samples_per_frame
+    for start, audio, features in blocks:
+        n = len(audio) // spf
+        if start + n <= first:
+            continue
+        a = max(0, first - start)
+        yield start + a, audio[a * spf:], features
 
-    loaded_effects = []
-    for name in effects:
-        try:
-            mod = importlib.import_module(f"effects.{name}")
-            loaded_effects.append(mod)
-        except:
-            print(f"⚠️ Effect '{name}' niet gevonden")
-
-    print(f"🎨 Rendering {total_frames} frames...")
-    for i in range(total_frames):
-        ax.clear()
-        # Set both ax and fig patch to fully transparent if needed
-        if bg_color.lower() in ["transparent", "", "none"]:
-            ax.set_facecolor((0, 0, 0, 0))
-            fig.patch.set_facecolor((0, 0, 0, 0))
-            fig.patch.set_alpha(0.0)
-        else:
-            ax.set_facecolor(bg_color)
-            fig.patch.set_facecolor(bg_color)
-            fig.patch.set_alpha(1.0)
-        ax.axis("off")
-        ax.set_xlim(-1.2, 1.2)
-        ax.set_ylim(-1.2, 1.2)
-
-        chunk = y[i * samples_per_frame:(i+1) * samples_per_frame]
-        for effect in loaded_effects:
-            kwargs = {"opacity": opacity, "color": color}
-            if "strength" in effect.render.__code__.co_varnames:
-                kwargs["strength"] = strength
-            effect.render(ax, chunk, **kwargs)
-
-        fig.canvas.draw()
-        frame_path = os.path.join(frame_dir, f"frame_{i:05d}.png")
-        # Use RGBA PNGs for transparency
-        fig.savefig(frame_path, dpi=100, transparent=True)
-        # Remove alpha channel from white pixels (post-process)
-        if bg_color.lower() in ["transparent", "", "none"]:
+def _open_segment(spec, index, files, frame_offset=0, reporter=None):
+    # ffmpeg-writers voor één segment: composite met het bijbehorende stuk bronvideo
+    # en, bij een cache-miss, dezelfde stroom lossless naar een overlay-segment
+    width, height, fps, seg = spec["width"], spec["height"], spec["fps"], spec["segment_frames"]
+    cmd = composite_cmd(spec["input_video"], width, height, fps, files[0], transparent=spec["transparent"],
+                        segment=(index * seg / fps, seg / fps), gop=spec["out_gop"], upscale=spec["upscale"], preset=spec["preset"],
+                        rate=spec["rate"])
+    writers = [FrameWriter(cmd, debug_frame_dir=spec["frame_dir"], frame_offset=frame_offset, reporter=reporter)]
+    if len(files) > 1:
+        writers.append(FrameWriter(overlay_cache.overlay_cmd(files[1], width, height, fps), reporter=reporter))
+    return writers
+
+def _abort_segment(writers, files):
+    for w in writers:
+        w.close()
+    for path in files:
+        if os.path.exists(path):
+            os.remove(path)
+
+def _render_segment(spec, renderer_config, index, files, report=None, stop=None):
+    # Eén segment volledig in dit proces: audio vanaf net vóór het segment decoderen
+    # (HISTORY frames context voor history()/onset), renderen en encoderen.
+    # Levert (index, aantal frames, timings) op; frames is None als het segment gestopt is.
+    fps, sr, seg = spec["fps"], spec["sr"], spec["segment_frames"]
+    spf = int(sr / fps)
+    first = index * seg
+    analyzer = FeatureAnalyzer(sr, spf)
+    stream = AudioStream(spec["audio_path"], sr=sr, fps=fps, pad=analyzer.pad,
+                         start_frame=max(0, first - HISTORY - 2), max_frames=first + seg)
+    analysis = load_analysis(spec["analysis"], sr, spf) if spec["analysis"] else None
+    renderer = build_renderer(renderer_config)
+    # Alleen timings verzamelen; voortgang gaat via `report` naar het hoofdproces
+    reporter = EventReporter(sink=False, log=False)
+    blocks = _from_frame(_feature_blocks(stream, analyzer, reporter, analysis), first, spf)
+    writers = None
+    count = 0
+    try:
+        for frame in reporter.timed(iter_frames(renderer, blocks, spf), "render"):
+            if writers is None:
+                writers = _open_segment(spec, index, files, frame_offset=first, reporter=reporter)
+            if not any([w.write(frame) for w in writers]):
+                break  # bronvideo afgelopen, ffmpeg neemt niets meer aan
+            count += 1
+            if count % 8 == 0:
+                # Via de manager (IPC), dus niet elk frame
+                if stop is not None and stop.is_set():
+                    _abort_segment(writers, files)
+                    return index, None, reporter.timings
+                if report is not None:
+                    report.put((index, count))
+    except BaseException:
+        if writers is not None:
+            _abort_segment(writers, files)
+        raise
+    finally:
+        renderer.close()
+    if writers is None:
+        return index, 0, reporter.timings  # voorbij het einde van de audio
+    if not all([w.close() == 0 for w in writers]):
+        _abort_segment([], files)
+        raise RuntimeError(f"Segment {index} kon niet geëncodeerd worden")
+    if report is not None:
+        report.put((index, count))
+    return index, count, reporter.timings
+
+def _render_segments_parallel(job, spec, renderer_config, total_frames, segment_workers, reporter):
+    # Alle (nog niet afgeronde) segmenten tegelijk renderen en encoderen, elk in een
+    # eigen proces. Voortgang komt via een manager-queue terug naar dit proces.
+    seg = spec["segment_frames"]
+    todo = [i for i in range(math.ceil(total_frames / seg)) if not job.is_done(i)]
+    done_frames = job.completed_frames()
+    counts = {}
+    with Manager() as manager:
+        report, stop = manager.Queue(), manager.Event()
+        with ProcessPoolExecutor(max_workers=segment_workers) as pool:
+            pending = {pool.submit(_render_segment, spec, renderer_config, i, _segment_files(job, i, spec["cache"]), report, stop)
+                       for i in todo}
             try:
-                from PIL import Image
-                img = Image.open(frame_path).convert("RGBA")
-                datas = img.getdata()
-                newData = []
-                for item in datas:
-                    # If pixel is white, make it fully transparent
-                    if item[0] > 250 and item[1] > 250 and item[2] > 250:
-                        newData.append((255, 255, 255, 0))
-                    else:
-                        newData.append(item)
-                img.putdata(newData)
-                img.save(frame_path, "PNG")
-            except Exception as e:
-                print(f"[WARN] PIL post-process failed: {e}")
-        print(f"Frame {i+1}/{total_frames}", flush=True)
-
-    plt.close()
-
-    # Stap 4: Render overlay video
-    overlay = os.path.join(tempdir, "overlay.mp4")
-    if bg_color.lower() in ["transparent", "", "none"]:
-        # Use -vf format=yuva420p to preserve alpha
-        cmd = [
-            "ffmpeg", "-y", "-framerate", str(fps),
-            "-i", os.path.join(frame_dir, "frame_%05d.png"),
-            "-c:v", "libx264", "-pix_fmt", "yuva420p",
-            overlay
-        ]
+                while pending:
+                    finished, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        index, frames, timings = future.result()
+                        reporter.merge(timings)
+                        if frames:
+                            job.mark_done(index, frames, _segment_files(job, index, spec["cache"]))
+                            print(f"💾 Segment {index} klaar ({frames} frames)", flush=True)
+                        if frames is not None and frames < seg:
+                            job.mark_eof()
+                    while not report.empty():
+                        index, frames = report.get()
+                        counts[index] = frames
+                    reporter.progress("frames", done_frames + sum(counts.values()), total_frames)
+            except BaseException:
+                # Annuleren of fout: lopende segmenten netjes laten stoppen
+                stop.set()
+                for future in pending:
+                    future.cancel()
+                raise
+
+def _segment_files(job, index, cache):
+    files = [job.segment_file(index, ".mp4")]
+    if cache:
+        files.append(job.segment_file(index, ".ffv1.mkv"))
+    return files
+
+def _render_layer(layer, spec, features, path, total_frames, backend, workers, chunk_size, reporter):
+    # Eén laag over het hele nummer renderen naar een lossless RGBA-bestand (ffv1)
+    fps, sr = spec["fps"], spec["sr"]
+    spf = int(sr / fps)
+    analyzer = FeatureAnalyzer(sr, spf)
+    stream = AudioStream(spec["audio_path"], sr=sr, fps=fps, pad=analyzer.pad)
+    renderer = layer_renderer(layer, backend, scale=spec["scale"], detail=spec["detail"], size=spec["canvas"])
+    writer = FrameWriter(overlay_cache.overlay_cmd(path, spec["width"], spec["height"], fps), reporter=reporter)
+    stage = f"layer:{layer['name']}"
+    count = 0
+    try:
+        with reporter.stage(stage, record=False):
+            blocks = _feature_blocks(stream, analyzer, reporter, features)
+            for frame in reporter.timed(iter_frames(renderer, blocks, spf, workers=workers, chunk_size=chunk_size), "render"):
+                writer.write(frame)
+                count += 1
+                reporter.progress(stage, count, total_frames)
+    except BaseException:
+        writer.close()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        renderer.close()
+    if writer.close() != 0:
+        os.remove(path)
+        raise RuntimeError(f"Laag {layer['name']} kon niet geëncodeerd worden")
+    return count
+
+def _layer_stack(layers, job, spec, audio, features, total_frames, backend, workers, chunk_size, reporter,
+                 chroma_key=None, key_threshold=8.0, key_softness=16.0):
+    # Per laag een bestand: uit de cache (sleutel op alleen die laag) of nu gerenderd.
+    # Zonder cache (audio is None) staan de lagen in de jobmap, zodat een herstart ze hergebruikt.
+    fps, sr, width, height = spec["fps"], spec["sr"], spec["width"], spec["height"]
+    paths = []
+    keys = [None] * len(layers)
+    if audio is not None:
+        for i, layer in enumerate(layers):
+            layer_key = dict(layer_settings(layer), layer=True, fps=fps, sr=sr, size=[width, height], backend=backend)
+            if spec["detail"] != 1.0:
+                layer_key["detail"] = spec["detail"]
+            if spec["canvas"]:
+                layer_key["canvas"] = list(spec["canvas"])
+            keys[i] = overlay_cache.overlay_key(audio, [layer["name"]], layer_key)
+    # Lagen van deze stapel (ook de nog te renderen) mogen niet uit de cache verdwijnen
+    # zolang de job loopt
+    keep = {key for key in keys if key is not None}
+    for i, layer in enumerate(layers):
+        key = keys[i]
+        if key is not None:
+            hit = overlay_cache.lookup(key)
+            if hit:
+                print(f"♻️ Laag {i} ({layer['name']}) uit cache ({key[:12]})")
+                paths.append(hit[0])
+                continue
+            part = overlay_cache.part_path(key)
+        else:
+            done = job.file(f"layer_{i:02d}.ffv1.mkv")
+            if os.path.exists(done):
+                paths.append(done)
+                continue
+            part = done + ".part"
+        if features is None:
+            # Eén analyse voor alle lagen die gerenderd moeten worden
+            with reporter.stage("analysis"):
+                features = analyze_audio(spec["audio_path"], fps=fps, sr=sr)
+        print(f"🎨 Laag {i} ({layer['name']}) renderen...")
+        frames = _render_layer(layer, spec, features, part, total_frames, backend, workers, chunk_size, reporter)
+        if key is not None:
+            paths.append(overlay_cache.commit(key, {
+                "effects": [layer["name"]], "layer": True, "audio_path": os.path.abspath(spec["audio_path"]),
+                "frames": frames, "width": width, "height": height, "fps": fps, "transparent": True,
+            }, keep=keep))
+        else:
+            os.replace(part, done)
+            paths.append(done)
+    stack = LayerStack(layers, paths, width, height, fps, bg_color=spec["bg_color"], chroma_key=chroma_key,
+                       key_threshold=key_threshold, key_softness=key_softness)
+    return stack, features
+
+def run_visual_engine(input_video, effects, opacity=0.65, fps=30, output="final_output.mp4", color="#FFFFFF", bg_color="#000000", strength=0.5, audio_override=None, debug_frames=False, chroma_key=None, key_threshold=8.0, key_softness=16.0, workers=1, chunk_size=8, backend="matplotlib", events=None, cache=True, segment_seconds=SEGMENT_SECONDS, segment_workers=1, analysis=None, quality="final", resolution="input", warp_mode="horizontal"):
+    # events: callable die voortgangs- en timing-events (dicts) krijgt, zie engine/events.py
+    # analysis: .npz van analyze_audio voor deze audio en fps (gedeeld tussen jobs), anders
+    # wordt tijdens het renderen geanalyseerd
+    # effects: effectnamen en/of laag-dicts (zie engine/layers.py). Meerdere lagen worden
+    # elk apart gerenderd, gecached en in NumPy samengevoegd.
+    # debug_frames: elk frame ook als PNG in deze map (True = tijdelijke map, pad wordt geprint)
+    # quality: "final" of "draft" (lagere resolutie, fps en detail; zie frames.QUALITY)
+    # resolution: canvasgrootte; "input" = resolutie van de bronvideo, een fractie (bv. 0.5)
+    # daarvan (opgeschaald in de graph), (w, h) expliciet, of None voor het oude 640x480
+    # warp_mode: vervorming van foto-effecten (zie engine/warp.py MODES)
+    reporter = EventReporter(events)
+    tier = quality_tier(quality)
+    fps = render_fps(fps, quality)
+    layers = normalize_layers(effects, opacity=opacity, color=color, strength=strength, warp_mode=warp_mode)
+    layered = needs_layers(layers)
+    effects = [layer["name"] for layer in layers]
+    image = None
+    if len(layers) == 1 and not layered:
+        # Eén laag: gewoon pad, met de instellingen van die laag
+        opacity, color, strength, image, warp_mode = (layers[0][k] for k in ("opacity", "color", "strength", "image", "warp_mode"))
+    # Stap 1: Audio wordt rechtstreeks uit de video (of audio_override) gestreamd
+    audio_path = audio_override or input_video
+    sr = 44100
+    samples_per_frame = int(sr / fps)
+    analyzer = FeatureAnalyzer(sr, samples_per_frame)
+    # Niet voorbij het einde van de bronvideo renderen: daar stopt de composite-graph
+    video_seconds = probe_duration(input_video) if audio_override else None
+    stream = AudioStream(audio_path, sr=sr, fps=fps, pad=analyzer.pad,
+                         max_frames=int(video_seconds * fps) if video_seconds else None)
+    total_frames = stream.estimate_frames()
+
+    # Stap 2: Audio analyseren gebeurt per blok tijdens het renderen
+    # Stap 3: Frames renderen met effecten en direct naar ffmpeg streamen
+    # PNG-sequentie alleen als debug-output: debug_frames is een map, of True voor een tijdelijke
+    frame_dir = None
+    if debug_frames:
+        frame_dir = debug_frames if isinstance(debug_frames, str) else os.path.join(mkdtemp(), "frames")
+        print(f"🖼️ Debug-frames naar {os.path.abspath(frame_dir)}")
+    # Vectoreffecten worden direct op de leverresolutie gerasterd, niet klein gerenderd en opgeschaald
+    target, canvas = _canvas_size(input_video, resolution)
+    # Bij lagen bepaalt deze (lege) renderer alleen de canvasgrootte; de LayerStack komt later
+    renderer = FrameRenderer([] if layered else effects, opacity=opacity, color=color, bg_color=bg_color, strength=strength,
+                             image=image, chroma_key=chroma_key, key_threshold=key_threshold, key_softness=key_softness,
+                             backend="matplotlib" if layered else backend, scale=tier["scale"], detail=tier["detail"],
+                             size=canvas, warp_mode=warp_mode)
+    width, height = renderer.size()
+    # Draft of een fractie van de bronresolutie: de overlay wordt pas in de ffmpeg-graph
+    # naar de volle grootte geschaald
+    if target is None:
+        upscale = _full_size(width, height, tier["scale"])
     else:
-        cmd = [
-            "ffmpeg", "-y", "-framerate", str(fps),
-            "-i", os.path.join(frame_dir, "frame_%05d.png"),
-            "-c:v", "libx264", "-pix_fmt", "yuv420p",
-            overlay
-        ]
-    subprocess.run(cmd)
+        upscale = target if (width, height) != tuple(target) else None
+    if upscale:
+        print(f"✏️ Canvas {width}x{height} @ {fps} fps, opgeschaald naar {upscale[0]}x{upscale[1]}")
+    else:
+        print(f"🖼️ Canvas {width}x{height} @ {fps} fps")
 
     # Create standard output folder if it doesn't exist
     output_dir = os.path.join(os.getcwd(), "output")
@@ -108,108 +332,235 @@ def run_visual_engine(input_video, effects, opacity=0.65, fps=30, output="final_
     if not os.path.isabs(output):
         output = os.path.join(output_dir, output)
 
-    # Stap 5: Compositie met originele video
-    if bg_color.lower() in ["transparent", "", "none"]:
-        # Overlay with alpha (transparency)
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_video,
-            "-i", overlay,
-            "-filter_complex", "[0:v][1:v] overlay=shortest=1:format=auto",
-            "-c:a", "copy",
-            output
-        ]
-    else:
-        # Normal overlay
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_video,
-            "-i", overlay,
-            "-filter_complex", "[0:v][1:v] overlay=(W-w)/2:(H-h)/2:format=auto",
-            "-c:a", "copy",
-            output
-        ]
-    subprocess.run(cmd)
+    settings = {
+        "opacity": opacity, "color": color, "bg_color": bg_color, "strength": strength,
+        "fps": fps, "sr": sr, "size": [width, height], "backend": "raster" if renderer.canvas is not None else "matplotlib",
+        "chroma_key": chroma_key, "key_threshold": key_threshold, "key_softness": key_softness,
+    }
+    if image:
+        settings["image"] = layer_settings(layers[0])["image"]
+    if warp_mode != "horizontal":
+        settings["warp_mode"] = warp_mode
+    if quality != "final":
+        settings["quality"] = quality
+    if canvas:
+        settings["canvas"] = list(canvas)
+    if layered:
+        settings["backend"] = backend
+        settings["layers"] = [dict(layer_settings(layer), blend=layer["blend"], mix=layer["mix"]) for layer in layers]
+
+    # Overlay-cache: zelfde audio + instellingen + broncode = zelfde overlay
+    key = None
+    audio = None
+    if cache and not debug_frames:
+        audio = overlay_cache.audio_digest(stream)
+        key = overlay_cache.overlay_key(audio, effects, settings)
+        hit = overlay_cache.lookup(key)
+        if hit:
+            overlay, meta = hit
+            renderer.close()
+            print(f"♻️ Overlay uit cache ({key[:12]}), alleen compositen...")
+            cmd = composite_cmd(input_video, width, height, fps, output, transparent=meta["transparent"], overlay=overlay,
+                                upscale=upscale, preset=tier["preset"])
+            returncode = run_ffmpeg(cmd, reporter, "composite", meta["frames"], fps)
+            if returncode != 0:
+                print(f"[WARN] ffmpeg stopte met code {returncode}: {' '.join(cmd)}")
+            reporter.summary(meta["frames"])
+            print(f"✅ Klaar! Bestand opgeslagen als: {output}")
+            return output
+
+    # Stap 4: de tijdlijn wordt in segmenten van vaste lengte gerenderd. Per segment
+    # gaan de RGBA frames rechtstreeks de overlay-graph in (met het bijbehorende stuk
+    # bronvideo); afgeronde segmenten staan in een jobmanifest, zodat een afgebroken
+    # job bij een herstart alleen de rest rendert. Segmentgrenzen vallen op het
+    # keyframe-raster (GOP van 2 seconden). De segmenten houden de framerate van de
+    # bronvideo; hun lengte valt dan ook op hele bronframes, anders loopt de concat uit.
+    seconds = segment_seconds
+    if segment_workers is not None and segment_workers <= 0:
+        segment_workers = os.cpu_count() or 1
+    parallel = segment_workers > 1 and bool(total_frames)
+    if parallel:
+        # Minstens één segment per proces
+        seconds = min(seconds, total_frames / fps / segment_workers)
+    rate = probe_frame_rate(input_video)
+    gop = max(1, int(round(2 * fps)))
+    unit = gop
+    if rate:
+        source_per_frame = Fraction(rate) / Fraction(fps).limit_denominator(1001)
+        unit = math.lcm(gop, source_per_frame.denominator)
+        if unit > seconds * fps:
+            # bv. 29.97 fps bron bij 30 fps overlay: alleen op hele bronframes uitlijnen
+            unit = source_per_frame.denominator
+    segment_frames = max(1, math.ceil(seconds * fps / unit)) * unit
+    spec = {
+        "input_video": input_video, "audio_path": audio_path, "fps": fps, "sr": sr,
+        "width": width, "height": height, "transparent": renderer.transparent,
+        "segment_frames": segment_frames, "frame_dir": frame_dir, "cache": bool(key),
+        "rate": rate, "out_gop": max(1, int(round(2 * rate_value(rate)))) if rate else gop,
+        "analysis": analysis, "bg_color": bg_color,
+        "scale": tier["scale"], "detail": tier["detail"], "upscale": upscale, "preset": tier["preset"],
+        "canvas": canvas,
+    }
+    job = JobManifest(job_key(input_video, audio_path, effects, dict(settings, cache=bool(key))), segment_frames,
+                      meta={"input_video": os.path.abspath(input_video), "output": output})
+    done_frames = job.completed_frames()
+    if done_frames:
+        print(f"⏭️ {len(job.completed())} segmenten ({done_frames} frames) al klaar in {job.dir}, hervatten...")
+
+    features = load_analysis(analysis, sr, samples_per_frame) if analysis and not job.finished else None
+    if layered and not job.finished:
+        # Ontbrekende lagen renderen; daarna leest de LayerStack per frame alle lagen en voegt ze samen
+        renderer.close()
+        renderer, features = _layer_stack(layers, job, spec, audio, features, total_frames, backend, workers, chunk_size,
+                                          reporter, chroma_key, key_threshold, key_softness)
+
+    if parallel and not job.finished:
+        print(f"🎨 Rendering {total_frames} frames in segmenten van {segment_frames} frames, {segment_workers} tegelijk...")
+        # Eén keer decoderen in dit proces; de segmentprocessen lezen daarna de gedeelde cache
+        stream.warm()
+        try:
+            with reporter.stage("frames", record=False):
+                _render_segments_parallel(job, spec, renderer.config, total_frames, segment_workers, reporter)
+        except BaseException:
+            renderer.close()
+            raise
+        done_frames = job.completed_frames()
+
+    def open_segment(index, start):
+        files = _segment_files(job, index, spec["cache"])
+        return {"index": index, "files": files, "writers": _open_segment(spec, index, files, frame_offset=start, reporter=reporter)}
+
+    def close_segment(segment):
+        ok = all([w.close() == 0 for w in segment["writers"]])
+        if not ok:
+            raise RuntimeError(f"Segment {segment['index']} kon niet geëncodeerd worden")
+        job.mark_done(segment["index"], segment["writers"][0].frame_count, segment["files"])
+
+    # Sequentieel: één audiostroom voor alle (resterende) segmenten. Na een parallelle
+    # pass alleen nog nodig als de audio langer bleek dan geschat.
+    if not job.finished:
+        print(f"🎨 Rendering {total_frames} frames...")
+    runs = deque()
+    blocks = plan(_feature_blocks(stream, analyzer, reporter, features), job, samples_per_frame, runs) if not job.finished else iter(())
+    # Lagen samenvoegen is goedkoop en leest de laagbestanden op volgorde: geen pool
+    frames = reporter.timed(iter_frames(renderer, blocks, samples_per_frame, workers=1 if layered else workers,
+                                        chunk_size=chunk_size), "render")
+    segment = None
+    remaining = 0
+    count = done_frames
+    try:
+        with reporter.stage("frames", record=False):
+            for frame in frames:
+                if remaining == 0:
+                    index, start, remaining = runs.popleft()
+                    if segment is None or segment["index"] != index:
+                        if segment is not None:
+                            close_segment(segment)
+                        segment = open_segment(index, start)
+                for w in segment["writers"]:
+                    w.write(frame)
+                remaining -= 1
+                count += 1
+                reporter.progress("frames", count, total_frames)
+            if segment is not None:
+                close_segment(segment)
+                segment = None
+            job.mark_eof()
+    except BaseException:
+        # Onvolledig segment weggooien; afgeronde segmenten blijven staan voor een herstart
+        if segment is not None:
+            _abort_segment(segment["writers"], segment["files"])
+        raise
+    finally:
+        renderer.close()
+
+    if renderer.duplicates:
+        print(f"♻️ {renderer.duplicates} dubbele frames hergebruikt zonder te tekenen")
+    if not job.completed():
+        raise RuntimeError(f"Geen audio gevonden in {audio_path}")
+
+    # Stap 5: segmenten zonder her-encoderen samenvoegen (concat demuxer), audio in één stuk erbij
+    list_file = write_concat_list(job.files(0), job.file("segments.txt"))
+    cmd = concat_cmd(list_file, output, audio_source=input_video)
+    returncode = run_ffmpeg(cmd, reporter, "concat", job.completed_frames(), fps)
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg concat stopte met code {returncode}; segmenten staan nog in {job.dir}")
+    if key:
+        with reporter.stage("cache_store"):
+            overlay_cache.store(key, job.files(1), {
+                "effects": list(effects), "audio_path": os.path.abspath(audio_path),
+                "frames": job.completed_frames(), "width": width, "height": height, "fps": fps,
+                "transparent": renderer.transparent,
+            })
+    reporter.summary(job.completed_frames())
+    job.remove()
 
     print(f"✅ Klaar! Bestand opgeslagen als: {output}")
+    return output
+
+def _canvas_size(input_video, resolution):
+    # (doelgrootte, canvasgrootte) voor `resolution` (zie run_visual_engine); (None, None)
+    # = het vaste 640x480 canvas
+    if resolution is None:
+        return None, None
+    if isinstance(resolution, (list, tuple)):
+        size = (int(resolution[0]), int(resolution[1]))
+        return size, size
+    target = probe_video_size(input_video)
+    if target is None:
+        print(f"[WARN] Resolutie van {input_video} onbekend, canvas blijft 640x480")
+        return None, None
+    fraction = 1.0 if resolution == "input" else float(resolution)
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Resolutie moet 'input', een fractie in (0, 1] of (w, h) zijn, niet {resolution!r}")
+    return target, (max(2, int(round(target[0] * fraction))), max(2, int(round(target[1] * fraction))))
+
+def _full_size(width, height, scale):
+    # Uitvoergrootte bij een verkleind canvas (even, voor yuv420p); None bij volle grootte
+    if scale == 1.0:
+        return None
+    return int(round(width / scale / 2)) * 2, int(round(height / scale / 2)) * 2
 
-def render_effect_preview(audio_path, effect, output_path, fps=30, opacity=0.65, color="#FFFFFF", background="transparent", duration=5, image=None, strength=0.5):
-    import numpy as np
-    import importlib
-    import matplotlib.pyplot as plt
-    import librosa
-    from PIL import Image
-    import subprocess
-    import tempfile
+def render_effect_preview(audio_path, effect, output_path, fps=30, opacity=0.65, color="#FFFFFF", background="transparent", duration=5, image=None, strength=0.5, debug_frame_dir=None, chroma_key=None, key_threshold=8.0, key_softness=16.0, workers=1, chunk_size=8, backend="matplotlib", events=None, vfr=False, quality="final", warp_mode="horizontal"):
+    from .frames import load_effects
 
-    y, sr = librosa.load(audio_path, sr=44100)
+    reporter = EventReporter(events)
+    tier = quality_tier(quality)
+    fps = render_fps(fps, quality)
+    sr = 44100
     samples_per_frame = int(sr / fps)
-    total_frames = int(duration * fps)
-    y = y[:total_frames * samples_per_frame]
+    analyzer = FeatureAnalyzer(sr, samples_per_frame)
+    stream = AudioStream(audio_path, sr=sr, fps=fps, pad=analyzer.pad, max_frames=int(duration * fps))
+    total_frames = stream.estimate_frames()
 
-    frame_dir = tempfile.mkdtemp()
-    fig, ax = plt.subplots(figsize=(6.4, 4.8), dpi=100)
-    plt.axis("off")
+    if not load_effects([effect]):
+        raise ValueError(f"Effect '{effect}' niet gevonden")
+    renderer = FrameRenderer([effect], opacity=opacity, color=color, bg_color=background, strength=strength, image=image,
+                             chroma_key=chroma_key, key_threshold=key_threshold, key_softness=key_softness,
+                             backend=backend, scale=tier["scale"], detail=tier["detail"], warp_mode=warp_mode)
+    width, height = renderer.size()
 
-    try:
-        mod = importlib.import_module(f"effects.{effect}")
-    except Exception as e:
-        print(f"⚠️ Effect '{effect}' niet gevonden: {e}")
-        return
+    # Frames direct naar ffmpeg streamen (draft: daar naar de volle grootte schalen)
+    pix_fmt = "yuva420p" if renderer.transparent else "yuv420p"
+    cmd = encode_overlay_cmd(output_path, width, height, fps, pix_fmt, vfr=vfr,
+                             upscale=_full_size(width, height, tier["scale"]), preset=tier["preset"])
+    writer = FrameWriter(cmd, debug_frame_dir=debug_frame_dir, reporter=reporter)
 
     print(f"🎨 Rendering {total_frames} preview frames...")
-    for i in range(total_frames):
-        ax.clear()
-        if background.lower() in ["transparent", "", "none"]:
-            ax.set_facecolor((0, 0, 0, 0))
-            fig.patch.set_facecolor((0, 0, 0, 0))
-            fig.patch.set_alpha(0.0)
-        else:
-            ax.set_facecolor(background)
-            fig.patch.set_facecolor(background)
-            fig.patch.set_alpha(1.0)
-        ax.axis("off")
-        ax.set_xlim(-1.2, 1.2)
-        ax.set_ylim(-1.2, 1.2)
-        chunk = y[i * samples_per_frame:(i+1) * samples_per_frame]
-        # Geef image en strength argumenten door als het effect dat ondersteunt
-        kwargs = {"opacity": opacity, "color": color}
-        if "image_path" in mod.render.__code__.co_varnames:
-            kwargs["image_path"] = image
-        if "strength" in mod.render.__code__.co_varnames:
-            kwargs["strength"] = strength
-        mod.render(ax, chunk, **kwargs)
-        fig.canvas.draw()
-        frame_path = os.path.join(frame_dir, f"frame_{i:05d}.png")
-        fig.savefig(frame_path, dpi=100, transparent=True)
-        # Remove alpha from white pixels for true transparency
-        if background.lower() in ["transparent", "", "none"]:
-            try:
-                img = Image.open(frame_path).convert("RGBA")
-                datas = img.getdata()
-                newData = []
-                for item in datas:
-                    if item[0] > 250 and item[1] > 250 and item[2] > 250:
-                        newData.append((255, 255, 255, 0))
-                    else:
-                        newData.append(item)
-                img.putdata(newData)
-                img.save(frame_path, "PNG")
-            except Exception as e:
-                print(f"[WARN] PIL post-process failed: {e}")
-        print(f"Frame {i+1}/{total_frames}", flush=True)
-    plt.close()
-
-    # Render frames to video
-    if background.lower() in ["transparent", "", "none"]:
-        pix_fmt = "yuva420p"
-    else:
-        pix_fmt = "yuv420p"
-    cmd = [
-        "ffmpeg", "-y", "-framerate", str(fps),
-        "-i", os.path.join(frame_dir, "frame_%05d.png"),
-        "-c:v", "libx264", "-pix_fmt", pix_fmt, output_path
-    ]
-    subprocess.run(cmd)
+    blocks = _feature_blocks(stream, analyzer, reporter)
+    frames = reporter.timed(iter_frames(renderer, blocks, samples_per_frame, workers=workers, chunk_size=chunk_size), "render")
+    count = 0
+    with reporter.stage("frames", record=False):
+        try:
+            for frame in frames:
+                writer.write(frame)
+                count += 1
+                reporter.progress("frames", count, total_frames)
+        finally:
+            renderer.close()
+            writer.close()
+    if renderer.duplicates:
+        print(f"♻️ {renderer.duplicates} dubbele frames hergebruikt zonder te tekenen")
+    reporter.summary(count)
     print(f"✅ Preview video saved: {output_path}")
-
+    return output_path
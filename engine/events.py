@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import subprocess
+
+# Machineleesbare voortgang en timing. De engine meldt alles als events (dicts);
+# een sink bepaalt waar ze heen gaan: de render worker stuurt ze over zijn socket
+# naar de GUI, een CLI kan ze als JSON-regels naar een eigen fd laten schrijven
+# (SUPERVISUAL_EVENTS_FD of --events-fd), los van de gewone log op stdout.
+#
+# Events:
+#   {"event": "stage_start", "stage": str, "t": float}
+#   {"event": "stage_end", "stage": str, "t": float, "seconds": float}
+#   {"event": "progress", "stage": str, "frame": i, "total": n, "fps": f, "avg_fps": f, "eta": s | None, "t": float}
+#   {"event": "timings", "stages": {stage: seconds}, "frames": n, "seconds": float, "t": float}
+#
+# Stages: analysis, render, serialise, encode (lopen door elkaar per frame en
+# worden opgeteld), composite en concat (losse ffmpeg-stappen), cache_store.
+
+EVENTS_FD_ENV = "SUPERVISUAL_EVENTS_FD"
+
+# Voortgang hooguit zo vaak als event; het laatste frame altijd
+PROGRESS_INTERVAL = 0.1
+# Mensleesbare voortgangsregel op stdout
+LOG_INTERVAL = 1.0
+
+def fd_sink(fd):
+    # JSON-regels naar een open file descriptor (bv. een pipe van de aanroeper)
+    stream = os.fdopen(int(fd), "w", buffering=1, closefd=False)
+
+    def sink(event):
+        stream.write(json.dumps(event) + "\n")
+    return sink
+
+def default_sink():
+    fd = os.environ.get(EVENTS_FD_ENV)
+    return fd_sink(fd) if fd else None
+
+def format_eta(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}" if seconds < 3600 else f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def describe(event):
+    # Korte statustekst voor een event (voortgangsbalk in de GUI's)
+    kind, stage = event["event"], event.get("stage", "")
+    if kind == "progress":
+        return f"{stage} {event['frame']}/{event['total']} — {event['fps']:.1f} fps, ETA {format_eta(event['eta'])}"
+    if kind == "stage_start":
+        return f"{stage}..."
+    if kind == "stage_end":
+        return f"{stage} klaar in {event['seconds']:.1f}s"
+    if kind == "timings":
+        return ", ".join(f"{s} {t:.1f}s" for s, t in event["stages"].items()) + f" (totaal {event['seconds']:.1f}s)"
+    return kind
+
+class EventReporter:
+    # sink: callable(event); None = SUPERVISUAL_EVENTS_FD (indien gezet), False = geen
+    def __init__(self, sink=None, log=True):
+        self.sink = default_sink() if sink is None else (sink or None)
+        self.log = log
+        self.started = time.perf_counter()
+        self.timings = {}
+        self._nested = 0.0
+        self._progress = {}
+
+    def emit(self, event, **fields):
+        if self.sink is None:
+            return
+        fields["event"] = event
+        fields["t"] = round(time.perf_counter() - self.started, 3)
+        self.sink(fields)
+
+    # --- timing ---
+
+    def add(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self._nested += seconds
+
+    def merge(self, timings):
+        # Timings uit een ander proces (parallelle segmenten) optellen
+        for stage, seconds in (timings or {}).items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def stage(self, name, record=True):
+        # record=False: alleen start/einde melden, bv. voor een fase waarvan de
+        # onderdelen al per frame geteld worden
+        return _Stage(self, name, record)
+
+    def timed(self, iterable, stage):
+        # Tijd in next() toeschrijven aan `stage`, minus wat geneste stages (bv. de
+        # analyse in de blokgenerator) er in dezelfde tijd zelf al voor noteerden
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            nested = self._nested
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.add(stage, time.perf_counter() - t0 - (self._nested - nested))
+            yield item
+
+    # --- voortgang ---
+
+    def progress(self, stage, frame, total=None):
+        now = time.perf_counter()
+        state = self._progress.get(stage)
+        if state is None:
+            # start, vorige melding (tijd, frame), vorige logregel, momentane fps
+            state = self._progress[stage] = {"start": now, "frame0": frame, "last": (now, frame), "logged": now, "fps": 0.0}
+        total = max(total or 0, frame)
+        last_t, last_frame = state["last"]
+        if now - last_t < PROGRESS_INTERVAL and frame < total:
+            return
+        if now > last_t and frame > last_frame:
+            inst = (frame - last_frame) / (now - last_t)
+            # Licht gladgestreken, anders springt de ETA bij elke dubbele-frame reeks
+            state["fps"] = inst if not state["fps"] else 0.7 * state["fps"] + 0.3 * inst
+        state["last"] = (now, frame)
+        elapsed = now - state["start"]
+        avg = (frame - state["frame0"]) / elapsed if elapsed > 0 else 0.0
+        eta = (total - frame) / avg if avg > 0 else None
+        self.emit("progress", stage=stage, frame=frame, total=total, fps=round(state["fps"], 2),
+                  avg_fps=round(avg, 2), eta=None if eta is None else round(eta, 1))
+        if self.log and (now - state["logged"] >= LOG_INTERVAL or frame >= total):
+            state["logged"] = now
+            print(f"Frame {frame}/{total} — {avg:.1f} fps, ETA {format_eta(eta)}", flush=True)
+
+    def summary(self, frames=None):
+        seconds = time.perf_counter() - self.started
+        stages = {stage: round(t, 3) for stage, t in self.timings.items()}
+        self.emit("timings", stages=stages, frames=frames, seconds=round(seconds, 3))
+        if self.log and stages:
+            print("⏱️ " + describe({"event": "timings", "stages": stages, "seconds": seconds}), flush=True)
+
+class _Stage:
+    def __init__(self, reporter, name, record=True):
+        self.reporter = reporter
+        self.name = name
+        self.record = record
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        self.reporter.emit("stage_start", stage=self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        if self.record:
+            self.reporter.add(self.name, seconds)
+        self.reporter.emit("stage_end", stage=self.name, seconds=round(seconds, 3), ok=exc_type is None)
+
+def run_ffmpeg(cmd, reporter, stage, total_frames=None, fps=None):
+    # ffmpeg-stap met voortgang: -progress schrijft key=value regels naar stdout.
+    # Bij stream copy telt frame= niet altijd mee, dan via out_time en fps.
+    cmd = cmd[:1] + ["-nostats", "-progress", "pipe:1"] + cmd[1:]
+    with reporter.stage(stage):
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        frame = 0
+        try:
+            for line in proc.stdout:
+                key, _, value = line.strip().partition("=")
+                if key == "frame" and value.isdigit():
+                    frame = max(frame, int(value))
+                elif key in ("out_time_us", "out_time_ms") and fps and value.isdigit():
+                    # out_time_ms is (historisch) ook in microseconden
+                    frame = max(frame, int(int(value) * fps / 1_000_000))
+                elif key == "progress":
+                    reporter.progress(stage, min(frame, total_frames) if total_frames else frame, total_frames)
+        except BaseException:
+            # Annuleren vanuit de sink: ffmpeg niet laten doorlopen
+            proc.kill()
+            proc.wait()
+            raise
+        return proc.wait()
@@ -0,0 +1,140 @@
+import numpy as np
+
+# Aantal voorgaande frames dat effecten via FrameFeatures.history() kunnen opvragen
+HISTORY = 64
+# Ondergrens van het mel-spectrogram in dB (0 dB ~ een sinus op vol niveau)
+FLOOR_DB = -80.0
+
+class FrameFeatures:
+    # Compacte features van één frame; verwijst naar de arrays van het hele nummer
+    __slots__ = ("index", "rms", "mean_abs", "peak", "onset", "_track")
+
+    def __init__(self, track, index):
+        i = index - track.offset
+        self._track = track
+        self.index = index
+        self.rms = float(track.rms[i])
+        self.mean_abs = float(track.mean_abs[i])
+        self.peak = float(track.peak[i])
+        self.onset = float(track.onset[i])
+
+    @property
+    def mel(self):
+        # Mel-spectrum (dB) van dit frame
+        return self._track.mel_db[:, self.index - self._track.offset]
+
+    def history(self, n):
+        # Mel-spectrogram (dB) van de laatste n frames t/m dit frame, links opgevuld met stilte
+        track = self._track
+        end = self.index - track.offset + 1
+        start = end - n
+        block = track.mel_db[:, max(0, start):end]
+        if start < 0:
+            block = np.pad(block, ((0, 0), (-start, 0)), constant_values=FLOOR_DB)
+        return block
+
+class AudioFeatures:
+    # Features van (een deel van) het nummer, één waarde/kolom per videoframe.
+    # `offset` is het framenummer van de eerste kolom.
+    def __init__(self, rms, mean_abs, peak, mel_db, onset, offset=0):
+        self.rms = rms
+        self.mean_abs = mean_abs
+        self.peak = peak
+        self.mel_db = mel_db
+        self.onset = onset
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.rms)
+
+    @property
+    def end(self):
+        return self.offset + len(self.rms)
+
+    def frame(self, index):
+        return FrameFeatures(self, index)
+
+    def slice(self, start, end, context=HISTORY):
+        # Deel voor frames [start, end) plus `context` voorgaande frames (voor history()),
+        # zodat workers niet de arrays van het hele nummer meekrijgen
+        lo = max(self.offset, start - context)
+        a, b = lo - self.offset, end - self.offset
+        return AudioFeatures(self.rms[a:b], self.mean_abs[a:b], self.peak[a:b], self.mel_db[:, a:b],
+                             self.onset[a:b], offset=lo)
+
+    def save(self, path, **meta):
+        # Ongecomprimeerd .npz; `meta` (bv. sr, samples_per_frame) gaat als scalars mee
+        np.savez(path, rms=self.rms, mean_abs=self.mean_abs, peak=self.peak, mel_db=self.mel_db,
+                 onset=self.onset, offset=self.offset, **meta)
+
+    @classmethod
+    def load(cls, path):
+        # Levert (features, meta) op
+        with np.load(path) as data:
+            features = cls(data["rms"], data["mean_abs"], data["peak"], data["mel_db"], data["onset"],
+                           offset=int(data["offset"]))
+            meta = {key: data[key].item() for key in data.files
+                    if key not in ("rms", "mean_abs", "peak", "mel_db", "onset", "offset")}
+        return features, meta
+
+    def append(self, other):
+        # Aansluitend blok erachter plakken (other.offset == self.end)
+        return AudioFeatures(np.concatenate([self.rms, other.rms]),
+                             np.concatenate([self.mean_abs, other.mean_abs]),
+                             np.concatenate([self.peak, other.peak]),
+                             np.concatenate([self.mel_db, other.mel_db], axis=1),
+                             np.concatenate([self.onset, other.onset]),
+                             offset=self.offset)
+
+class FeatureAnalyzer:
+    # Analyseert audio blok voor blok: RMS, mean-abs en piek per frame, een
+    # frame-uitgelijnd mel-spectrogram en onset strength.
+    # De STFT-vensters (n_fft) zijn gecentreerd op het midden van elk frame en
+    # overlappen over de framegrenzen heen; daarvoor heeft elk blok `pad` samples
+    # context aan beide kanten nodig.
+    def __init__(self, sr, samples_per_frame, n_fft=2048, n_mels=64, batch=512):
+        import librosa
+        self.sr = sr
+        self.samples_per_frame = samples_per_frame
+        self.n_fft = n_fft
+        self.n_mels = n_mels
+        self.batch = batch
+        self.pad = n_fft // 2
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+        # Referentie zodat 0 dB overeenkomt met een sinus op vol niveau
+        self.ref_power = (self.window.sum() / 2) ** 2
+        self._prev_mel = None
+
+    def analyze(self, block, start_frame, n_frames):
+        # `block` bevat de samples [start*spf - pad, (start+n)*spf + pad)
+        spf, pad = self.samples_per_frame, self.pad
+        frames = block[pad:pad + n_frames * spf].reshape(n_frames, spf)
+        magnitude = np.abs(frames)
+        mean_abs = magnitude.mean(axis=1).astype(np.float32)
+        peak = magnitude.max(axis=1, initial=0.0).astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1)).astype(np.float32)
+
+        # Venster k begint op k*spf + spf//2 in blokcoördinaten (midden van frame k)
+        windows = np.lib.stride_tricks.sliding_window_view(block, self.n_fft)[spf // 2::spf][:n_frames]
+        mel_db = np.empty((self.n_mels, n_frames), dtype=np.float32)
+        for a in range(0, n_frames, self.batch):
+            b = min(a + self.batch, n_frames)
+            power = np.abs(np.fft.rfft(windows[a:b] * self.window, axis=1)) ** 2
+            mel = self.mel_basis @ power.T.astype(np.float32)
+            mel_db[:, a:b] = np.maximum(10.0 * np.log10(np.maximum(mel, 1e-10) / self.ref_power), FLOOR_DB)
+
+        # Onset strength: gemiddelde positieve toename per mel-band t.o.v. het vorige frame
+        prev = self._prev_mel if self._prev_mel is not None else np.full((self.n_mels, 1), FLOOR_DB, np.float32)
+        onset = np.maximum(0.0, np.diff(mel_db, axis=1, prepend=prev)).mean(axis=0).astype(np.float32)
+        if n_frames:
+            self._prev_mel = mel_db[:, -1:]
+        return AudioFeatures(rms, mean_abs, peak, mel_db, onset, offset=start_frame)
+
+def analyze(y, sr, samples_per_frame, total_frames, n_fft=2048, n_mels=64):
+    # Hele nummer in één keer (audio die al in het geheugen staat)
+    analyzer = FeatureAnalyzer(sr, samples_per_frame, n_fft, n_mels)
+    need = total_frames * samples_per_frame
+    y = y[:need]
+    block = np.pad(y.astype(np.float32, copy=False), (analyzer.pad, analyzer.pad + need - len(y)))
+    return analyzer.analyze(block, 0, total_frames)
@@ -0,0 +1,197 @@
+import time
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .render import canvas_rgba
+from .alpha import key_color, parse_key_color
+from . import registry
+
+# Kwaliteitsniveaus: schaal van het canvas (dpi), deler van de render-fps en
+# detailniveau voor effecten (minder tekens/deeltjes). Draft wordt in de laatste
+# ffmpeg-stap weer naar de volle grootte geschaald.
+QUALITY = {
+    "final": {"scale": 1.0, "fps_divisor": 1, "detail": 1.0, "preset": None},
+    "draft": {"scale": 0.5, "fps_divisor": 2, "detail": 0.5, "preset": "ultrafast"},
+}
+
+def quality_tier(quality):
+    if quality not in QUALITY:
+        raise ValueError(f"Onbekende kwaliteit '{quality}' (kies uit {', '.join(QUALITY)})")
+    return QUALITY[quality]
+
+def render_fps(fps, quality="final"):
+    # Werkelijke render-fps van een job met deze kwaliteit (draft rendert minder frames)
+    divisor = quality_tier(quality)["fps_divisor"]
+    return fps if divisor == 1 else max(1, int(round(fps / divisor)))
+
+# Hoogte van de figuur in inch: lijndiktes en fonts (in punten) zijn op deze hoogte
+# ontworpen en schalen via de dpi mee met de pixelhoogte van het canvas
+FIGURE_HEIGHT = 4.8
+
+def figure_geometry(size=None, scale=1.0):
+    # figsize/dpi voor een canvas van `size` pixels (x scale); zonder size de oude
+    # vaste 6.4x4.8 inch op dpi 100 (640x480)
+    if size is None:
+        return {"figsize": (6.4, FIGURE_HEIGHT), "dpi": 100 * scale}
+    width, height = max(1, int(round(size[0] * scale))), max(1, int(round(size[1] * scale)))
+    # +0.5 pixel: Agg kapt de canvasgrootte af, zo komt er precies width x height uit
+    dpi = (height + 0.5) / FIGURE_HEIGHT
+    return {"figsize": ((width + 0.5) / dpi, FIGURE_HEIGHT), "dpi": dpi}
+
+def is_transparent(bg_color):
+    return bg_color.lower() in ["transparent", "", "none"]
+
+def load_effects(names):
+    loaded_effects = []
+    for name in names:
+        try:
+            mod = registry.load(name)
+            loaded_effects.append(mod)
+        except Exception as e:
+            print(f"⚠️ Effect '{name}' niet gevonden: {e}")
+    return loaded_effects
+
+def supports_retained(effect):
+    return callable(getattr(effect, "setup", None)) and callable(getattr(effect, "update", None))
+
+class FrameRenderer:
+    # Eigen Agg figure + geladen effecten; tekent één audio-chunk naar een RGBA frame.
+    # Wordt zowel in het hoofdproces als in elke worker gebruikt, zodat de
+    # seriële en parallelle paden exact dezelfde frames opleveren.
+    def __init__(self, effects, opacity=0.65, color="#FFFFFF", bg_color="#000000", strength=0.5,
+                 image=None, chroma_key=None, key_threshold=8.0, key_softness=16.0, backend="matplotlib",
+                 dedupe=True, scale=1.0, detail=1.0, size=None, warp_mode="horizontal"):
+        # Instellingen bewaren zodat workers een identieke renderer kunnen opbouwen
+        self.config = dict(effects=effects, opacity=opacity, color=color, bg_color=bg_color, strength=strength,
+                           image=image, chroma_key=chroma_key, key_threshold=key_threshold, key_softness=key_softness,
+                           backend=backend, dedupe=dedupe, scale=scale, detail=detail, size=size,
+                           warp_mode=warp_mode)
+        self.effects = load_effects(effects)
+        self.opacity = opacity
+        self.color = color
+        self.bg_color = bg_color
+        self.strength = strength
+        self.image = image
+        self.transparent = is_transparent(bg_color)
+        self.key_rgb = parse_key_color(chroma_key) if self.transparent else None
+        self.key_threshold = key_threshold
+        self.key_softness = key_softness
+        self.params = {"opacity": opacity, "color": color, "strength": strength, "image_path": image, "detail": detail,
+                       "warp_mode": warp_mode}
+
+        # scale < 1 (draft): zelfde figuur, minder pixels; lijndiktes en fonts schalen mee
+        self.fig = Figure(**figure_geometry(size, scale))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.subplots()
+        self.ax.axis("off")
+
+        # Retained mode: als alle effecten setup/update hebben worden de artists
+        # één keer aangemaakt en daarna alleen hun data aangepast (geen ax.clear()).
+        self.retained = bool(self.effects) and all(supports_retained(e) for e in self.effects)
+        self.states = None
+        # Argumenten per effect één keer per job bepalen, niet per frame
+        self.bindings = [registry.bind(e, self.params) for e in self.effects]
+        # Optioneel: dict waarin per stage ("render", "draw") de tijd wordt opgeteld (benchmarks)
+        self.timings = None
+        # Dubbele frames: effecten zijn deterministisch in hun invoer, dus een gelijke
+        # frame-sleutel als het vorige frame betekent hetzelfde beeld zonder te tekenen
+        self.dedupe = dedupe
+        self.duplicate = False
+        self.duplicates = 0
+        self._last_key = None
+        self._last_frame = None
+
+        # Raster backend: alleen als elk effect een draw(canvas, ...) heeft; matplotlib blijft de referentie
+        self.canvas = None
+        if backend == "raster":
+            if self.effects and all(callable(getattr(e, "draw", None)) for e in self.effects):
+                from .raster import RasterCanvas
+                width, height = self.size()
+                self.canvas = RasterCanvas(width, height, dpi=self.fig.dpi,
+                                           bg_color=None if self.transparent else bg_color)
+            else:
+                print("⚠️ Niet alle effecten ondersteunen de raster backend, matplotlib wordt gebruikt")
+
+    def size(self):
+        # Werkelijke pixelgrootte van het canvas
+        self.fig.canvas.draw()
+        height, width = canvas_rgba(self.fig).shape[:2]
+        return width, height
+
+    def _reset_axes(self):
+        fig, ax = self.fig, self.ax
+        ax.clear()
+        # Set both ax and fig patch to fully transparent if needed
+        if self.transparent:
+            ax.set_facecolor((0, 0, 0, 0))
+            fig.patch.set_facecolor((0, 0, 0, 0))
+            fig.patch.set_alpha(0.0)
+        else:
+            ax.set_facecolor(self.bg_color)
+            fig.patch.set_facecolor(self.bg_color)
+            fig.patch.set_alpha(1.0)
+        ax.axis("off")
+        ax.set_xlim(-1.2, 1.2)
+        ax.set_ylim(-1.2, 1.2)
+
+    def _tick(self, stage, t0):
+        if self.timings is not None:
+            now = time.perf_counter()
+            self.timings[stage] = self.timings.get(stage, 0.0) + now - t0
+            return now
+        return t0
+
+    def frame_key(self, chunk, features=None):
+        return tuple(binding.key(chunk, features) for binding in self.bindings)
+
+    def render(self, chunk, features=None):
+        if not self.dedupe:
+            return self._render(chunk, features)
+        key = self.frame_key(chunk, features)
+        self.duplicate = self._last_frame is not None and key == self._last_key
+        if self.duplicate:
+            self.duplicates += 1
+            return self._last_frame
+        self._last_key = key
+        self._last_frame = self._render(chunk, features)
+        return self._last_frame
+
+    def _render(self, chunk, features=None):
+        if self.canvas is not None:
+            return self._render_raster(chunk, features)
+        fig, ax = self.fig, self.ax
+        t0 = time.perf_counter()
+        if self.retained:
+            if self.states is None:
+                self._reset_axes()
+                self.states = [effect.setup(ax, self.params) for effect in self.effects]
+            for binding, state in zip(self.bindings, self.states):
+                binding.update(state, chunk, features)
+        else:
+            self._reset_axes()
+            for binding in self.bindings:
+                binding.render(ax, chunk, features)
+
+        t0 = self._tick("render", t0)
+        fig.canvas.draw()
+        self._tick("draw", t0)
+        # Alpha komt rechtstreeks uit het transparante Agg canvas
+        frame = canvas_rgba(fig)
+        if self.key_rgb is not None:
+            frame = key_color(frame, self.key_rgb, self.key_threshold, self.key_softness)
+        return frame
+
+    def _render_raster(self, chunk, features):
+        canvas = self.canvas
+        t0 = time.perf_counter()
+        canvas.clear()
+        for effect in self.effects:
+            effect.draw(canvas, chunk, self.params, features)
+        # Bij de raster backend is tekenen en rasteriseren één stap
+        self._tick("render", t0)
+        frame = canvas.pixels
+        if self.key_rgb is not None:
+            frame = key_color(frame, self.key_rgb, self.key_threshold, self.key_softness)
+        return frame
+
+    def close(self):
+        self.fig.clear()
@@ -0,0 +1,199 @@
+import os
+import subprocess
+import numpy as np
+from .frames import FrameRenderer, is_transparent
+from .alpha import key_color, parse_key_color
+
+# Effectstapels als losse lagen. Elk effect wordt apart op een transparant canvas
+# gerenderd en als eigen RGBA-laag gecached (ffv1, sleutel op de parameters van
+# alleen die laag); het samenvoegen met opacity en blend mode gebeurt in NumPy.
+# Eén laag aanpassen rendert dus alleen die laag opnieuw.
+#
+# Een laag is een effectnaam of een dict:
+#   {"name": "spectrogram", "color": "#00FFFF", "opacity": 0.8, "strength": 0.5,
+#    "image": None, "warp_mode": "horizontal", "blend": "screen", "mix": 1.0}
+# color/opacity/strength/image/warp_mode gaan naar het effect (en in de cachesleutel van de
+# laag); blend en mix (extra laag-opacity) worden pas bij het samenvoegen toegepast.
+
+BLEND_MODES = ("normal", "add", "screen", "multiply", "lighten", "darken")
+# Parameters die het beeld van een laag bepalen (en dus de cachesleutel)
+LAYER_PARAMS = ("name", "opacity", "color", "strength", "image")
+
+def normalize_layers(effects, opacity=0.65, color="#FFFFFF", strength=0.5, image=None, warp_mode="horizontal"):
+    # Effectnamen en laag-dicts naar volledige laag-dicts; ontbrekende waarden uit
+    # de globale instellingen van de job
+    layers = []
+    for effect in effects:
+        layer = {"name": effect} if isinstance(effect, str) else dict(effect)
+        if "name" not in layer:
+            raise ValueError(f"Laag zonder effectnaam: {effect!r}")
+        layer.setdefault("opacity", opacity)
+        layer.setdefault("color", color)
+        layer.setdefault("strength", strength)
+        layer.setdefault("image", image)
+        layer.setdefault("warp_mode", warp_mode)
+        layer.setdefault("blend", "normal")
+        layer.setdefault("mix", 1.0)
+        if layer["blend"] not in BLEND_MODES:
+            raise ValueError(f"Onbekende blend mode '{layer['blend']}' (kies uit {', '.join(BLEND_MODES)})")
+        layers.append(layer)
+    return layers
+
+def needs_layers(layers):
+    # Eén gewone laag blijft op het bestaande pad (effect direct op de achtergrond)
+    return len(layers) > 1 or any(l["blend"] != "normal" or l["mix"] != 1.0 for l in layers)
+
+def layer_settings(layer):
+    # Instellingen van één laag voor de cachesleutel; een foto telt mee via pad, mtime en grootte
+    settings = {k: layer[k] for k in LAYER_PARAMS}
+    if layer.get("image"):
+        st = os.stat(layer["image"])
+        settings["image"] = [os.path.abspath(layer["image"]), st.st_mtime_ns, st.st_size]
+    if layer.get("warp_mode", "horizontal") != "horizontal":
+        # Alleen buiten de standaard in de sleutel, zodat bestaande entries geldig blijven
+        settings["warp_mode"] = layer["warp_mode"]
+    return settings
+
+def layer_renderer(layer, backend="matplotlib", scale=1.0, detail=1.0, size=None):
+    # Renderer voor één laag: alleen dit effect, transparante achtergrond
+    return FrameRenderer([layer["name"]], opacity=layer["opacity"], color=layer["color"], bg_color="transparent",
+                         strength=layer["strength"], image=layer.get("image"), backend=backend, scale=scale, detail=detail,
+                         size=size, warp_mode=layer.get("warp_mode", "horizontal"))
+
+def _blend(mode, cb, cs):
+    # Scheidbare blend modes (W3C compositing), kleuren in 0-1
+    if mode == "multiply":
+        return cb * cs
+    if mode == "screen":
+        return cb + cs - cb * cs
+    if mode == "add":
+        return np.minimum(cb + cs, 1.0)
+    if mode == "lighten":
+        return np.maximum(cb, cs)
+    if mode == "darken":
+        return np.minimum(cb, cs)
+    return cs
+
+class Compositor:
+    # Lagen (straight alpha RGBA uint8, zoals het Agg canvas levert) over elkaar
+    # leggen in float32 met premultiplied buffers die per frame hergebruikt worden
+    def __init__(self, width, height, bg_color="#000000"):
+        self.color = np.empty((height, width, 3), dtype=np.float32)
+        self.alpha = np.empty((height, width, 1), dtype=np.float32)
+        self.out = np.empty((height, width, 4), dtype=np.uint8)
+        if is_transparent(bg_color):
+            self.bg = None
+        else:
+            from matplotlib.colors import to_rgb
+            self.bg = np.asarray(to_rgb(bg_color), dtype=np.float32)
+
+    def composite(self, frames, layers):
+        color, alpha = self.color, self.alpha
+        if self.bg is None:
+            color.fill(0.0)
+            alpha.fill(0.0)
+        else:
+            color[...] = self.bg
+            alpha.fill(1.0)
+        for frame, layer in zip(frames, layers):
+            src = frame[..., :3].astype(np.float32) * np.float32(1 / 255)
+            a = frame[..., 3:4].astype(np.float32) * np.float32(layer["mix"] / 255)
+            if layer["blend"] != "normal":
+                # Bronkleur mengen met de blend van (onvermenigvuldigde) achtergrond en bron,
+                # naar rato van de dekking van de achtergrond
+                cb = color / np.maximum(alpha, 1e-6)
+                src = (1.0 - alpha) * src + alpha * _blend(layer["blend"], cb, src)
+            # Source-over met premultiplied achtergrond
+            color *= 1.0 - a
+            color += a * src
+            alpha *= 1.0 - a
+            alpha += a
+        rgb = color / np.maximum(alpha, 1e-6)
+        np.clip(rgb * 255.0 + 0.5, 0, 255, out=rgb)
+        self.out[..., :3] = rgb
+        self.out[..., 3:] = alpha * 255.0 + 0.5
+        return self.out
+
+class LayerSource:
+    # Leest frames van een gecachete laag (ffv1) in volgorde; bij een sprong (ander
+    # segment) wordt ffmpeg op de nieuwe positie opnieuw gestart. ffv1 heeft alleen
+    # keyframes, dus zoeken is exact.
+    def __init__(self, path, width, height, fps):
+        self.path = path
+        self.width, self.height, self.fps = width, height, fps
+        self.frame_bytes = width * height * 4
+        self.proc = None
+        self.next = None
+
+    def _open(self, index):
+        self.close()
+        # Halve frame terug: mkv-timestamps zijn afgerond op milliseconden
+        seek = ["-ss", f"{(index - 0.5) / self.fps:.6f}"] if index > 0 else []
+        cmd = ["ffmpeg", "-v", "error"] + seek + ["-i", self.path, "-f", "rawvideo", "-pix_fmt", "rgba", "-"]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        self.next = index
+
+    def read(self, index):
+        if self.proc is None or index != self.next:
+            self._open(index)
+        raw = self.proc.stdout.read(self.frame_bytes)
+        if len(raw) < self.frame_bytes:
+            raise RuntimeError(f"Laag {self.path} heeft geen frame {index}")
+        self.next = index + 1
+        return np.frombuffer(raw, dtype=np.uint8).reshape(self.height, self.width, 4)
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdout.close()
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+class LayerStack:
+    # Zelfde interface als FrameRenderer (render/size/config/close), maar leest de
+    # frames van elke laag uit zijn laagbestand en voegt ze samen
+    def __init__(self, layers, paths, width, height, fps, bg_color="#000000", chroma_key=None,
+                 key_threshold=8.0, key_softness=16.0):
+        self.config = dict(layers=layers, paths=paths, width=width, height=height, fps=fps, bg_color=bg_color,
+                           chroma_key=chroma_key, key_threshold=key_threshold, key_softness=key_softness)
+        self.layers = layers
+        self.width, self.height = width, height
+        self.transparent = is_transparent(bg_color)
+        self.key_rgb = parse_key_color(chroma_key) if self.transparent else None
+        self.key_threshold = key_threshold
+        self.key_softness = key_softness
+        self.sources = [LayerSource(path, width, height, fps) for path in paths]
+        self.compositor = Compositor(width, height, bg_color)
+        self.canvas = None
+        self.duplicate = False
+        self.duplicates = 0
+        self._last = None
+        self._last_frame = None
+
+    def size(self):
+        return self.width, self.height
+
+    def render(self, chunk, features=None):
+        index = features.index
+        frames = [source.read(index) for source in self.sources]
+        # Alle lagen gelijk aan het vorige frame: samenvoegen overslaan
+        self.duplicate = self._last is not None and all(np.array_equal(a, b) for a, b in zip(frames, self._last))
+        if self.duplicate:
+            self.duplicates += 1
+            return self._last_frame
+        frame = self.compositor.composite(frames, self.layers)
+        if self.key_rgb is not None:
+            frame = key_color(frame, self.key_rgb, self.key_threshold, self.key_softness)
+        self._last = frames
+        self._last_frame = frame.copy()
+        return self._last_frame
+
+    def close(self):
+        for source in self.sources:
+            source.close()
+
+def build_renderer(config):
+    # Renderer uit een (picklebare) config, ook in worker-processen
+    if "layers" in config:
+        return LayerStack(**config)
+    return FrameRenderer(**config)
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from .render import rawvideo_input, write_concat_list, concat_cmd
+from . import registry
+
+# Content-addressed cache voor gerenderde overlays. De sleutel is een hash van de
+# gedecodeerde audio, de effectinstellingen en de broncode van engine en effecten;
+# bij een hit gaat de job direct door naar het compositen.
+#
+# Per sleutel:  <key>.mkv   lossless RGBA overlay (ffv1)
+#               <key>.json  metadata (effecten, grootte, frames, laatst gebruikt)
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = int(float(os.environ.get("SUPERVISUAL_OVERLAY_CACHE_GB", "5")) * 1024 ** 3)
+
+# Engine-modules die de pixels van een overlay bepalen
+ENGINE_SOURCES = ("frames.py", "features.py", "raster.py", "alpha.py", "parallel.py", "photo_cache.py", "warp.py", "layers.py", "render.py")
+
+_engine_hash = None
+
+def cache_dir():
+    path = os.environ.get("SUPERVISUAL_OVERLAY_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "supervisual", "overlays")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def engine_hash():
+    global _engine_hash
+    if _engine_hash is None:
+        h = hashlib.sha1()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in ENGINE_SOURCES:
+            with open(os.path.join(here, name), "rb") as f:
+                h.update(f.read())
+        _engine_hash = h.hexdigest()
+    return _engine_hash
+
+def _digest_index():
+    return os.path.join(cache_dir(), "audio_digests.json")
+
+def audio_digest(stream):
+    # Hash van de gedecodeerde PCM (zonder pad-context). Per bestand (pad, mtime,
+    # grootte, sr, max_frames) onthouden zodat een hit niet opnieuw hoeft te decoderen.
+    st = os.stat(stream.path)
+    memo_key = f"{os.path.abspath(stream.path)}|{st.st_mtime_ns}|{st.st_size}|{stream.sr}|{stream.samples_per_frame}|{stream.max_frames}"
+    try:
+        with open(_digest_index()) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    if memo_key in index:
+        return index[memo_key]
+
+    h = hashlib.sha256()
+    spf, pad = stream.samples_per_frame, stream.pad
+    for start, n, block in stream.blocks():
+        h.update(block[pad:pad + n * spf].tobytes())
+    digest = h.hexdigest()
+    index[memo_key] = digest
+    try:
+        with open(_digest_index(), "w") as f:
+            json.dump(index, f)
+    except OSError:
+        pass
+    return digest
+
+def overlay_key(audio, effects, settings):
+    # settings: alles wat de pixels beïnvloedt (kleur, opacity, strength, fps, grootte, ...)
+    payload = {
+        "version": CACHE_VERSION,
+        "audio": audio,
+        "effects": [[name, registry.source_hash(name)] for name in effects],
+        "engine": engine_hash(),
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _paths(key):
+    base = os.path.join(cache_dir(), key)
+    return base + ".mkv", base + ".json"
+
+def lookup(key):
+    # Pad naar de overlay bij een hit (en markeer hem als recent gebruikt), anders None
+    video, meta_path = _paths(key)
+    if not (os.path.exists(video) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    meta["last_used"] = time.time()
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=1)
+    return video, meta
+
+def overlay_cmd(path, width, height, fps):
+    # ffmpeg commando dat RGBA frames lossless (ffv1) wegschrijft
+    return ["ffmpeg", "-y", "-v", "error"] + rawvideo_input(width, height, fps) + [
+        "-c:v", "ffv1", "-pix_fmt", "bgra", "-f", "matroska", path
+    ]
+
+def part_path(key):
+    # Hier wordt een entry geschreven; pas zichtbaar na commit()
+    return _paths(key)[0] + ".part"
+
+def store(key, segment_paths, meta, max_bytes=DEFAULT_MAX_BYTES):
+    # Overlay-segmenten (ffv1) samenvoegen tot één cache-entry; pas na succes zichtbaar
+    video, meta_path = _paths(key)
+    list_file = write_concat_list(segment_paths, video + ".txt")
+    try:
+        returncode = subprocess.run(concat_cmd(list_file, part_path(key), fmt="matroska")).returncode
+    finally:
+        os.remove(list_file)
+    if returncode != 0:
+        discard(key)
+        return False
+    commit(key, meta, max_bytes)
+    return True
+
+def commit(key, meta, max_bytes=DEFAULT_MAX_BYTES, keep=()):
+    # Volledig geschreven part_path(key) zichtbaar maken; levert het pad van de entry op.
+    # De nieuwe entry en die in `keep` (bv. de andere lagen van dezelfde job) worden
+    # niet weggesnoeid, ook niet als ze samen groter zijn dan max_bytes.
+    video, meta_path = _paths(key)
+    os.replace(part_path(key), video)
+    meta = dict(meta, key=key, size=os.path.getsize(video), created=time.time(), last_used=time.time())
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=1)
+    prune(max_bytes, keep={key, *keep})
+    return video
+
+def discard(key):
+    if os.path.exists(part_path(key)):
+        os.remove(part_path(key))
+
+def entries():
+    # Alle cache-entries, meest recent gebruikt eerst
+    result = []
+    for fname in os.listdir(cache_dir()):
+        if not fname.endswith(".json") or fname == "audio_digests.json":
+            continue
+        key = fname[:-5]
+        video, meta_path = _paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {"key": key}
+        meta["key"] = key
+        meta["size"] = os.path.getsize(video) if os.path.exists(video) else 0
+        result.append(meta)
+    result.sort(key=lambda m: m.get("last_used", 0), reverse=True)
+    return result
+
+def remove(key):
+    for path in _paths(key):
+        if os.path.exists(path):
+            os.remove(path)
+
+def prune(max_bytes=DEFAULT_MAX_BYTES, keep=()):
+    # LRU: minst recent gebruikte overlays weg tot de cache onder max_bytes zit;
+    # sleutels in `keep` blijven staan
+    removed = []
+    total = 0
+    for meta in entries():
+        total += meta["size"]
+        if meta["key"] in keep:
+            continue
+        if total > max_bytes or meta["size"] == 0:
+            remove(meta["key"])
+            removed.append(meta)
+    return removed
+
+def _format_size(n):
+    return f"{n / 1024 ** 2:.1f} MB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the rendered overlay cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List cached overlays (most recently used first)")
+    p_prune = sub.add_parser("prune", help="Evict least recently used overlays")
+    p_prune.add_argument("--max-size", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3, help="Cache size limit in GB")
+    sub.add_parser("clear", help="Remove every cached overlay")
+    p_rm = sub.add_parser("remove", help="Remove one overlay by key (prefix)")
+    p_rm.add_argument("key")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        items = entries()
+        for meta in items:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta.get("last_used", 0)))
+            effects = ",".join(meta.get("effects", [])) + (" (laag)" if meta.get("layer") else "")
+            print(f"{meta['key'][:12]}  {_format_size(meta['size']):>9}  {used}  {meta.get('frames', '?')} frames  {effects}  {meta.get('audio_path', '')}")
+        print(f"{len(items)} overlays, {_format_size(sum(m['size'] for m in items))} in {cache_dir()}")
+    elif args.command == "prune":
+        removed = prune(int(args.max_size * 1024 ** 3))
+        print(f"{len(removed)} overlays verwijderd ({_format_size(sum(m['size'] for m in removed))})")
+    elif args.command == "clear":
+        removed = prune(0)
+        print(f"{len(removed)} overlays verwijderd")
+    elif args.command == "remove":
+        matches = [m["key"] for m in entries() if m["key"].startswith(args.key)]
+        if len(matches) != 1:
+            print(f"Geen unieke overlay voor '{args.key}' ({len(matches)} treffers)")
+            sys.exit(1)
+        remove(matches[0])
+        print(f"Verwijderd: {matches[0]}")
+
+if __name__ == "__main__":
+    main()
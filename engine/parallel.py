@@ -0,0 +1,73 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .layers import build_renderer
+
+# Per worker-proces: één eigen FrameRenderer (Agg figure + effecten)
+_worker_renderer = None
+
+def _init_worker(renderer_kwargs):
+    global _worker_renderer
+    _worker_renderer = build_renderer(renderer_kwargs)
+
+def _render_range(start, block, samples_per_frame, features=None):
+    # Rendert een aaneengesloten reeks frames; `block` is de audio voor precies die reeks,
+    # `features` het bijbehorende deel van de audio-analyse
+    # Dubbele frames delen hetzelfde bytes-object (pickle stuurt het één keer)
+    frames = []
+    n = len(block) // samples_per_frame
+    for j in range(n):
+        chunk = block[j * samples_per_frame:(j+1) * samples_per_frame]
+        feat = features.frame(start + j) if features is not None else None
+        frame = _worker_renderer.render(chunk, feat)
+        frames.append(frames[-1] if frames and _worker_renderer.duplicate else frame.tobytes())
+    return start, frames
+
+def iter_frames(renderer, blocks, samples_per_frame, workers=1, chunk_size=8):
+    # Levert RGBA frames in volgorde op uit blokken (start_frame, audio, features).
+    # Met workers > 1 worden aaneengesloten frame-reeksen over een process pool
+    # verdeeld; er staan nooit meer dan 2 * workers reeksen tegelijk uit en blokken
+    # worden pas gelezen als er plek is, zodat het geheugen begrensd blijft.
+    spf = samples_per_frame
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for start, audio, features in blocks:
+            for j in range(len(audio) // spf):
+                chunk = audio[j * spf:(j+1) * spf]
+                yield renderer.render(chunk, features.frame(start + j) if features is not None else None)
+        return
+
+    chunk_size = max(1, int(chunk_size))
+    width, height = renderer.size()
+
+    def ranges():
+        for start, audio, features in blocks:
+            n = len(audio) // spf
+            for a in range(0, n, chunk_size):
+                b = min(a + chunk_size, n)
+                feats = features.slice(start + a, start + b) if features is not None else None
+                yield start + a, audio[a * spf:b * spf], feats
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(renderer.config,)) as pool:
+        pending = deque()
+        todo = ranges()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < 2 * workers:
+                task = next(todo, None)
+                if task is None:
+                    exhausted = True
+                    break
+                start, block, feats = task
+                pending.append(pool.submit(_render_range, start, block, spf, feats))
+            if not pending:
+                break
+            _, frames = pending.popleft().result()
+            prev_raw = frame = None
+            for raw in frames:
+                if raw is not prev_raw:
+                    frame = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+                    prev_raw = raw
+                yield frame
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+import subprocess
+import numpy as np
+
+# Gedeelde cache van gedecodeerde audio. Elk bestand wordt één keer door ffmpeg naar
+# mono float32 PCM gedecodeerd (per samplerate) en als .npy bewaard; daarna opent elke
+# tool (engine, previews, playgrounds) hem met np.load(mmap_mode='r'). Opnieuw openen
+# is dan direct, ook voor een mix van twee uur, en processen delen de page cache.
+#
+# Sleutel: sha256 van de bestandsinhoud + samplerate. De hash wordt per (pad, mtime,
+# grootte) onthouden, zodat een hit het bestand niet opnieuw hoeft te lezen.
+#
+# AudioStream vult de cache terwijl hij decodeert (PcmWriter), zodat renderen niet
+# hoeft te wachten tot het hele bestand gedecodeerd is.
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = int(float(os.environ.get("SUPERVISUAL_PCM_CACHE_GB", "4")) * 1024 ** 3)
+
+def cache_dir():
+    path = os.environ.get("SUPERVISUAL_PCM_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "supervisual", "pcm")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _hash_index():
+    return os.path.join(cache_dir(), "file_hashes.json")
+
+def file_hash(path):
+    st = os.stat(path)
+    memo_key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+    try:
+        with open(_hash_index()) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    if memo_key in index:
+        return index[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    index[memo_key] = digest
+    # Meerdere processen/threads kunnen tegelijk schrijven: via een eigen tijdelijk bestand
+    tmp = f"{_hash_index()}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, _hash_index())
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return digest
+
+def pcm_path(path, sr):
+    return os.path.join(cache_dir(), f"{file_hash(path)}_{sr}_v{CACHE_VERSION}.npy")
+
+def cached(path, sr):
+    # Pad van de cache-entry als die al bestaat, anders None
+    target = pcm_path(path, sr)
+    return target if os.path.exists(target) else None
+
+def decode_cmd(path, sr):
+    # Zelfde decode als engine.audio.AudioStream: eerste audiostream, mono, f32le
+    return ["ffmpeg", "-v", "error", "-i", path, "-map", "0:a:0", "-vn",
+            "-ac", "1", "-ar", str(sr), "-f", "f32le", "-"]
+
+class PcmWriter:
+    # Schrijft f32le PCM die elders al gedecodeerd wordt mee naar de cache. Eerst ruw
+    # naar een tijdelijk bestand (lengte is vooraf onbekend), bij commit() de .npy-header
+    # ervoor; per proces en thread eigen bestanden, pas zichtbaar via os.replace.
+    def __init__(self, path, sr):
+        self.path = path
+        self.target = pcm_path(path, sr)
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+        self.raw = f"{self.target}.{owner}.raw"
+        self.part = f"{self.target}.{owner}.part"
+        self.file = open(self.raw, "wb")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def commit(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.file.close()
+        try:
+            size = os.path.getsize(self.raw)
+            n = size // 4
+            with open(self.part, "wb") as out, open(self.raw, "rb") as src:
+                np.lib.format.write_array_header_1_0(out, {"descr": "<f4", "fortran_order": False, "shape": (n,)})
+                shutil.copyfileobj(src, out, 1 << 20)
+                out.truncate(out.tell() - (size - n * 4))
+            os.replace(self.part, self.target)
+        finally:
+            self.discard()
+        prune(max_bytes, keep=self.target)
+        return self.target
+
+    def discard(self):
+        self.file.close()
+        for tmp in (self.raw, self.part):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+def _decode(path, sr, max_bytes=DEFAULT_MAX_BYTES):
+    writer = PcmWriter(path, sr)
+    try:
+        proc = subprocess.Popen(decode_cmd(path, sr), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        with proc.stdout:
+            for data in iter(lambda: proc.stdout.read(1 << 20), b""):
+                writer.write(data)
+        returncode = proc.wait()
+        if returncode != 0:
+            raise RuntimeError(f"Audio uit {path} kon niet gedecodeerd worden (ffmpeg code {returncode})")
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.commit(max_bytes)
+
+def load(path, sr=44100, max_bytes=DEFAULT_MAX_BYTES):
+    # Mono float32 PCM van `path` op samplerate `sr`, read-only memory-mapped
+    target = pcm_path(path, sr)
+    if not os.path.exists(target):
+        t0 = time.perf_counter()
+        _decode(path, sr, max_bytes)
+        print(f"🎵 {os.path.basename(path)} gedecodeerd naar PCM-cache in {time.perf_counter() - t0:.1f}s")
+    else:
+        # mtime = laatst gebruikt (LRU)
+        os.utime(target)
+    pcm = np.load(target, mmap_mode="r")
+    if pcm.size == 0:
+        # np.memmap kan geen leeg bestand mappen; np.load geeft dan een gewone array
+        return np.zeros(0, dtype=np.float32)
+    return pcm
+
+def entries():
+    # Alle cache-entries, meest recent gebruikt eerst
+    result = []
+    for fname in os.listdir(cache_dir()):
+        if fname.endswith(".npy"):
+            full = os.path.join(cache_dir(), fname)
+            st = os.stat(full)
+            result.append({"path": full, "size": st.st_size, "last_used": st.st_mtime})
+    result.sort(key=lambda e: e["last_used"], reverse=True)
+    return result
+
+def prune(max_bytes=DEFAULT_MAX_BYTES, keep=None):
+    # LRU: minst recent gebruikte PCM weg tot de cache onder max_bytes zit. Een open
+    # memmap blijft geldig na verwijderen (POSIX), dus lopende jobs merken er niets van.
+    removed = []
+    total = 0
+    for entry in entries():
+        total += entry["size"]
+        if total > max_bytes and entry["path"] != keep:
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                continue
+            removed.append(entry)
+    return removed
+
+def _format_size(n):
+    return f"{n / 1024 ** 2:.1f} MB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the decoded audio (PCM) cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List cached PCM files (most recently used first)")
+    p_prune = sub.add_parser("prune", help="Evict least recently used PCM files")
+    p_prune.add_argument("--max-size", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3, help="Cache size limit in GB")
+    sub.add_parser("clear", help="Remove every cached PCM file")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        items = entries()
+        for entry in items:
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_used"]))
+            print(f"{os.path.basename(entry['path'])}  {_format_size(entry['size']):>9}  {used}")
+        print(f"{len(items)} bestanden, {_format_size(sum(e['size'] for e in items))} in {cache_dir()}")
+    elif args.command == "prune":
+        removed = prune(int(args.max_size * 1024 ** 3))
+        print(f"{len(removed)} bestanden verwijderd ({_format_size(sum(e['size'] for e in removed))})")
+    elif args.command == "clear":
+        removed = prune(0)
+        print(f"{len(removed)} bestanden verwijderd")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+from collections import OrderedDict
+import numpy as np
+from .warp import Warper
+
+# Maximaal aantal foto's (per pad/mtime/grootte) dat in het geheugen blijft
+MAX_ENTRIES = 4
+
+_cache = OrderedDict()
+
+class PhotoWarp:
+    # Gedecodeerde foto op werkresolutie (de grootte van het doelcanvas, niet die van
+    # de originele foto) met een Warper voor de vervorming per frame.
+    def __init__(self, image_path, size=None):
+        from PIL import Image
+        img = Image.open(image_path)
+        native = img.size
+        if size is not None:
+            # JPEG: direct op (bijna) doelgrootte decoderen via DCT-schaling,
+            # zodat een foto van 24 megapixel niet volledig gedecodeerd hoeft te worden
+            img.draft("RGB", size)
+        img = img.convert("RGBA")
+        # Verschuivingen zijn in pixels van de originele foto: meeschalen met de doelgrootte
+        self.scale = 1.0 if size is None else size[0] / native[0]
+        if size is not None and img.size != size:
+            img = img.resize(size, Image.BILINEAR)
+        # remap werkt per kanaal: RGBA kan direct, zonder BGRA-omweg via cvtColor
+        self.rgba = np.array(img)
+        h, w = self.rgba.shape[:2]
+        self.height, self.width = h, w
+        self.warper = Warper(self.rgba)
+        self.rows = (np.arange(h, dtype=np.float32) / h * np.pi)
+        self.cols = (np.arange(w, dtype=np.float32) / w * np.pi)
+        self._sines = OrderedDict()
+
+    def sine(self, freq, axis=0):
+        # Sinusbasis per rij (axis 0) of kolom (axis 1), gecached per (afgeronde) frequentie
+        key = (axis, round(float(freq), 3))
+        basis = self._sines.get(key)
+        if basis is None:
+            basis = np.sin((self.rows if axis == 0 else self.cols) * key[1]).astype(np.float32)
+            self._sines[key] = basis
+            if len(self._sines) > 256:
+                self._sines.popitem(last=False)
+        else:
+            self._sines.move_to_end(key)
+        return basis
+
+    def warp(self, freq, amp, mode="horizontal"):
+        # amp in pixels van de originele foto (bij swirl: graden)
+        if mode == "horizontal":
+            return self.warper.shift_rows(self.sine(freq, 0) * np.float32(amp * self.scale))
+        if mode == "vertical":
+            return self.warper.shift_cols(self.sine(freq, 1) * np.float32(amp * self.scale))
+        if mode == "radial":
+            return self.warper.radial(freq, amp * self.scale)
+        if mode == "swirl":
+            return self.warper.swirl(np.deg2rad(amp))
+        raise ValueError(f"Onbekende warp mode '{mode}'")
+
+def get_photo(image_path, size=None):
+    # Gedeeld door de engine, photo_warp_playground en photo_warp_preview_movie
+    # (allemaal via effects.photo_spectrogram). Sleutel: pad, mtime en doelgrootte.
+    path = os.path.abspath(image_path)
+    key = (path, os.stat(path).st_mtime_ns, size)
+    entry = _cache.get(key)
+    if entry is None:
+        entry = PhotoWarp(path, size)
+        _cache[key] = entry
+        if len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return entry
+
+def clear():
+    _cache.clear()
@@ -0,0 +1,127 @@
+import numpy as np
+import cv2
+from matplotlib.colors import to_rgba
+
+# Subpixel-precisie voor OpenCV tekenfuncties (coördinaten * 2**_SHIFT)
+_SHIFT = 4
+_SCALE = 1 << _SHIFT
+
+class RasterCanvas:
+    # Matplotlib-vrije tekenbackend: rasteriseert lijnen, cirkels, polygonen en tekst
+    # met OpenCV (anti-aliased) rechtstreeks in een voorgealloceerde RGBA uint8 array.
+    # Data-coördinaten en het axes-vak volgen de matplotlib-referentie (subplot-marges,
+    # lijndiktes in punten), zodat effecten op beide backends hetzelfde ogen.
+    def __init__(self, width=640, height=480, dpi=100, bg_color=None, box=(0.125, 0.11, 0.9, 0.88)):
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.box = box
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        self._mask = np.zeros((height, width), dtype=np.uint8)
+        self.bg = None if bg_color is None else np.array([round(c * 255) for c in to_rgba(bg_color)], dtype=np.uint8)
+        self.clear()
+
+    def clear(self):
+        if self.bg is None:
+            self.pixels[:] = 0
+        else:
+            self.pixels[:] = self.bg
+        self.set_limits((-1.2, 1.2), (-1.2, 1.2))
+
+    def set_limits(self, xlim, ylim, equal=False):
+        left, bottom, right, top = self.box
+        x0, x1 = left * self.width, right * self.width
+        y0, y1 = (1 - top) * self.height, (1 - bottom) * self.height
+        sx = (x1 - x0) / (xlim[1] - xlim[0])
+        sy = (y1 - y0) / (ylim[1] - ylim[0])
+        if equal:
+            # Zoals set_aspect('equal'): het vak krimpt rond het midden
+            s = min(sx, sy)
+            x0 += ((x1 - x0) - s * (xlim[1] - xlim[0])) / 2
+            y1 -= ((y1 - y0) - s * (ylim[1] - ylim[0])) / 2
+            sx = sy = s
+        self._xmin, self._ymin = xlim[0], ylim[0]
+        self._sx, self._sy = sx, sy
+        self._ox, self._oy = x0, y1
+
+    def to_pixels(self, x, y):
+        px = self._ox + (np.asarray(x, dtype=np.float64) - self._xmin) * self._sx
+        py = self._oy - (np.asarray(y, dtype=np.float64) - self._ymin) * self._sy
+        return px, py
+
+    def points_to_pixels(self, points):
+        return points * self.dpi / 72.0
+
+    def polyline(self, x, y, color, linewidth=1.0, alpha=1.0, closed=False):
+        if len(x) < 2:
+            return
+        px, py = self.to_pixels(x, y)
+        thickness = max(1, int(round(self.points_to_pixels(linewidth))))
+        pts = _fixed(px, py)
+        roi = self._begin(px, py, thickness)
+        if roi is None:
+            return
+        cv2.polylines(self._mask, [pts], closed, 255, thickness=thickness, lineType=cv2.LINE_AA, shift=_SHIFT)
+        self._blend(roi, color, alpha)
+
+    def polygon(self, x, y, color, alpha=1.0):
+        if len(x) < 3:
+            return
+        px, py = self.to_pixels(x, y)
+        roi = self._begin(px, py, 1)
+        if roi is None:
+            return
+        cv2.fillPoly(self._mask, [_fixed(px, py)], 255, lineType=cv2.LINE_AA, shift=_SHIFT)
+        self._blend(roi, color, alpha)
+
+    def circle(self, x, y, radius, color, alpha=1.0):
+        px, py = self.to_pixels(x, y)
+        r = radius * self._sx
+        roi = self._begin(np.array([px - r, px + r]), np.array([py - r, py + r]), 1)
+        if roi is None:
+            return
+        center = (int(round(float(px) * _SCALE)), int(round(float(py) * _SCALE)))
+        cv2.circle(self._mask, center, max(1, int(round(r * _SCALE))), 255, thickness=-1, lineType=cv2.LINE_AA, shift=_SHIFT)
+        self._blend(roi, color, alpha)
+
+    def text(self, x, y, s, color, fontsize=10, alpha=1.0):
+        # Hershey-fonts: alleen ASCII, gecentreerd op (x, y)
+        px, py = self.to_pixels(x, y)
+        scale = self.points_to_pixels(fontsize) / 22.0
+        (tw, th), base = cv2.getTextSize(s, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+        ox, oy = float(px) - tw / 2, float(py) + th / 2
+        roi = self._begin(np.array([ox, ox + tw]), np.array([oy - th, oy + base]), 2)
+        if roi is None:
+            return
+        cv2.putText(self._mask, s, (int(round(ox)), int(round(oy))), cv2.FONT_HERSHEY_SIMPLEX, scale, 255, 1, cv2.LINE_AA)
+        self._blend(roi, color, alpha)
+
+    def _begin(self, px, py, pad):
+        # Bounding box (geclipt) van de primitive; masker alleen daar leegmaken
+        x0 = max(0, int(np.floor(np.min(px))) - pad - 1)
+        x1 = min(self.width, int(np.ceil(np.max(px))) + pad + 2)
+        y0 = max(0, int(np.floor(np.min(py))) - pad - 1)
+        y1 = min(self.height, int(np.ceil(np.max(py))) + pad + 2)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        self._mask[y0:y1, x0:x1] = 0
+        return y0, y1, x0, x1
+
+    def _blend(self, roi, color, alpha):
+        # "Over"-compositie met straight alpha, zoals Agg in buffer_rgba levert
+        y0, y1, x0, x1 = roi
+        r, g, b, a = to_rgba(color)
+        cov = self._mask[y0:y1, x0:x1].astype(np.float32) * (alpha * a / 255.0)
+        if not cov.any():
+            return
+        dst = self.pixels[y0:y1, x0:x1]
+        dst_a = dst[..., 3].astype(np.float32) / 255.0
+        out_a = cov + dst_a * (1.0 - cov)
+        safe = np.where(out_a > 0, out_a, 1.0)[..., np.newaxis]
+        src_rgb = np.array([r, g, b], dtype=np.float32) * 255.0
+        rgb = (src_rgb * cov[..., np.newaxis] + dst[..., :3] * (dst_a * (1.0 - cov))[..., np.newaxis]) / safe
+        dst[..., :3] = (rgb + 0.5).astype(np.uint8)
+        dst[..., 3] = (out_a * 255.0 + 0.5).astype(np.uint8)
+
+def _fixed(px, py):
+    return np.round(np.stack([px, py], axis=-1) * _SCALE).astype(np.int32).reshape(-1, 1, 2)
@@ -0,0 +1,204 @@
+import os
+import sys
+import ast
+import json
+import hashlib
+import inspect
+import importlib
+import numpy as np
+
+# Centrale effect-registry. De manifest wordt uit de broncode gehaald (ast, zonder
+# effectmodules te importeren) en gecached; modules worden pas bij eerste gebruik geladen.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EFFECTS_DIR = os.path.join(REPO_ROOT, "effects")
+PREVIEW_DIR = os.path.join(REPO_ROOT, "previews1")
+MANIFEST_VERSION = 4
+
+# Parameters die de engine aan effecten kan doorgeven
+ENGINE_PARAMS = ("opacity", "color", "strength", "image_path", "detail", "warp_mode", "features")
+
+_manifest = None
+_modules = {}
+_loaded_hashes = {}
+
+def _manifest_path():
+    path = os.path.join(os.path.expanduser("~"), ".cache", "supervisual")
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, "effects_manifest.json")
+
+def _describe(name, path, source):
+    # Functies, parameters en defaults uit de broncode lezen
+    tree = ast.parse(source, filename=path)
+    functions = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in ("render", "setup", "update", "draw", "frame_key"):
+            args = node.args.args
+            defaults = [None] * (len(args) - len(node.args.defaults)) + list(node.args.defaults)
+            params = {}
+            for arg, default in zip(args, defaults):
+                try:
+                    params[arg.arg] = ast.literal_eval(default) if default is not None else None
+                except ValueError:
+                    params[arg.arg] = None
+            functions[node.name] = params
+    render_params = functions.get("render", {})
+    preview = os.path.join(PREVIEW_DIR, f"{name}.gif")
+    return {
+        "name": name,
+        "path": path,
+        "hash": hashlib.sha1(source.encode("utf-8")).hexdigest(),
+        "protocols": sorted(functions),
+        "params": {k: v for k, v in render_params.items() if k in ENGINE_PARAMS},
+        "preview": preview if os.path.exists(preview) else None,
+    }
+
+def manifest(refresh=False):
+    # {naam: beschrijving}; alleen gewijzigde bestanden (mtime/grootte) worden opnieuw geparsed
+    global _manifest
+    if _manifest is not None and not refresh:
+        return _manifest
+    cached = {}
+    try:
+        with open(_manifest_path()) as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            cached = data.get("effects", {})
+    except (OSError, ValueError):
+        pass
+
+    effects = {}
+    changed = False
+    for fname in sorted(os.listdir(EFFECTS_DIR)):
+        if not fname.endswith(".py") or fname.startswith("__"):
+            continue
+        name = fname[:-3]
+        path = os.path.join(EFFECTS_DIR, fname)
+        st = os.stat(path)
+        entry = cached.get(name)
+        if entry and entry.get("mtime") == st.st_mtime_ns and entry.get("size") == st.st_size:
+            preview = os.path.join(PREVIEW_DIR, f"{name}.gif")
+            entry["preview"] = preview if os.path.exists(preview) else None
+            effects[name] = entry
+            continue
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        try:
+            entry = _describe(name, path, source)
+        except SyntaxError as e:
+            print(f"⚠️ Effect '{name}' kan niet geparsed worden: {e}")
+            continue
+        entry["mtime"] = st.st_mtime_ns
+        entry["size"] = st.st_size
+        effects[name] = entry
+        changed = True
+
+    if changed or set(effects) != set(cached):
+        try:
+            with open(_manifest_path(), "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "effects": effects}, f, indent=1)
+        except OSError:
+            pass
+    _manifest = effects
+    return effects
+
+def available_effects(exclude=()):
+    return sorted(name for name in manifest() if name not in exclude)
+
+def preview_asset(name):
+    entry = manifest().get(name)
+    return entry["preview"] if entry else None
+
+def source_hash(name):
+    entry = manifest().get(name)
+    return entry["hash"] if entry else None
+
+def load(name):
+    # Lazy import bij eerste gebruik
+    mod = _modules.get(name)
+    if mod is None:
+        mod = importlib.import_module(f"effects.{name}")
+        _modules[name] = mod
+        _loaded_hashes[name] = source_hash(name)
+    return mod
+
+def reload_changed():
+    # Voor langlevende processen (render worker): manifest opnieuw lezen en geladen
+    # effecten waarvan de bron sindsdien veranderd is opnieuw importeren, zodat de code
+    # klopt met de hash in de cachesleutels. Lukt dat niet, dan gaat de module eruit
+    # en faalt het volgende load() in plaats van met de oude code te renderen.
+    effects = manifest(refresh=True)
+    reloaded = []
+    for name, mod in list(_modules.items()):
+        entry = effects.get(name)
+        if entry is not None and entry["hash"] == _loaded_hashes.get(name):
+            continue
+        try:
+            if entry is None:
+                raise ImportError("bron niet (meer) leesbaar")
+            _modules[name] = importlib.reload(mod)
+            _loaded_hashes[name] = entry["hash"]
+            reloaded.append(name)
+        except Exception as e:
+            print(f"⚠️ Effect '{name}' kon niet opnieuw geladen worden: {e}")
+            _modules.pop(name, None)
+            _loaded_hashes.pop(name, None)
+            sys.modules.pop(f"effects.{name}", None)
+    return reloaded
+
+def _accepts(func, name):
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in params or any(p.kind == p.VAR_KEYWORD for p in params.values())
+
+def input_key(chunk, features=None):
+    # Standaard frame-sleutel: alles wat een effect kan zien (audio-chunk, scalaire
+    # features en de mel-history). Gelijke sleutel = identiek frame.
+    from .features import HISTORY
+    h = hashlib.blake2b(np.ascontiguousarray(chunk).tobytes(), digest_size=16)
+    if features is not None:
+        h.update(np.float64([features.rms, features.mean_abs, features.peak, features.onset]).tobytes())
+        h.update(np.ascontiguousarray(features.history(HISTORY)).tobytes())
+    return h.digest()
+
+class Binding:
+    # Eén keer per job bepaald: welke argumenten een effect krijgt
+    def __init__(self, module, values):
+        self.module = module
+        self.values = values
+        # Optioneel: frame_key(chunk, params, features) geeft een goedkope sleutel
+        # waarvan het frame volledig afhangt (bv. alleen de energie)
+        self.frame_key = getattr(module, "frame_key", None)
+        render = getattr(module, "render", None)
+        self.kwargs = {}
+        self.render_features = False
+        if render is not None:
+            # Ontbrekende waarden niet meegeven: dan geldt de default van het effect
+            for key in ("opacity", "color", "strength", "image_path", "detail", "warp_mode"):
+                if values.get(key) is None:
+                    continue
+                if key in ("opacity", "color") or _accepts(render, key):
+                    self.kwargs[key] = values[key]
+            self.render_features = _accepts(render, "features")
+        update = getattr(module, "update", None)
+        self.update_features = update is not None and _accepts(update, "features")
+
+    def render(self, ax, chunk, features=None):
+        if self.render_features:
+            return self.module.render(ax, chunk, features=features, **self.kwargs)
+        return self.module.render(ax, chunk, **self.kwargs)
+
+    def key(self, chunk, features=None):
+        if self.frame_key is not None:
+            return self.frame_key(chunk, self.values, features)
+        return input_key(chunk, features)
+
+    def update(self, state, chunk, features=None):
+        if self.update_features:
+            return self.module.update(state, chunk, features)
+        return self.module.update(state, chunk)
+
+def bind(module, values):
+    return Binding(module, values)
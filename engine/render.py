@@ -1,28 +1,204 @@
 import os
+import json
+import time
 import subprocess
+import numpy as np
 
 def extract_audio(input_video, out_wav):
     cmd = ["ffmpeg", "-y", "-i", input_video, "-q:a", "0", "-map", "a", out_wav]
     subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-def render_overlay_from_frames(frame_dir, fps, output_overlay):
-    cmd = [
-        "ffmpeg", "-y", "-framerate", str(fps),
-        "-i", os.path.join(frame_dir, "frame_%05d.png"),
-        "-c:v", "libx264", "-pix_fmt", "yuva420p", output_overlay
+def probe_video_size(path):
+    # Grootte (breedte, hoogte) van de eerste videostream volgens ffprobe, in opgeslagen
+    # pixels zoals de overlay-filter ermee werkt (niet-vierkante pixels blijven staan);
+    # rotatie wordt verrekend omdat ffmpeg de invoer automatisch draait. None als het niet lukt
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "stream=width,height:stream_tags=rotate:stream_side_data=rotation",
+           "-of", "json", path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True).stdout
+        stream = json.loads(out)["streams"][0]
+        width, height = int(stream["width"]), int(stream["height"])
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    rotation = stream.get("tags", {}).get("rotate", 0)
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+    return width, height
+
+def probe_frame_rate(path):
+    # Framerate van de eerste videostream als ffmpeg-breuk ("30000/1001"), None als onbekend.
+    # avg_frame_rate eerst; bij variabele framerate is r_frame_rate vaak een veelvoud.
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "stream=avg_frame_rate,r_frame_rate", "-of", "json", path]
+    try:
+        stream = json.loads(subprocess.run(cmd, capture_output=True, text=True).stdout)["streams"][0]
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    for field in ("avg_frame_rate", "r_frame_rate"):
+        num, _, den = str(stream.get(field, "")).partition("/")
+        if num.isdigit() and den.isdigit() and int(num) > 0 and int(den) > 0:
+            return stream[field]
+    return None
+
+def rate_value(rate):
+    # "30000/1001" -> 29.97
+    num, _, den = str(rate).partition("/")
+    return float(num) / float(den or 1)
+
+def rawvideo_input(width, height, fps):
+    # ffmpeg input-argumenten voor RGBA frames die via stdin binnenkomen
+    return [
+        "-f", "rawvideo", "-pix_fmt", "rgba",
+        "-s", f"{width}x{height}", "-framerate", str(fps),
+        "-i", "-"
     ]
-    subprocess.run(cmd)
-
-def composite_overlay(input_video, overlay_video, output_final):
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", input_video,
-        "-i", overlay_video,
-        "-filter_complex", "[0:v][1:v] overlay=(W-w)/2:(H-h)/2:format=auto",
+
+def _preset_args(preset):
+    return ["-preset", preset] if preset else []
+
+def encode_overlay_cmd(output, width, height, fps, pix_fmt="yuv420p", codec="libx264", vfr=False, upscale=None, preset=None):
+    # vfr: exact gelijke opeenvolgende frames laten vallen (mpdecimate zonder marge),
+    # de container krijgt variabele timestamps
+    # upscale=(w, h): draft-frames in deze stap naar de volle grootte schalen
+    filters = [f"scale={upscale[0]}:{upscale[1]}"] if upscale else []
+    if vfr:
+        filters += [f"format={pix_fmt}", "mpdecimate=hi=0:lo=0:frac=0"]
+    vf_args = ["-vf", ",".join(filters)] if filters else []
+    vfr_args = ["-fps_mode", "vfr"] if vfr else []
+    return ["ffmpeg", "-y"] + rawvideo_input(width, height, fps) + vf_args + vfr_args + [
+        "-c:v", codec, "-pix_fmt", pix_fmt] + _preset_args(preset) + [output]
+
+def composite_cmd(input_video, width, height, fps, output, transparent=False, overlay=None, segment=None, gop=None,
+                  upscale=None, preset=None, rate=None):
+    # Eén ffmpeg graph: bronvideo (input 0) + RAW RGBA overlay via stdin (input 1),
+    # in één keer geëncodeerd. Geen tussenliggende overlay.mp4 meer.
+    # Met `overlay` komt input 1 uit een (gecachet) overlaybestand in plaats van stdin.
+    # Met `segment=(start, duration)` alleen dat stuk van de bronvideo, zonder audio
+    # (segmenten worden later met concat_cmd samengevoegd en van audio voorzien).
+    # Segmenten krijgen een vaste framerate en, met `gop`, keyframes op een vast raster
+    # (geen scene-cut keyframes), zodat de delen naadloos aan elkaar passen.
+    # Met `upscale=(w, h)` wordt een draft-overlay in de graph naar de volle grootte geschaald.
+    # `rate` is de framerate van de bronvideo (probe_frame_rate); segmenten houden die
+    # aan, de overlay-fps bepaalt alleen hoe vaak het effect verandert.
+    scale = f",scale={upscale[0]}:{upscale[1]}" if upscale else ""
+    if transparent:
+        # Overlay with alpha (transparency)
+        graph = f"[1:v]format=rgba{scale}[ov];[0:v][ov]overlay=shortest=1:format=auto[v]"
+    else:
+        graph = f"[1:v]format=rgba{scale}[ov];[0:v][ov]overlay=(W-w)/2:(H-h)/2:format=auto[v]"
+    overlay_input = ["-i", overlay] if overlay else rawvideo_input(width, height, fps)
+    if segment is not None:
+        start, duration = segment
+        gop_args = ["-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"] if gop else []
+        return ["ffmpeg", "-y", "-ss", f"{start:.6f}", "-t", f"{duration:.6f}", "-i", input_video] + overlay_input + [
+            "-filter_complex", graph,
+            "-map", "[v]", "-an",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-r", str(rate or fps),
+        ] + _preset_args(preset) + gop_args + [
+            "-video_track_timescale", "90000",
+            "-t", f"{duration:.6f}",
+            output
+        ]
+    return ["ffmpeg", "-y", "-i", input_video] + overlay_input + [
+        "-filter_complex", graph,
+        "-map", "[v]", "-map", "0:a?",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p",
+    ] + _preset_args(preset) + [
         "-c:a", "copy",
-        output_final
+        output
     ]
-    subprocess.run(cmd)
+
+def write_concat_list(paths, list_file):
+    # Lijstbestand voor de ffmpeg concat demuxer (zoals gui/mp4_concat_gui.py)
+    with open(list_file, "w") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_file
+
+def concat_cmd(list_file, output, audio_source=None, fmt=None):
+    # Segmenten zonder opnieuw te encoderen achter elkaar plakken; optioneel de
+    # audio in één stuk uit audio_source erbij (geen gaten op segmentgrenzen)
+    cmd = ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_source:
+        cmd += ["-i", audio_source, "-map", "0:v", "-map", "1:a?"]
+    cmd += ["-c", "copy"]
+    if fmt:
+        cmd += ["-f", fmt]
+    return cmd + [output]
+
+def canvas_rgba(fig):
+    # Agg canvas buffer als (h, w, 4) uint8 array, zonder kopie
+    return np.asarray(fig.canvas.buffer_rgba())
+
+def canvas_size(fig):
+    # Werkelijke pixelgrootte van het canvas (kan afwijken van figsize*dpi op HiDPI-backends)
+    fig.canvas.draw()
+    height, width = canvas_rgba(fig).shape[:2]
+    return width, height
+
+class FrameWriter:
+    # Streamt RGBA frames als rawvideo naar een ffmpeg proces (geen PNG per frame).
+    # Met debug_frame_dir wordt elk frame daarnaast als PNG weggeschreven.
+    # Met een EventReporter wordt de tijd als "serialise" (frame naar bytes) en
+    # "encode" (schrijven naar de pipe, dus wachten op ffmpeg) geteld.
+    # Stopt ffmpeg zelf eerder (de composite-graph eindigt met de bronvideo), dan is de
+    # writer `finished` en worden de resterende frames genegeerd.
+    def __init__(self, cmd, debug_frame_dir=None, frame_offset=0, reporter=None):
+        self.cmd = cmd
+        self.debug_frame_dir = debug_frame_dir
+        self.frame_offset = frame_offset
+        self.reporter = reporter
+        if debug_frame_dir:
+            os.makedirs(debug_frame_dir, exist_ok=True)
+        self.frame_count = 0
+        self.finished = False
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        # False als ffmpeg geen frames meer aanneemt
+        if self.finished:
+            return False
+        t0 = time.perf_counter()
+        if self.debug_frame_dir:
+            from PIL import Image
+            frame_path = os.path.join(self.debug_frame_dir, f"frame_{self.frame_offset + self.frame_count:05d}.png")
+            Image.fromarray(np.ascontiguousarray(frame), "RGBA").save(frame_path)
+        data = memoryview(np.ascontiguousarray(frame)).cast("B")
+        t1 = time.perf_counter()
+        try:
+            self.proc.stdin.write(data)
+        except BrokenPipeError:
+            self.finished = True
+            return False
+        self.frame_count += 1
+        if self.reporter is not None:
+            self.reporter.add("serialise", t1 - t0)
+            self.reporter.add("encode", time.perf_counter() - t1)
+        return True
+
+    def close(self):
+        t0 = time.perf_counter()
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.proc.wait()
+        if self.reporter is not None:
+            self.reporter.add("encode", time.perf_counter() - t0)
+        if returncode != 0:
+            print(f"[WARN] ffmpeg stopte met code {returncode}: {' '.join(self.cmd)}")
+        return returncode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 def clean_temp(paths):
     for p in paths:
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from . import registry
+from .overlay_cache import engine_hash
+
+# Checkpointing voor lange renders. De tijdlijn wordt in segmenten van vaste lengte
+# gerenderd; elk afgerond segment staat als los bestand in een jobmap en in job.json.
+# Een herstarte job met dezelfde parameters slaat afgeronde segmenten over.
+# Na succes verdwijnt de jobmap; mappen van mislukte of afgebroken jobs worden na
+# SUPERVISUAL_JOB_MAX_DAYS dagen zonder voortgang opgeruimd (of via de CLI hieronder).
+
+SEGMENT_SECONDS = 60
+MANIFEST_VERSION = 1
+DEFAULT_MAX_AGE = float(os.environ.get("SUPERVISUAL_JOB_MAX_DAYS", "7")) * 86400
+
+def jobs_dir():
+    path = os.path.join(os.path.expanduser("~"), ".cache", "supervisual", "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def file_identity(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+def job_key(input_video, audio_path, effects, settings):
+    # Zelfde bronbestanden + instellingen + broncode = zelfde segmenten
+    payload = {
+        "version": MANIFEST_VERSION,
+        "input": file_identity(input_video),
+        "audio": file_identity(audio_path),
+        "effects": [[name, registry.source_hash(name)] for name in effects],
+        "engine": engine_hash(),
+        "settings": settings,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+class JobManifest:
+    # job.json: {"segment_frames": n, "segments": {"<index>": {"frames": n, "files": [...]}}, "eof": bool}
+    def __init__(self, key, segment_frames, meta=None):
+        self.key = key
+        self.dir = os.path.join(jobs_dir(), key)
+        os.makedirs(self.dir, exist_ok=True)
+        self.path = os.path.join(self.dir, "job.json")
+        data = None
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if not data or data.get("version") != MANIFEST_VERSION or data.get("segment_frames") != segment_frames:
+            data = {"version": MANIFEST_VERSION, "segment_frames": segment_frames, "segments": {}, "eof": False}
+        data.update(meta or {})
+        # Segmenten waarvan een bestand ontbreekt opnieuw renderen
+        for index, seg in list(data["segments"].items()):
+            if not all(os.path.exists(self.file(name)) for name in seg["files"]):
+                del data["segments"][index]
+                data["eof"] = False
+        self.data = data
+        self.save()
+        prune(keep={key})
+
+    @property
+    def segment_frames(self):
+        return self.data["segment_frames"]
+
+    def file(self, name):
+        return os.path.join(self.dir, name)
+
+    def segment_file(self, index, suffix):
+        return self.file(f"seg_{index:05d}{suffix}")
+
+    def is_done(self, index):
+        return str(index) in self.data["segments"]
+
+    def completed(self):
+        return sorted(int(i) for i in self.data["segments"])
+
+    def completed_frames(self):
+        return sum(seg["frames"] for seg in self.data["segments"].values())
+
+    @property
+    def finished(self):
+        # Alle segmenten klaar: het laatste segment is tot het einde van de audio gerenderd
+        return self.data["eof"] and self.completed() == list(range(len(self.data["segments"])))
+
+    def mark_done(self, index, frames, files):
+        self.data["segments"][str(index)] = {"frames": frames, "files": [os.path.basename(p) for p in files]}
+        self.save()
+
+    def mark_eof(self):
+        self.data["eof"] = True
+        self.save()
+
+    def files(self, position=0):
+        # Bestanden van alle segmenten op volgorde; position kiest welk bestand per segment
+        return [self.file(self.data["segments"][str(i)]["files"][position]) for i in self.completed()]
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+def entries():
+    # Alle jobmappen, meest recent bijgewerkt eerst (job.json wordt per segment opgeslagen)
+    result = []
+    for key in os.listdir(jobs_dir()):
+        path = os.path.join(jobs_dir(), key)
+        if not os.path.isdir(path):
+            continue
+        manifest = os.path.join(path, "job.json")
+        meta = {}
+        try:
+            with open(manifest) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        size = 0
+        for name in os.listdir(path):
+            try:
+                size += os.path.getsize(os.path.join(path, name))
+            except OSError:
+                pass
+        updated = os.path.getmtime(manifest) if os.path.exists(manifest) else os.path.getmtime(path)
+        result.append({"key": key, "dir": path, "size": size, "updated": updated,
+                       "segments": len(meta.get("segments", {})), "output": meta.get("output"),
+                       "input_video": meta.get("input_video")})
+    result.sort(key=lambda e: e["updated"], reverse=True)
+    return result
+
+def prune(max_age=DEFAULT_MAX_AGE, keep=()):
+    # Jobmappen zonder voortgang in de laatste max_age seconden weg; sleutels in `keep` blijven
+    removed = []
+    now = time.time()
+    for entry in entries():
+        if entry["key"] not in keep and now - entry["updated"] > max_age:
+            shutil.rmtree(entry["dir"], ignore_errors=True)
+            removed.append(entry)
+    return removed
+
+def plan(blocks, manifest, samples_per_frame, runs):
+    # Blokken (start, audio, features) inkorten tot de frames van nog niet afgeronde
+    # segmenten. Per doorgelaten stuk komt (segment, start, n) in `runs`, zodat de
+    # consument weet bij welk segment elk gerenderd frame hoort.
+    spf, seg_frames = samples_per_frame, manifest.segment_frames
+    for start, audio, features in blocks:
+        n = len(audio) // spf
+        a = 0
+        while a < n:
+            index = (start + a) // seg_frames
+            b = min(n, (index + 1) * seg_frames - start)
+            if not manifest.is_done(index):
+                runs.append((index, start + a, b - a))
+                yield start + a, audio[a * spf:b * spf], features
+            a = b
+
+def _format_size(n):
+    return f"{n / 1024 ** 2:.1f} MB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune checkpoints of unfinished render jobs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List unfinished jobs (most recently updated first)")
+    p_prune = sub.add_parser("prune", help="Remove jobs without progress for a number of days")
+    p_prune.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE / 86400, help="Age limit in days")
+    sub.add_parser("clear", help="Remove every job checkpoint")
+    p_rm = sub.add_parser("remove", help="Remove one job by key (prefix)")
+    p_rm.add_argument("key")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        items = entries()
+        for entry in items:
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["updated"]))
+            print(f"{entry['key'][:12]}  {_format_size(entry['size']):>9}  {updated}  {entry['segments']} segmenten  {entry.get('output') or ''}")
+        print(f"{len(items)} jobs, {_format_size(sum(e['size'] for e in items))} in {jobs_dir()}")
+    elif args.command == "prune":
+        removed = prune(args.max_age * 86400)
+        print(f"{len(removed)} jobs verwijderd ({_format_size(sum(e['size'] for e in removed))})")
+    elif args.command == "clear":
+        removed = prune(-1)
+        print(f"{len(removed)} jobs verwijderd")
+    elif args.command == "remove":
+        matches = [e for e in entries() if e["key"].startswith(args.key)]
+        if len(matches) != 1:
+            print(f"Geen unieke job voor '{args.key}' ({len(matches)} treffers)")
+            sys.exit(1)
+        shutil.rmtree(matches[0]["dir"], ignore_errors=True)
+        print(f"Verwijderd: {matches[0]['key']}")
+
+if __name__ == "__main__":
+    main()
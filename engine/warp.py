@@ -0,0 +1,140 @@
+import numpy as np
+import cv2
+
+# Warp-engine voor foto-effecten. Scheidbare verplaatsingen (alleen per rij of per
+# kolom) worden als 1-D verschuiving uitgevoerd: per frame worden alleen één
+# integer- en één fractievector (vaste komma) berekend. Rijen met dezelfde integer
+# verschuiving vormen een band die als één slice uit een eenmalig gerande bron komt;
+# de fractie wordt per rij gebroadcast, er worden geen volledige maps opgebouwd.
+# Radiaal en swirl zijn gevectoriseerde kernels op vooraf berekende
+# poolcoördinaten, met herbruikbare buffers.
+
+MODES = ("horizontal", "vertical", "radial", "swirl")
+
+# Zelfde resolutie als OpenCV's vaste-komma remap (INTER_BITS = 5)
+INTER_BITS = 5
+INTER_TAB_SIZE = 1 << INTER_BITS
+
+class Warper:
+    def __init__(self, rgba, border=cv2.BORDER_REFLECT):
+        self.src = np.ascontiguousarray(rgba)
+        h, w = self.src.shape[:2]
+        self.height, self.width = h, w
+        self.border = border
+        self._padded = {}   # as -> (rand, bron met rand langs die as)
+        self._acc = None    # uint16 werkbuffers voor de vaste-komma interpolatie
+        self._polar = None  # dx, dy, r, r_norm ten opzichte van het midden
+        self._float = None  # herbruikbare float32 maps + werkbuffers
+        self._falloff = {}
+
+    # --- scheidbaar: verschuiving per rij of per kolom ---
+
+    def _padded_src(self, margin, axis):
+        # Bron met `margin` pixels rand (zelfde border als remap) langs de verschuivingsas;
+        # alleen opnieuw opgebouwd als een grotere verschuiving meer rand nodig heeft
+        padded = self._padded.get(axis)
+        if padded is None or padded[0] < margin:
+            margin = max(margin, 16)
+            borders = (0, 0, margin, margin) if axis == 0 else (margin, margin, 0, 0)
+            padded = self._padded[axis] = (margin, cv2.copyMakeBorder(self.src, *borders, self.border))
+        return padded
+
+    def _shift(self, shift, axis):
+        # axis 0: x verschuift per rij (shift heeft lengte h), axis 1: y per kolom (lengte w).
+        # dst = src op positie + shift, lineair geïnterpoleerd in 1/32 pixel (zoals remap)
+        q = np.rint(np.asarray(shift, dtype=np.float32) * INTER_TAB_SIZE).astype(np.int32)
+        whole = q >> INTER_BITS
+        frac = (q & (INTER_TAB_SIZE - 1)).astype(np.uint16)
+        inv = (INTER_TAB_SIZE - frac).astype(np.uint16)
+        margin, padded = self._padded_src(int(np.abs(whole).max(initial=0)) + 1, axis)
+        if self._acc is None:
+            self._acc = (np.empty(self.src.shape, dtype=np.uint16), np.empty(self.src.shape, dtype=np.uint16))
+        acc, tmp = self._acc
+        if axis == 1:
+            # Kolommen als rijen behandelen via getransponeerde views
+            padded, acc, tmp = padded.swapaxes(0, 1), acc.swapaxes(0, 1), tmp.swapaxes(0, 1)
+        n, length = acc.shape[:2]
+        tail = (1,) * (acc.ndim - 2)
+        # Banden: aaneengesloten rijen met dezelfde integer verschuiving
+        edges = np.flatnonzero(np.diff(whole)) + 1
+        for r0, r1 in zip(np.concatenate(([0], edges)), np.concatenate((edges, [n]))):
+            s = margin + int(whole[r0])
+            np.multiply(padded[r0:r1, s:s + length], inv[r0:r1].reshape((-1, 1) + tail), out=acc[r0:r1])
+            np.multiply(padded[r0:r1, s + 1:s + 1 + length], frac[r0:r1].reshape((-1, 1) + tail), out=tmp[r0:r1])
+        acc, tmp = self._acc
+        acc += tmp
+        acc += INTER_TAB_SIZE // 2
+        acc >>= INTER_BITS
+        return acc.astype(np.uint8)
+
+    def shift_rows(self, shift):
+        # Horizontale verschuiving in pixels, één waarde per rij
+        return self._shift(shift, 0)
+
+    def shift_cols(self, shift):
+        # Verticale verschuiving in pixels, één waarde per kolom
+        return self._shift(shift, 1)
+
+    # --- niet-scheidbaar: radiaal en swirl ---
+
+    def _polar_grid(self):
+        if self._polar is None:
+            h, w = self.height, self.width
+            cy, cx = (h - 1) / 2, (w - 1) / 2
+            dy, dx = np.indices((h, w), dtype=np.float32)
+            dx -= cx
+            dy -= cy
+            r = np.hypot(dx, dy)
+            r_norm = r / max(1.0, float(r.max()))
+            np.maximum(r, 1e-3, out=r)  # delen door r zonder nullen
+            self._polar = (dx, dy, r, r_norm)
+        return self._polar
+
+    def _float_maps(self):
+        if self._float is None:
+            shape = (self.height, self.width)
+            self._float = tuple(np.empty(shape, dtype=np.float32) for _ in range(5))
+        return self._float
+
+    def remap(self, map_x, map_y):
+        return cv2.remap(self.src, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=self.border)
+
+    def radial(self, freq, amp):
+        # Rimpeling langs de straal: r' = r + amp * sin(pi * freq * r_norm)
+        dx, dy, r, r_norm = self._polar_grid()
+        map_x, map_y, a = self._float_maps()[:3]
+        cx, cy = (self.width - 1) / 2, (self.height - 1) / 2
+        np.multiply(r_norm, np.float32(np.pi * freq), out=a)
+        np.sin(a, out=a)
+        a *= np.float32(amp)
+        a /= r
+        a += 1.0
+        np.multiply(dx, a, out=map_x)
+        map_x += cx
+        np.multiply(dy, a, out=map_y)
+        map_y += cy
+        return self.remap(map_x, map_y)
+
+    def swirl(self, angle, radius=1.0):
+        # Draaiing rond het midden, maximaal `angle` radialen in het centrum en
+        # aflopend tot nul op `radius` (fractie van de halve diagonaal)
+        dx, dy, r, r_norm = self._polar_grid()
+        map_x, map_y, c, s, t = self._float_maps()
+        falloff = self._falloff.get(radius)
+        if falloff is None:
+            falloff = (np.clip(1.0 - r_norm / radius, 0.0, 1.0) ** 2).astype(np.float32)
+            self._falloff = {radius: falloff}
+        np.multiply(falloff, np.float32(angle), out=s)
+        np.cos(s, out=c)
+        np.sin(s, out=s)
+        cx, cy = (self.width - 1) / 2, (self.height - 1) / 2
+        # map = midden + R(angle) * (dx, dy)
+        np.multiply(dx, c, out=map_x)
+        np.multiply(dy, s, out=t)
+        map_x -= t
+        map_x += cx
+        np.multiply(dx, s, out=map_y)
+        np.multiply(dy, c, out=t)
+        map_y += t
+        map_y += cy
+        return self.remap(map_x, map_y)
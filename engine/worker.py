@@ -0,0 +1,281 @@
+import os
+import sys
+import time
+import queue
+import secrets
+import itertools
+import threading
+import traceback
+import contextlib
+import subprocess
+from multiprocessing.connection import Listener, Client
+
+# Langlevend lokaal render-proces. GUI's sturen jobs via een lokale socket
+# (named pipe op Windows); het proces houdt librosa, matplotlib, cv2 en de
+# effecten geladen, voert jobs in volgorde uit en streamt log en voortgang terug.
+#
+# Protocol (gepickelde dicts via multiprocessing.connection):
+#   client -> {"type": "job", "kind": "render" | "preview", "args": {...}}
+#   worker -> {"type": "queued", "position": n, "job": id}
+#             {"type": "started"}
+#             {"type": "log", "line": str}
+#             {"type": "event", "event": {...}}   voortgang/timing, zie engine/events.py
+#             {"type": "done", "ok": bool, "output": str | None, "error": str | None, "cancelled": bool}
+#   client -> {"type": "ping"}  -> {"type": "pong", "pid": int}
+#   client -> {"type": "cancel", "job": id}  -> {"type": "cancelling", "job": id, "found": bool}
+#
+# Annuleren gebeurt netjes bij het volgende voortgangsevent: de engine ruimt het
+# lopende segment op, afgeronde segmenten blijven staan voor een herstart.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _state_dir():
+    path = os.path.join(os.path.expanduser("~"), ".cache", "supervisual")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+def worker_address():
+    if sys.platform == "win32":
+        return r"\\.\pipe\supervisual-worker"
+    return os.path.join(_state_dir(), "worker.sock")
+
+def _authkey():
+    # Willekeurige sleutel per gebruiker, zodat alleen eigen processen jobs kunnen sturen
+    path = os.path.join(_state_dir(), "worker.key")
+    if not os.path.exists(path):
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_bytes(32))
+    with open(path, "rb") as f:
+        return f.read()
+
+def _run_render(args, events):
+    from .engine import run_visual_engine
+    return run_visual_engine(events=events, **args)
+
+def _run_preview(args, events):
+    import preview_mp4
+    return preview_mp4.make_preview(events=events, **args)
+
+class JobCancelled(Exception):
+    pass
+
+JOBS = {
+    "render": _run_render,
+    "preview": _run_preview,
+}
+
+class _LineWriter:
+    # stdout van een job regel voor regel naar de client sturen
+    def __init__(self, send):
+        self.send = send
+        self.buf = ""
+
+    def write(self, text):
+        self.buf += text
+        while "\n" in self.buf:
+            line, self.buf = self.buf.split("\n", 1)
+            self.send({"type": "log", "line": line})
+        return len(text)
+
+    def flush(self):
+        pass
+
+class _ThreadOutput:
+    # Vervangt sys.stdout één keer, bij het starten van de worker. Alleen de jobthread
+    # schrijft (binnen redirect) naar de client; andere threads (verbindingen, listener)
+    # blijven in de worker-log, zonder dat sys.stdout per job wisselt.
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "writer", None) or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        # encoding, fileno, isatty, ... van de echte stdout
+        return getattr(self.default, name)
+
+    @contextlib.contextmanager
+    def redirect(self, writer):
+        self.local.writer = writer
+        try:
+            yield
+        finally:
+            self.local.writer = None
+
+class RenderWorker:
+    def __init__(self, address=None):
+        self.address = address or worker_address()
+        self.jobs = queue.Queue()
+        self.ids = itertools.count(1)
+        self.cancel_events = {}
+        self.output = None
+
+    def warm_up(self):
+        # Zware modules en alle effecten één keer laden
+        import librosa, matplotlib, cv2, numpy
+        from . import engine, frames, features, audio, parallel, registry
+        frames.load_effects(registry.available_effects())
+
+    def serve(self):
+        if sys.platform != "win32" and os.path.exists(self.address):
+            if ping(self.address):
+                print("Render worker draait al")
+                return
+            os.unlink(self.address)
+        listener = Listener(self.address, authkey=_authkey())
+        print(f"Render worker luistert op {self.address} (pid {os.getpid()})", flush=True)
+        self.output = sys.stdout = _ThreadOutput(sys.stdout)
+        self.warm_up()
+        threading.Thread(target=self._run_jobs, daemon=True).start()
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"[WARN] Verbinding geweigerd: {e}", flush=True)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _handle(self, conn):
+        try:
+            msg = conn.recv()
+        except EOFError:
+            conn.close()
+            return
+        kind = msg.get("type")
+        if kind == "ping":
+            conn.send({"type": "pong", "pid": os.getpid()})
+            conn.close()
+        elif kind == "job" and msg.get("kind") in JOBS:
+            job_id = next(self.ids)
+            cancel = self.cancel_events[job_id] = threading.Event()
+            conn.send({"type": "queued", "position": self.jobs.qsize(), "job": job_id})
+            self.jobs.put((msg, conn, job_id, cancel))
+        elif kind == "cancel":
+            cancel = self.cancel_events.get(msg.get("job"))
+            if cancel is not None:
+                cancel.set()
+            conn.send({"type": "cancelling", "job": msg.get("job"), "found": cancel is not None})
+            conn.close()
+        else:
+            conn.send({"type": "done", "ok": False, "output": None, "error": f"Onbekend bericht: {msg!r}"})
+            conn.close()
+
+    def _run_jobs(self):
+        from . import registry
+        while True:
+            msg, conn, job_id, cancel = self.jobs.get()
+
+            def send(message, conn=conn):
+                try:
+                    conn.send(message)
+                except (OSError, EOFError):
+                    pass  # client is weg; job loopt gewoon af
+
+            def events(event, send=send, cancel=cancel):
+                if event["event"] == "progress" and cancel.is_set():
+                    raise JobCancelled()
+                send({"type": "event", "event": event})
+
+            try:
+                if cancel.is_set():
+                    raise JobCancelled()
+                send({"type": "started"})
+                with self.output.redirect(_LineWriter(send)):
+                    # Effecten die sinds het laden bewerkt zijn eerst opnieuw importeren
+                    for name in registry.reload_changed():
+                        print(f"🔁 Effect '{name}' opnieuw geladen")
+                    output = JOBS[msg["kind"]](dict(msg.get("args", {})), events)
+                send({"type": "done", "ok": True, "output": output, "error": None, "cancelled": False})
+            except JobCancelled:
+                send({"type": "done", "ok": False, "output": None, "error": "Geannuleerd", "cancelled": True})
+            except Exception as e:
+                traceback.print_exc()
+                send({"type": "done", "ok": False, "output": None, "error": str(e), "cancelled": False})
+            finally:
+                self.cancel_events.pop(job_id, None)
+                conn.close()
+
+def ping(address=None):
+    try:
+        conn = Client(address or worker_address(), authkey=_authkey())
+    except (OSError, EOFError):
+        return False
+    try:
+        conn.send({"type": "ping"})
+        return conn.recv().get("type") == "pong"
+    except (OSError, EOFError):
+        return False
+    finally:
+        conn.close()
+
+def start_worker():
+    # Worker als losstaand proces starten (log in ~/.cache/supervisual/worker.log)
+    log = open(os.path.join(_state_dir(), "worker.log"), "ab")
+    kwargs = {"cwd": REPO_ROOT, "stdout": log, "stderr": subprocess.STDOUT, "stdin": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, "-m", "engine.worker"], **kwargs)
+
+def connect(timeout=30.0):
+    # Verbinden met de worker; start hem als hij nog niet draait
+    address = worker_address()
+    try:
+        return Client(address, authkey=_authkey())
+    except (OSError, EOFError):
+        start_worker()
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return Client(address, authkey=_authkey())
+        except (OSError, EOFError):
+            if time.time() > deadline:
+                raise RuntimeError("Render worker start niet")
+            time.sleep(0.1)
+
+def cancel(job_id):
+    # Lopende of wachtende job stoppen; het "done"-bericht komt via de job-verbinding
+    try:
+        conn = Client(worker_address(), authkey=_authkey())
+    except (OSError, EOFError):
+        return False
+    try:
+        conn.send({"type": "cancel", "job": job_id})
+        return conn.recv().get("found", False)
+    except (OSError, EOFError):
+        return False
+    finally:
+        conn.close()
+
+def submit(kind, **args):
+    # Job naar de worker sturen; levert alle berichten op t/m "done"
+    conn = connect()
+    try:
+        conn.send({"type": "job", "kind": kind, "args": args})
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                yield {"type": "done", "ok": False, "output": None, "error": "Verbinding met render worker verbroken"}
+                return
+            yield msg
+            if msg.get("type") == "done":
+                return
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.path.insert(0, REPO_ROOT)
+    RenderWorker().serve()
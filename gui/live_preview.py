@@ -0,0 +1,258 @@
+import os
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel
+from PyQt6.QtCore import Qt, QThread, QTimer, QElapsedTimer, QUrl, pyqtSignal
+from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from engine import registry
+from engine import pcm_cache
+from engine.engine import analyze_audio
+from engine.frames import is_transparent, supports_retained
+
+# Live preview: speelt de audio af en tekent het effect op het tijdstip van de
+# speler. Retained effecten (setup/update) worden geblit: de achtergrond wordt één
+# keer gerenderd, per frame worden alleen de artists van het effect opnieuw getekend.
+# Loopt het tekenen achter, dan wordt meteen het frame van de huidige audiopositie
+# getekend en worden de tussenliggende frames overgeslagen.
+
+class AudioLoader(QThread):
+    # Features blok voor blok via AudioStream (zoals de render), zodat een lange mix
+    # niet in één keer in het geheugen hoeft; de PCM zelf blijft een memmap
+    loaded_signal = pyqtSignal(object, object)
+    progress_signal = pyqtSignal(int, int)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, path, sr, fps):
+        super().__init__()
+        self.path = path
+        self.sr = sr
+        self.fps = fps
+
+    def run(self):
+        try:
+            features = analyze_audio(self.path, fps=self.fps, sr=self.sr,
+                                     progress=lambda frame, total: self.progress_signal.emit(frame, total or 0))
+            # De stroom heeft de PCM-cache gevuld: dit is alleen nog een memmap
+            y = pcm_cache.load(self.path, self.sr)
+            self.loaded_signal.emit(y, features)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+class LivePreview(QWidget):
+    message_signal = pyqtSignal(str)
+
+    def __init__(self, fps=30, sr=44100, parent=None):
+        super().__init__(parent)
+        self.fps = fps
+        self.sr = sr
+        self.samples_per_frame = int(sr / fps)
+        self.params = {"opacity": 0.65, "color": "#FFFFFF", "strength": 0.5, "image_path": None,
+                       "detail": 1.0, "warp_mode": "horizontal"}
+        self.bg_color = "#000000"
+        self.effect_name = None
+        self.y = None
+        self.features = None
+        self.loader = None
+
+        layout = QVBoxLayout()
+        self.fig = Figure(figsize=(6.4, 4.8), dpi=100)
+        self.canvas = FigureCanvasQTAgg(self.fig)
+        self.canvas.setMinimumSize(320, 240)
+        self.ax = self.fig.subplots()
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        layout.addWidget(self.canvas)
+
+        controls = QHBoxLayout()
+        self.play_btn = QPushButton("▶️ Live preview")
+        self.play_btn.setEnabled(False)
+        self.play_btn.clicked.connect(self.toggle)
+        self.status = QLabel("Geen audio")
+        controls.addWidget(self.play_btn)
+        controls.addWidget(self.status)
+        layout.addLayout(controls)
+        self.setLayout(layout)
+
+        self.audio_output = QAudioOutput()
+        self.player = QMediaPlayer()
+        self.player.setAudioOutput(self.audio_output)
+        self.player.positionChanged.connect(self._on_position)
+        self.player.playbackStateChanged.connect(self._on_state)
+
+        # De speler meldt zijn positie grof; tussen meldingen wordt doorgeteld
+        self.clock = QElapsedTimer()
+        self.position_ms = 0
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(max(1, int(500 / fps)))
+        self.timer.timeout.connect(self._tick)
+
+        self.binding = None
+        self.state = None
+        self.retained = False
+        self.background = None
+        self.dirty = True
+        self.last_index = -1
+        self.drawn = 0
+        self.dropped = 0
+
+    # --- instellingen; gelden vanaf het volgende frame ---
+
+    def set_audio(self, path):
+        self.stop()
+        self.y = None
+        self.features = None
+        self.play_btn.setEnabled(False)
+        self.status.setText("Audio laden...")
+        self.player.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+        self.loader = AudioLoader(path, self.sr, self.fps)
+        self.loader.loaded_signal.connect(self._on_loaded)
+        self.loader.progress_signal.connect(self._on_load_progress)
+        self.loader.error_signal.connect(lambda msg: self.message_signal.emit(f"Audio laden mislukt: {msg}"))
+        self.loader.start()
+
+    def set_effect(self, name):
+        self.effect_name = name
+        self.dirty = True
+
+    def set_param(self, name, value):
+        if name == "bg_color":
+            self.bg_color = value
+        else:
+            self.params[name] = value
+        # setup() leest de parameters: artists opnieuw opbouwen bij het volgende frame
+        self.dirty = True
+
+    # --- afspelen ---
+
+    def toggle(self):
+        if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+            self.stop()
+        else:
+            self.play()
+
+    def play(self):
+        if self.y is None or not self.effect_name:
+            return
+        self.last_index = -1
+        self.drawn = 0
+        self.dropped = 0
+        self.player.setPosition(0)
+        self.player.play()
+        self.clock.start()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.player.stop()
+
+    def _on_load_progress(self, frame, total):
+        if self.sender() is not self.loader:
+            return  # inmiddels andere audio gekozen
+        seconds = frame / self.fps
+        if total:
+            self.status.setText(f"Audio analyseren... {min(100, 100 * frame // total)}% ({seconds:.0f}s)")
+        else:
+            self.status.setText(f"Audio analyseren... {seconds:.0f}s")
+
+    def _on_loaded(self, y, features):
+        if self.sender() is not self.loader:
+            return
+        self.y = y
+        self.features = features
+        self.status.setText(f"{len(y) / self.sr:.1f}s audio")
+        self.play_btn.setEnabled(True)
+
+    def _on_position(self, position):
+        self.position_ms = position
+        self.clock.restart()
+
+    def _on_state(self, state):
+        playing = state == QMediaPlayer.PlaybackState.PlayingState
+        self.play_btn.setText("⏹️ Stop" if playing else "▶️ Live preview")
+        if not playing:
+            self.timer.stop()
+            if self.drawn:
+                self.status.setText(f"{self.drawn} frames getekend, {self.dropped} overgeslagen")
+
+    def _tick(self):
+        ms = self.position_ms + (self.clock.elapsed() if self.clock.isValid() else 0)
+        index = int(ms * self.fps / 1000)
+        if index == self.last_index or index >= len(self.features):
+            return
+        if self.last_index >= 0 and index > self.last_index + 1:
+            self.dropped += index - self.last_index - 1
+        self.last_index = index
+        try:
+            self._draw_frame(index)
+        except Exception as e:
+            self.stop()
+            self.message_signal.emit(f"Preview fout: {e}")
+            return
+        self.drawn += 1
+        if self.drawn % self.fps == 0:
+            self.status.setText(f"{ms / 1000:.1f}s — {self.dropped} frames overgeslagen")
+
+    # --- tekenen ---
+
+    def _setup(self):
+        fig, ax = self.fig, self.ax
+        ax.clear()
+        if is_transparent(self.bg_color):
+            ax.set_facecolor((0, 0, 0, 0))
+            fig.patch.set_facecolor((0, 0, 0, 0))
+            fig.patch.set_alpha(0.0)
+        else:
+            ax.set_facecolor(self.bg_color)
+            fig.patch.set_facecolor(self.bg_color)
+            fig.patch.set_alpha(1.0)
+        ax.axis("off")
+        ax.set_xlim(-1.2, 1.2)
+        ax.set_ylim(-1.2, 1.2)
+        module = registry.load(self.effect_name)
+        self.binding = registry.bind(module, dict(self.params))
+        self.retained = supports_retained(module)
+        self.state = module.setup(ax, dict(self.params)) if self.retained else None
+        self.background = None
+        self.dirty = False
+        if self.retained:
+            for artist in self._animated():
+                artist.set_animated(True)
+            # Volledige draw; _on_draw bewaart de achtergrond voor het blitten
+            self.canvas.draw()
+
+    def _animated(self):
+        # Alles wat het effect per frame kan veranderen; de axes-patch alleen als
+        # matplotlib hem ook bij een volledige draw tekent (axis aan)
+        ax = self.ax
+        patch = [ax.patch] if ax.axison and ax.get_frame_on() else []
+        return patch + ax.lines + ax.patches + ax.images + ax.collections + ax.texts
+
+    def _on_draw(self, event):
+        if self.retained:
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _draw_frame(self, index):
+        spf = self.samples_per_frame
+        chunk = self.y[index * spf:(index + 1) * spf]
+        features = self.features.frame(index)
+        if self.dirty:
+            self._setup()
+        if not self.retained:
+            # Immediate-mode effect: elke frame opnieuw opbouwen en volledig tekenen
+            self.ax.clear()
+            self.ax.axis("off")
+            self.ax.set_facecolor((0, 0, 0, 0) if is_transparent(self.bg_color) else self.bg_color)
+            self.ax.set_xlim(-1.2, 1.2)
+            self.ax.set_ylim(-1.2, 1.2)
+            self.binding.render(self.ax, chunk, features)
+            self.canvas.draw()
+            return
+        if self.background is None:
+            self.canvas.draw()
+        self.binding.update(self.state, chunk, features)
+        self.canvas.restore_region(self.background)
+        for artist in self._animated():
+            # Artists die update() net heeft aangemaakt (bv. spectrogram imshow)
+            artist.set_animated(True)
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.fig.bbox)
@@ -6,36 +6,12 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QMovie
-import subprocess
-import re
+from gui.worker_thread import WorkerJobThread
+from engine.warp import MODES as WARP_MODES
+from gui.live_preview import LivePreview
 
-class PhotoSpectroPreviewThread(QThread):
-    log_signal = pyqtSignal(str)
-    done_signal = pyqtSignal(bool, str)
-    progress_signal = pyqtSignal(int)
-    max_progress_signal = pyqtSignal(int)
-
-    def __init__(self, cmd, output_name):
-        super().__init__()
-        self.cmd = cmd
-        self.output_name = output_name
-
-    def run(self):
-        try:
-            with subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
-                for line in proc.stdout:
-                    self.log_signal.emit(line.rstrip())
-                    m = re.search(r"Frame (\d+)/(\d+)", line)
-                    if m:
-                        self.progress_signal.emit(int(m.group(1)))
-                        self.max_progress_signal.emit(int(m.group(2)))
-                proc.wait()
-                if proc.returncode == 0:
-                    self.done_signal.emit(True, os.path.abspath(self.output_name))
-                else:
-                    self.done_signal.emit(False, "❌ Geen output bestand")
-        except Exception as e:
-            self.done_signal.emit(False, f"❌ Error: {e}")
+class PhotoSpectroPreviewThread(WorkerJobThread):
+    pass
 
 class PhotoSpectroGUI(QWidget):
     thread_created = pyqtSignal(QThread)
@@ -81,6 +57,13 @@ class PhotoSpectroGUI(QWidget):
         slider_layout.addWidget(self.strength_slider)
         layout.addLayout(slider_layout)
 
+        # Vervorming van de foto
+        self.warp_mode = "horizontal"
+        self.warp_combo = QComboBox()
+        self.warp_combo.addItems(WARP_MODES)
+        self.warp_combo.currentTextChanged.connect(self.update_warp_mode)
+        layout.addWidget(self.warp_combo)
+
         # Preview GIF
         self.preview = QLabel()
         self.preview.setFixedSize(240, 135)
@@ -93,6 +76,12 @@ class PhotoSpectroGUI(QWidget):
             movie.start()
         layout.addWidget(self.preview)
 
+        # Live preview met audio
+        self.live = LivePreview()
+        self.live.set_effect("photo_spectrogram")
+        self.live.message_signal.connect(lambda msg: self.console.append(msg))
+        layout.addWidget(self.live)
+
         # Start knop
         self.run_btn = QPushButton("▶️ Genereer Preview")
         self.run_btn.clicked.connect(self.run_preview)
@@ -116,39 +105,50 @@ class PhotoSpectroGUI(QWidget):
         if file:
             self.audio_path = file
             self.audio_btn.setText(f"🎵 {os.path.basename(file)}")
+            self.live.set_audio(file)
 
     def choose_img(self):
         file, _ = QFileDialog.getOpenFileName(self, "Kies foto", "", "Afbeeldingen (*.jpg *.jpeg *.png *.bmp)")
         if file:
             self.img_path = file
             self.img_btn.setText(f"🖼️ {os.path.basename(file)}")
+            self.live.set_param("image_path", file)
 
     def pick_color(self):
         color = QColorDialog.getColor()
         if color.isValid():
             self.color = color.name()
             self.color_btn.setStyleSheet(f"background-color: {self.color};")
+            self.live.set_param("color", self.color)
 
     def update_strength(self, value):
         self.strength = value / 100.0
         self.strength_label.setText(f"Effect sterkte: {self.strength:.2f}")
+        self.live.set_param("strength", self.strength)
+
+    def update_warp_mode(self, mode):
+        self.warp_mode = mode
+        self.live.set_param("warp_mode", mode)
 
     def run_preview(self):
         if not self.audio_path or not self.img_path:
             self.console.setPlainText("⚠️ Kies zowel audio als foto!")
             return
-        output_name = self.output_input.text().strip() or "previews/photo_spectrogram_preview.mp4"
-        cmd = [
-            sys.executable, "preview_mp4.py", self.audio_path, "photo_spectrogram",
-            "--color", self.color,
-            "--image", self.img_path,
-            "--output", output_name,
-            "--strength", str(self.strength)
-        ]
-        self.console.setPlainText(f"▶️ Running: {' '.join(cmd)}")
+        # De worker heeft een eigen werkmap: paden absoluut meegeven
+        output_name = os.path.abspath(self.output_input.text().strip() or "previews/photo_spectrogram_preview.mp4")
+        args = {
+            "audio": self.audio_path,
+            "effect": "photo_spectrogram",
+            "color": self.color,
+            "image": self.img_path,
+            "output": output_name,
+            "strength": self.strength,
+            "warp_mode": self.warp_mode,
+        }
+        self.console.setPlainText(f"▶️ Preview job: photo_spectrogram → {output_name}")
         self.log.setText("")
         self.run_btn.setEnabled(False)
-        self.thread = PhotoSpectroPreviewThread(cmd, output_name)
+        self.thread = PhotoSpectroPreviewThread("preview", args, output_name)
         self.thread.log_signal.connect(lambda msg: self.console.append(msg))
         self.thread.progress_signal.connect(self.update_progress)
         self.thread.max_progress_signal.connect(self.set_progress_max)
@@ -1,42 +1,17 @@
 import os
 import sys
-import glob
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QPushButton, QVBoxLayout, QFileDialog,
-    QLabel, QComboBox, QColorDialog, QLineEdit, QTextEdit, QHBoxLayout
+    QLabel, QComboBox, QColorDialog, QLineEdit, QTextEdit, QHBoxLayout, QSlider
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QMovie
-import subprocess
-import re
+from gui.worker_thread import WorkerJobThread
+from engine import registry
+from gui.live_preview import LivePreview
 
-class PreviewThread(QThread):
-    log_signal = pyqtSignal(str)
-    done_signal = pyqtSignal(bool, str)
-    progress_signal = pyqtSignal(int)
-    max_progress_signal = pyqtSignal(int)
-
-    def __init__(self, cmd, output_name):
-        super().__init__()
-        self.cmd = cmd
-        self.output_name = output_name
-
-    def run(self):
-        try:
-            with subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
-                for line in proc.stdout:
-                    self.log_signal.emit(line.rstrip())
-                    m = re.search(r"Frame (\d+)/(\d+)", line)
-                    if m:
-                        self.progress_signal.emit(int(m.group(1)))
-                        self.max_progress_signal.emit(int(m.group(2)))
-                proc.wait()
-                if proc.returncode == 0:
-                    self.done_signal.emit(True, os.path.abspath(self.output_name))
-                else:
-                    self.done_signal.emit(False, "❌ Geen output bestand")
-        except Exception as e:
-            self.done_signal.emit(False, f"❌ Error: {e}")
+class PreviewThread(WorkerJobThread):
+    pass
 
 class PreviewMP4GUI(QWidget):
     thread_created = pyqtSignal(QThread)
@@ -50,11 +25,7 @@ class PreviewMP4GUI(QWidget):
         # Effect selector
         self.effect_label = QLabel("🎨 Effect:")
         self.effect_dropdown = QComboBox()
-        available_effects = sorted([
-            os.path.splitext(os.path.basename(f))[0]
-            for f in glob.glob("effects/*.py")
-            if not f.endswith("__init__.py")
-        ])
+        available_effects = registry.available_effects()
         self.effect_dropdown.addItems(available_effects)
         self.effect_dropdown.currentTextChanged.connect(self.update_preview)
 
@@ -81,6 +52,20 @@ class PreviewMP4GUI(QWidget):
         self.transparent_checkbox.setChecked(False)
         self.transparent_checkbox.clicked.connect(self.toggle_transparent_bg)
 
+        # Strength en opacity sliders (live preview past ze direct toe)
+        self.strength = 0.5
+        self.strength_label = QLabel("Effect sterkte: 0.50")
+        self.strength_slider = QSlider(Qt.Orientation.Horizontal)
+        self.strength_slider.setRange(0, 100)
+        self.strength_slider.setValue(50)
+        self.strength_slider.valueChanged.connect(self.update_strength)
+        self.opacity = 0.65
+        self.opacity_label = QLabel("Opacity: 0.65")
+        self.opacity_slider = QSlider(Qt.Orientation.Horizontal)
+        self.opacity_slider.setRange(0, 100)
+        self.opacity_slider.setValue(65)
+        self.opacity_slider.valueChanged.connect(self.update_opacity)
+
         # Output name
         self.output_input = QLineEdit()
         self.output_input.setPlaceholderText("previews/<effect>_preview.mp4 (optioneel)")
@@ -106,6 +91,11 @@ class PreviewMP4GUI(QWidget):
         self.preview.setStyleSheet("border: 1px solid black;")
         self.update_preview(self.effect_dropdown.currentText())
 
+        # Live preview: audio + effect in real time, zonder mp4 te renderen
+        self.live = LivePreview()
+        self.live.set_effect(self.effect_dropdown.currentText())
+        self.live.message_signal.connect(lambda msg: self.console.append(msg))
+
         # Layout
         layout.addWidget(self.effect_label)
         layout.addWidget(self.effect_dropdown)
@@ -113,6 +103,15 @@ class PreviewMP4GUI(QWidget):
         layout.addWidget(self.color_button)
         layout.addWidget(self.bg_btn)
         layout.addWidget(self.transparent_checkbox)
+        strength_layout = QHBoxLayout()
+        strength_layout.addWidget(self.strength_label)
+        strength_layout.addWidget(self.strength_slider)
+        layout.addLayout(strength_layout)
+        opacity_layout = QHBoxLayout()
+        opacity_layout.addWidget(self.opacity_label)
+        opacity_layout.addWidget(self.opacity_slider)
+        layout.addLayout(opacity_layout)
+        layout.addWidget(self.live)
         layout.addWidget(QLabel("💾 Bestandsnaam (optioneel):"))
         layout.addWidget(self.output_input)
         layout.addWidget(self.run_button)
@@ -128,18 +127,31 @@ class PreviewMP4GUI(QWidget):
         if file:
             self.audio_path = file
             self.audio_button.setText(f"🎵 {os.path.basename(file)}")
+            self.live.set_audio(file)
 
     def pick_color(self):
         color = QColorDialog.getColor()
         if color.isValid():
             self.color = color.name()
             self.color_button.setStyleSheet(f"background-color: {self.color};")
+            self.live.set_param("color", self.color)
 
     def choose_bg_color(self):
         color = QColorDialog.getColor()
         if color.isValid():
             self.bg_color = color.name()
             self.bg_btn.setStyleSheet(f"background-color: {self.bg_color};")
+            self.live.set_param("bg_color", self.bg_color)
+
+    def update_strength(self, value):
+        self.strength = value / 100.0
+        self.strength_label.setText(f"Effect sterkte: {self.strength:.2f}")
+        self.live.set_param("strength", self.strength)
+
+    def update_opacity(self, value):
+        self.opacity = value / 100.0
+        self.opacity_label.setText(f"Opacity: {self.opacity:.2f}")
+        self.live.set_param("opacity", self.opacity)
 
     def toggle_transparent_bg(self):
         self.transparent_bg = not self.transparent_bg
@@ -152,6 +164,7 @@ class PreviewMP4GUI(QWidget):
             self.bg_color = "#000000"
             self.bg_btn.setEnabled(True)
             self.bg_btn.setStyleSheet(f"background-color: {self.bg_color};")
+        self.live.set_param("bg_color", self.bg_color)
 
     def run_preview(self):
         if not self.audio_path:
@@ -160,20 +173,22 @@ class PreviewMP4GUI(QWidget):
         effect = self.effect_dropdown.currentText()
         color = self.color
         bg_color = self.bg_color if not self.transparent_bg else "transparent"
-        output_name = self.output_input.text().strip()
-        cmd = [
-            sys.executable, "preview_mp4.py", self.audio_path, effect,
-            "--color", color,
-            "--background", bg_color
-        ]
-        if self.transparent_bg:
-            cmd.append("--transparent")
-        if output_name:
-            cmd.extend(["--output", output_name])
-        self.console.setPlainText(f"▶️ Running: {' '.join(cmd)}")
+        # De worker heeft een eigen werkmap: paden absoluut meegeven
+        output_name = os.path.abspath(self.output_input.text().strip() or f"previews/{effect}_preview.mp4")
+        args = {
+            "audio": self.audio_path,
+            "effect": effect,
+            "color": color,
+            "background": bg_color,
+            "transparent": self.transparent_bg,
+            "output": output_name,
+            "strength": self.strength,
+            "opacity": self.opacity,
+        }
+        self.console.setPlainText(f"▶️ Preview job: {effect} → {output_name}")
         self.log.setText("")
         self.run_button.setEnabled(False)
-        self.preview_thread = PreviewThread(cmd, output_name or f"previews/{effect}_preview.mp4")
+        self.preview_thread = PreviewThread("preview", args, output_name)
         self.preview_thread.log_signal.connect(lambda msg: self.console.append(msg))
         self.preview_thread.progress_signal.connect(self.update_progress)
         self.preview_thread.max_progress_signal.connect(self.set_progress_max)
@@ -185,8 +200,10 @@ class PreviewMP4GUI(QWidget):
         self.preview_thread.start()
 
     def update_preview(self, effect_name):
-        gif_path = f"previews1/{effect_name}.gif"
-        if os.path.exists(gif_path):
+        if hasattr(self, "live"):
+            self.live.set_effect(effect_name)
+        gif_path = registry.preview_asset(effect_name)
+        if gif_path:
             movie = QMovie(gif_path)
             movie.setScaledSize(self.preview.size())
             self.preview.setMovie(movie)
@@ -4,38 +4,12 @@ from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QComboBox, QColorDialog, QLineEdit, QTextEdit, QSlider, QHBoxLayout
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-import subprocess
-import glob
-import re
 from PyQt6.QtGui import QPixmap, QMovie
+from gui.worker_thread import WorkerJobThread
+from engine import registry
 
-class VideoEffectThread(QThread):
-    log_signal = pyqtSignal(str)
-    done_signal = pyqtSignal(bool, str)
-    progress_signal = pyqtSignal(int)
-    max_progress_signal = pyqtSignal(int)
-
-    def __init__(self, cmd, output_name):
-        super().__init__()
-        self.cmd = cmd
-        self.output_name = output_name
-
-    def run(self):
-        try:
-            with subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
-                for line in proc.stdout:
-                    self.log_signal.emit(line.rstrip())
-                    m = re.search(r"Frame (\d+)/(\d+)", line)
-                    if m:
-                        self.progress_signal.emit(int(m.group(1)))
-                        self.max_progress_signal.emit(int(m.group(2)))
-                proc.wait()
-                if proc.returncode == 0:
-                    self.done_signal.emit(True, os.path.abspath(self.output_name))
-                else:
-                    self.done_signal.emit(False, "❌ Geen output bestand")
-        except Exception as e:
-            self.done_signal.emit(False, f"❌ Error: {e}")
+class VideoEffectThread(WorkerJobThread):
+    pass
 
 class VideoEffectGUI(QWidget):
     thread_created = pyqtSignal(QThread)
@@ -61,11 +35,7 @@ class VideoEffectGUI(QWidget):
         self.effect_label = QLabel("🎨 Effect:")
         self.effect_dropdown = QComboBox()
         # Filter photo_spectrogram uit de lijst
-        available_effects = sorted([
-            os.path.splitext(os.path.basename(f))[0]
-            for f in glob.glob("effects/*.py")
-            if not f.endswith("__init__.py") and os.path.splitext(os.path.basename(f))[0] != "photo_spectrogram"
-        ])
+        available_effects = registry.available_effects(exclude=("photo_spectrogram",))
         self.effect_dropdown.addItems(available_effects)
         self.effect_dropdown.currentTextChanged.connect(self.update_preview)
         layout.addWidget(self.effect_label)
@@ -107,6 +77,12 @@ class VideoEffectGUI(QWidget):
         slider_layout.addWidget(self.strength_slider)
         layout.addLayout(slider_layout)
 
+        # Draft: snelle kijkversie op halve resolutie en framerate
+        self.draft_btn = QPushButton("Draft kwaliteit uit")
+        self.draft_btn.setCheckable(True)
+        self.draft_btn.toggled.connect(lambda on: self.draft_btn.setText(f"Draft kwaliteit {'aan' if on else 'uit'}"))
+        layout.addWidget(self.draft_btn)
+
         # Start knop
         self.run_btn = QPushButton("▶️ Genereer Video met Effect")
         self.run_btn.clicked.connect(self.run_effect)
@@ -163,19 +139,23 @@ class VideoEffectGUI(QWidget):
         if not os.path.dirname(output_name):
             output_name = os.path.join("output", output_name)
         os.makedirs(os.path.dirname(output_name), exist_ok=True)
-        cmd = [
-            sys.executable, "main.py", self.video_path,
-            "--effects", effect,
-            "--color", color,
-            "--output", output_name,
-            "--strength", str(self.strength)
-        ]
+        # De worker heeft een eigen werkmap: paden absoluut meegeven
+        output_name = os.path.abspath(output_name)
+        args = {
+            "input_video": self.video_path,
+            "effects": [effect],
+            "color": color,
+            "output": output_name,
+            "strength": self.strength,
+            "segment_workers": 0,  # segmenten parallel over alle cores
+            "quality": "draft" if self.draft_btn.isChecked() else "final",
+        }
         if self.audio_path:
-            cmd.extend(["--audio", self.audio_path])
-        self.console.setPlainText(f"▶️ Running: {' '.join(cmd)}")
+            args["audio_override"] = self.audio_path
+        self.console.setPlainText(f"▶️ Render job: {effect} → {output_name}")
         self.log.setText("")
         self.run_btn.setEnabled(False)
-        self.thread = VideoEffectThread(cmd, output_name)
+        self.thread = VideoEffectThread("render", args, output_name)
         self.thread.log_signal.connect(lambda msg: self.console.append(msg))
         self.thread.progress_signal.connect(self.update_progress)
         self.thread.max_progress_signal.connect(self.set_progress_max)
@@ -195,8 +175,8 @@ class VideoEffectGUI(QWidget):
         pass
 
     def update_preview(self, effect_name):
-        gif_path = f"previews1/{effect_name}.gif"
-        if os.path.exists(gif_path):
+        gif_path = registry.preview_asset(effect_name)
+        if gif_path:
             movie = QMovie(gif_path)
             movie.setScaledSize(self.preview.size())
             self.preview.setMovie(movie)
@@ -0,0 +1,51 @@
+import os
+from PyQt6.QtCore import QThread, pyqtSignal
+from engine import worker as render_worker
+from engine.events import describe
+
+class WorkerJobThread(QThread):
+    # Eén job naar de persistente render worker sturen; log, voortgang en status komen
+    # als berichten terug en gaan als signals naar de GUI
+    log_signal = pyqtSignal(str)
+    done_signal = pyqtSignal(bool, str)
+    progress_signal = pyqtSignal(int)
+    max_progress_signal = pyqtSignal(int)
+    status_signal = pyqtSignal(str)
+
+    def __init__(self, kind, args, output_name):
+        super().__init__()
+        self.kind = kind
+        self.args = args
+        self.output_name = output_name
+        self.job_id = None
+
+    def cancel(self):
+        # Netjes stoppen via de worker; afgeronde segmenten blijven bewaard voor een herstart
+        if self.job_id is not None:
+            return render_worker.cancel(self.job_id)
+        return False
+
+    def run(self):
+        try:
+            for msg in render_worker.submit(self.kind, **self.args):
+                kind = msg.get("type")
+                if kind == "queued":
+                    self.job_id = msg.get("job")
+                    if msg["position"] > 0:
+                        self.log_signal.emit(f"⏳ In wachtrij (positie {msg['position']})")
+                elif kind == "log":
+                    self.log_signal.emit(msg["line"])
+                elif kind == "event":
+                    event = msg["event"]
+                    if event["event"] == "progress":
+                        self.max_progress_signal.emit(event["total"])
+                        self.progress_signal.emit(event["frame"])
+                    if event["event"] in ("progress", "stage_start"):
+                        self.status_signal.emit(describe(event))
+                elif kind == "done":
+                    if msg["ok"]:
+                        self.done_signal.emit(True, os.path.abspath(msg["output"] or self.output_name))
+                    else:
+                        self.done_signal.emit(False, f"❌ Error: {msg['error']}")
+        except Exception as e:
+            self.done_signal.emit(False, f"❌ Error: {e}")
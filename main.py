@@ -63,6 +63,8 @@ class SupervisualMegaTool(QTabWidget):
             tab.thread.progress_signal.connect(self.update_progress)
         if hasattr(tab, 'thread') and hasattr(tab.thread, 'max_progress_signal'):
             tab.thread.max_progress_signal.connect(self.set_progress_max)
+        if hasattr(tab, 'thread') and hasattr(tab.thread, 'status_signal'):
+            tab.thread.status_signal.connect(self.set_progress_status)
 
     def _connect_thread_signals(self, thread):
         # Only connect progress for concat_tab (no log)
@@ -70,6 +72,10 @@ class SupervisualMegaTool(QTabWidget):
             thread.progress_signal.connect(self.update_progress)
         if hasattr(thread, 'max_progress_signal'):
             thread.max_progress_signal.connect(self.set_progress_max)
+        # Stage, fps en ETA uit de engine-events in de balk tonen
+        self.progress_bar.setFormat("%p%")
+        if hasattr(thread, 'status_signal'):
+            thread.status_signal.connect(self.set_progress_status)
         # For other tabs, also connect log_signal
         if hasattr(thread, 'log_signal') and not isinstance(thread, type(self.concat_tab)):
             thread.log_signal.connect(self.append_log)
@@ -77,6 +83,9 @@ class SupervisualMegaTool(QTabWidget):
     def set_progress_max(self, value):
         self.progress_bar.setMaximum(value)
 
+    def set_progress_status(self, text):
+        self.progress_bar.setFormat(f"%p% — {text}")
+
     def append_log(self, msg):
         self.log_text.append(msg)
         self.log_text.verticalScrollBar().setValue(self.log_text.verticalScrollBar().maximum())
@@ -1,18 +1,142 @@
 import sys
 import os
+import time
+import threading
+from collections import OrderedDict
 import numpy as np
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QSlider, QHBoxLayout, QTextEdit
+    QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QSlider, QHBoxLayout, QTextEdit, QComboBox
 )
 from PyQt6.QtGui import QPixmap, QImage
-from PyQt6.QtCore import Qt
-import librosa
-from PIL import Image
-import cv2
-import matplotlib.pyplot as plt
-import io
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from engine import pcm_cache
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from effects.photo_spectrogram import render as photo_warp_render
+from engine.warp import MODES as WARP_MODES
+
+STEPS_PER_SECOND = 15   # tijdslider in stappen van één chunk (1/15e seconde)
+DEBOUNCE_MS = 40        # pas renderen als de slider zo lang stilstaat
+CACHE_SIZE = 96         # gerenderde previews (LRU)
+PREFETCH = 4            # buren aan elke kant die vooruit gerenderd worden
+
+class PreviewWorker(QThread):
+    # Rendert previews buiten de GUI-thread op één hergebruikt Agg canvas.
+    # Verzoeken worden samengevoegd (alleen het laatste telt) en gedebounced;
+    # als er niets te doen is worden naburige tijdstippen alvast gerenderd.
+    rendered_signal = pyqtSignal(float, float, QImage)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.cond = threading.Condition()
+        self.running = True
+        self.source = None      # (y, sr, img_path, warp_mode)
+        self.pending = None     # (t, strength)
+        self.requested_at = 0.0
+        self.prefetch = []
+        self.last_strength = 0.5
+        self.cache = OrderedDict()
+        self.max_t = 0.0
+
+    @staticmethod
+    def key(t, strength):
+        return round(t, 3), round(strength, 2)
+
+    def set_source(self, y, sr, img_path, warp_mode="horizontal"):
+        # Andere bron of warp mode: gecachete previews gelden niet meer
+        with self.cond:
+            self.source = (y, sr, img_path, warp_mode)
+            self.max_t = len(y) / sr if y is not None else 0.0
+            self.cache.clear()
+            self.prefetch = []
+
+    def cached(self, t, strength):
+        with self.cond:
+            img = self.cache.get(self.key(t, strength))
+            if img is not None:
+                self.cache.move_to_end(self.key(t, strength))
+            return img
+
+    def request(self, t, strength):
+        with self.cond:
+            self.pending = (t, strength)
+            self.requested_at = time.monotonic()
+            self.prefetch = []
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.wait()
+
+    def _next_job(self):
+        # (t, strength, emit) of None als de worker moet stoppen
+        with self.cond:
+            while self.running and self.pending is None and not self.prefetch:
+                self.cond.wait()
+            while self.running and self.pending is not None:
+                remaining = DEBOUNCE_MS / 1000 - (time.monotonic() - self.requested_at)
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if not self.running:
+                return None
+            if self.pending is not None:
+                t, strength = self.pending
+                self.pending = None
+                step = 1 / STEPS_PER_SECOND
+                around = [t + sign * i * step for i in range(1, PREFETCH + 1) for sign in (1, -1)]
+                self.prefetch = [n for n in around if 0 <= n < self.max_t]
+                return t, strength, True
+            t = self.prefetch.pop(0)
+            return t, self.last_strength, False
+
+    def run(self):
+        fig = Figure(figsize=(4, 3), dpi=100)
+        FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            t, strength, emit = job
+            self.last_strength = strength
+            img = self.cached(t, strength)
+            if img is None:
+                with self.cond:
+                    source = self.source
+                if source is None or source[0] is None:
+                    continue
+                try:
+                    img = self._render(fig, ax, source, t, strength)
+                except Exception as e:
+                    if emit:
+                        self.error_signal.emit(f"Preview fout: {e}")
+                    continue
+                with self.cond:
+                    if self.source is source:
+                        self.cache[self.key(t, strength)] = img
+                        while len(self.cache) > CACHE_SIZE:
+                            self.cache.popitem(last=False)
+            if emit:
+                self.rendered_signal.emit(t, strength, img)
+
+    def _render(self, fig, ax, source, t, strength):
+        y, sr, img_path, warp_mode = source
+        start = int(t * sr)
+        chunk = y[start:start + sr // 15]  # ca. 1/15e seconde
+        ax.clear()
+        ax.axis('off')
+        photo_warp_render(ax, chunk, opacity=1.0, color="#FFFFFF", image_path=img_path, strength=strength,
+                          warp_mode=warp_mode)
+        fig.canvas.draw()
+        # Agg RGBA buffer direct als QImage (kopie, de buffer wordt hergebruikt)
+        buf = np.asarray(fig.canvas.buffer_rgba())
+        h, w = buf.shape[:2]
+        return QImage(buf.data, w, h, buf.strides[0], QImage.Format.Format_RGBA8888).copy()
 
 class PhotoWarpPlayground(QWidget):
     def __init__(self):
@@ -39,6 +163,8 @@ class PhotoWarpPlayground(QWidget):
         self.time_slider.setMaximum(100)
         self.time_slider.setValue(0)
         self.time_slider.valueChanged.connect(self.update_preview)
+        self.time_slider.setSingleStep(1)
+        self.time_slider.setPageStep(STEPS_PER_SECOND)
         self.time_label = QLabel("Tijd: 0.00s")
         time_layout = QHBoxLayout()
         time_layout.addWidget(self.time_label)
@@ -58,6 +184,13 @@ class PhotoWarpPlayground(QWidget):
         strength_layout.addWidget(self.strength_slider)
         layout.addLayout(strength_layout)
 
+        # Warp mode
+        self.warp_mode = "horizontal"
+        self.warp_combo = QComboBox()
+        self.warp_combo.addItems(WARP_MODES)
+        self.warp_combo.currentTextChanged.connect(self.update_warp_mode)
+        layout.addWidget(self.warp_combo)
+
         # Preview
         self.preview = QLabel()
         self.preview.setFixedSize(400, 300)
@@ -81,11 +214,17 @@ class PhotoWarpPlayground(QWidget):
         self.sr = None
         self.last_img = None
 
+        self.worker = PreviewWorker()
+        self.worker.rendered_signal.connect(self.show_preview)
+        self.worker.error_signal.connect(self.show_error)
+        self.worker.start()
+
     def choose_img(self):
         file, _ = QFileDialog.getOpenFileName(self, "Kies foto", "", "Afbeeldingen (*.jpg *.jpeg *.png *.bmp)")
         if file:
             self.img_path = file
             self.img_btn.setText(f"🖼️ {os.path.basename(file)}")
+            self.worker.set_source(self.y, self.sr, self.img_path, self.warp_mode)
             self.update_preview()
 
     def choose_audio(self):
@@ -98,46 +237,59 @@ class PhotoWarpPlayground(QWidget):
 
     def load_audio(self):
         try:
-            self.y, self.sr = librosa.load(self.audio_path, sr=44100)
-            self.time_slider.setMaximum(max(0, len(self.y) // self.sr - 1))
+            self.sr = 44100
+            self.y = pcm_cache.load(self.audio_path, self.sr)
+            self.time_slider.setMaximum(max(0, len(self.y) * STEPS_PER_SECOND // self.sr - 1))
         except Exception as e:
             self.console.setPlainText(f"Audio laden mislukt: {e}")
             self.y = None
             self.sr = None
+        self.worker.set_source(self.y, self.sr, self.img_path, self.warp_mode)
+
+    def update_warp_mode(self, mode):
+        self.warp_mode = mode
+        self.worker.set_source(self.y, self.sr, self.img_path, self.warp_mode)
+        self.update_preview()
 
     def update_strength(self, value):
         self.strength = value / 100.0
         self.strength_label.setText(f"Effect sterkte: {self.strength:.2f}")
         self.update_preview()
 
+    def current(self):
+        return self.time_slider.value() / STEPS_PER_SECOND, self.strength
+
     def update_preview(self):
         if not self.img_path or self.y is None or self.sr is None:
             self.preview.clear()
             self.save_btn.setEnabled(False)
             return
-        t = self.time_slider.value()
+        t, strength = self.current()
         self.time_label.setText(f"Tijd: {t:.2f}s")
-        start = t * self.sr
-        chunk = self.y[int(start):int(start)+self.sr//15]  # ca. 1/15e seconde
-        # Render met photo_warp_render
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
-        ax.axis('off')
-        try:
-            photo_warp_render(ax, chunk, opacity=1.0, color="#FFFFFF", image_path=self.img_path, strength=self.strength)
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0)
-            plt.close(fig)
-            buf.seek(0)
-            img = Image.open(buf)
-            qimg = QImage(img.tobytes(), img.width, img.height, QImage.Format.Format_RGBA8888)
-            pixmap = QPixmap.fromImage(qimg).scaled(400, 300, Qt.AspectRatioMode.KeepAspectRatio)
-            self.preview.setPixmap(pixmap)
-            self.last_img = img
-            self.save_btn.setEnabled(True)
-        except Exception as e:
-            self.console.setPlainText(f"Preview fout: {e}")
-            self.preview.clear()
-            self.save_btn.setEnabled(False)
+        # Uit de cache direct tonen, anders naar de worker (die samenvoegt en debouncet)
+        img = self.worker.cached(t, strength)
+        if img is not None:
+            self.show_preview(t, strength, img)
+        else:
+            self.worker.request(t, strength)
+
+    def show_preview(self, t, strength, img):
+        # Verouderde resultaten (slider is al verder) niet tonen; ze staan wel in de cache
+        if PreviewWorker.key(t, strength) != PreviewWorker.key(*self.current()):
+            return
+        pixmap = QPixmap.fromImage(img).scaled(400, 300, Qt.AspectRatioMode.KeepAspectRatio)
+        self.preview.setPixmap(pixmap)
+        self.last_img = img
+        self.save_btn.setEnabled(True)
+
+    def show_error(self, msg):
+        self.console.setPlainText(msg)
+        self.preview.clear()
+        self.save_btn.setEnabled(False)
+
+    def closeEvent(self, event):
+        self.worker.stop()
+        super().closeEvent(event)
 
     def save_image(self):
         if self.last_img is not None:
@@ -2,11 +2,11 @@ import sys
 import os
 import numpy as np
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QSlider, QHBoxLayout, QTextEdit, QLineEdit
+    QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QSlider, QHBoxLayout, QTextEdit, QLineEdit, QComboBox
 )
 from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtCore import Qt
-import librosa
+from engine import pcm_cache
 from PIL import Image
 import cv2
 import matplotlib.pyplot as plt
@@ -14,6 +14,7 @@ import io
 import tempfile
 import subprocess
 from effects.photo_spectrogram import render as photo_warp_render
+from engine.warp import MODES as WARP_MODES
 
 class PhotoWarpPreviewMovie(QWidget):
     def __init__(self):
@@ -60,6 +61,13 @@ class PhotoWarpPreviewMovie(QWidget):
         opacity_layout.addWidget(self.opacity_slider)
         layout.addLayout(opacity_layout)
 
+        # Warp mode
+        self.warp_mode = "horizontal"
+        self.warp_combo = QComboBox()
+        self.warp_combo.addItems(WARP_MODES)
+        self.warp_combo.currentTextChanged.connect(self.update_warp_mode)
+        layout.addWidget(self.warp_combo)
+
         # Preview
         self.preview = QLabel()
         self.preview.setFixedSize(400, 300)
@@ -104,7 +112,8 @@ class PhotoWarpPreviewMovie(QWidget):
 
     def load_audio(self):
         try:
-            self.y, self.sr = librosa.load(self.audio_path, sr=44100)
+            self.sr = 44100
+            self.y = pcm_cache.load(self.audio_path, self.sr)
         except Exception as e:
             self.console.setPlainText(f"Audio laden mislukt: {e}")
             self.y = None
@@ -115,6 +124,10 @@ class PhotoWarpPreviewMovie(QWidget):
         self.strength_label.setText(f"Effect sterkte: {self.strength:.2f}")
         self.update_preview()
 
+    def update_warp_mode(self, mode):
+        self.warp_mode = mode
+        self.update_preview()
+
     def update_opacity(self, value):
         self.opacity = value / 100.0
         self.opacity_label.setText(f"Opacity: {self.opacity:.2f}")
@@ -130,7 +143,8 @@ class PhotoWarpPreviewMovie(QWidget):
         fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
         ax.axis('off')
         try:
-            photo_warp_render(ax, chunk, opacity=self.opacity, color="#FFFFFF", image_path=self.img_path, strength=self.strength)
+            photo_warp_render(ax, chunk, opacity=self.opacity, color="#FFFFFF", image_path=self.img_path, strength=self.strength,
+                              warp_mode=self.warp_mode)
             buf = io.BytesIO()
             plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0)
             plt.close(fig)
@@ -160,7 +174,8 @@ class PhotoWarpPreviewMovie(QWidget):
                 fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
                 ax.axis('off')
                 try:
-                    photo_warp_render(ax, chunk, opacity=self.opacity, color="#FFFFFF", image_path=self.img_path, strength=self.strength)
+                    photo_warp_render(ax, chunk, opacity=self.opacity, color="#FFFFFF", image_path=self.img_path, strength=self.strength,
+                                      warp_mode=self.warp_mode)
                     frame_path = os.path.join(tmpdir, f"frame_{i:05d}.png")
                     plt.savefig(frame_path, format='png', bbox_inches='tight', pad_inches=0)
                     plt.close(fig)
@@ -1,14 +1,14 @@
 import os
 import sys
-import librosa
 import numpy as np
 import matplotlib.pyplot as plt
-from effects import lissajous, waveform_rings, oscilloscope, fractal_flames, spectrogram, pulse_flashes, ascii, matrix_rain, rotating_shapes
+from engine import registry, pcm_cache
 from PIL import Image
 import subprocess
 
 def render_preview(effect_func, audio_path, out_gif, duration=2.0, fps=15, color="#FFFFFF", bg_color="transparent"):
-    y, sr = librosa.load(audio_path, sr=44100)
+    sr = 44100
+    y = pcm_cache.load(audio_path, sr)
     samples_per_frame = int(sr / fps)
     total_frames = int(duration * fps)
     y = y[:total_frames * samples_per_frame]
@@ -52,21 +52,11 @@ def main():
     parser.add_argument("--bg", default="transparent", help="Background color or 'transparent'")
     args = parser.parse_args()
 
-    effect_map = {
-        "lissajous": lissajous.render,
-        "waveform_rings": waveform_rings.render,
-        "oscilloscope": oscilloscope.render,
-        "fractal_flames": fractal_flames.render,
-        "spectrogram": spectrogram.render,
-        "pulse_flashes": pulse_flashes.render,
-        "ascii": ascii.render,
-        "matrix_rain": matrix_rain.render,
-        "rotating_shapes": rotating_shapes.render,
-    }
-    if args.effect not in effect_map:
+    if args.effect not in registry.available_effects():
         print(f"Effect '{args.effect}' not found.")
         sys.exit(1)
-    render_preview(effect_map[args.effect], args.audio, args.output, args.duration, args.fps, args.color, args.bg)
+    effect_func = registry.load(args.effect).render
+    render_preview(effect_func, args.audio, args.output, args.duration, args.fps, args.color, args.bg)
     print(f"GIF saved to {args.output}")
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ import argparse
 import subprocess
 import tempfile
 from engine import render_effect_preview
+from engine.events import EventReporter, fd_sink, run_ffmpeg
 
 # --- CONFIG ---
 PREVIEW_DURATION = 5  # seconds
@@ -14,35 +15,34 @@ DEFAULT_BG = "#000000"
 PREVIEW_DIR = "previews"
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate a short MP4 preview of an effect with audio.")
-    parser.add_argument("audio", help="Path to audio file (.mp3 or .wav)")
-    parser.add_argument("effect", help="Effect name (matches effects/*.py)")
-    parser.add_argument("--color", default=DEFAULT_COLOR, help="Effect color (hex)")
-    parser.add_argument("--background", default=DEFAULT_BG, help="Background color (hex or 'transparent')")
-    parser.add_argument("--output", default=None, help="Output mp4 path (default: previews/<effect>_preview.mp4)")
-    parser.add_argument("--transparent", action="store_true", help="Use transparent background")
-    parser.add_argument("--image", default=None, help="Path to image for photo-based effects (optional)")
-    parser.add_argument("--strength", type=float, default=0.5, help="Effect strength (0.0 - 1.0)")
-    args = parser.parse_args()
-
+def make_preview(audio, effect, output=None, color=DEFAULT_COLOR, background=DEFAULT_BG, transparent=False,
+                 image=None, strength=0.5, workers=1, chunk_size=8, backend="matplotlib", debug_frames=None,
+                 events=None, vfr=False, opacity=OPACITY, quality="final", warp_mode="horizontal"):
     os.makedirs(PREVIEW_DIR, exist_ok=True)
-    outname = args.output or os.path.join(PREVIEW_DIR, f"{args.effect}_preview.mp4")
+    outname = output or os.path.join(PREVIEW_DIR, f"{effect}_preview.mp4")
 
     # Render effect frames to temp video (no audio)
     with tempfile.TemporaryDirectory() as tmpdir:
         video_path = os.path.join(tmpdir, "preview.mp4")
         render_effect_preview(
-            audio_path=args.audio,
-            effect=args.effect,
+            audio_path=audio,
+            effect=effect,
             output_path=video_path,
             fps=FPS,
-            opacity=OPACITY,
-            color=args.color,
-            background="transparent" if args.transparent else args.background,
+            opacity=opacity,
+            color=color,
+            background="transparent" if transparent else background,
             duration=PREVIEW_DURATION,
-            image=args.image,
-            strength=args.strength
+            image=image,
+            strength=strength,
+            debug_frame_dir=debug_frames,
+            workers=workers,
+            chunk_size=chunk_size,
+            backend=backend,
+            events=events,
+            vfr=vfr,
+            quality=quality,
+            warp_mode=warp_mode
         )
 
         # Use ffmpeg to trim audio and mux with video
@@ -50,14 +50,44 @@ def main():
             "ffmpeg", "-y",
             "-i", video_path,
             "-ss", "0", "-t", str(PREVIEW_DURATION),
-            "-i", args.audio,
+            "-i", audio,
             "-map", "0:v:0", "-map", "1:a:0",
             "-c:v", "copy", "-c:a", "aac", "-shortest",
             outname
         ]
         print("Running:", " ".join(cmd))
-        subprocess.run(cmd, check=True)
+        returncode = run_ffmpeg(cmd, EventReporter(events, log=False), "mux", PREVIEW_DURATION * FPS, FPS)
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
         print(f"✅ Preview saved: {outname}")
+    return outname
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a short MP4 preview of an effect with audio.")
+    parser.add_argument("audio", help="Path to audio file (.mp3 or .wav)")
+    parser.add_argument("effect", help="Effect name (matches effects/*.py)")
+    parser.add_argument("--color", default=DEFAULT_COLOR, help="Effect color (hex)")
+    parser.add_argument("--background", default=DEFAULT_BG, help="Background color (hex or 'transparent')")
+    parser.add_argument("--output", default=None, help="Output mp4 path (default: previews/<effect>_preview.mp4)")
+    parser.add_argument("--transparent", action="store_true", help="Use transparent background")
+    parser.add_argument("--image", default=None, help="Path to image for photo-based effects (optional)")
+    parser.add_argument("--opacity", type=float, default=OPACITY, help="Effect opacity (0.0 - 1.0)")
+    parser.add_argument("--strength", type=float, default=0.5, help="Effect strength (0.0 - 1.0)")
+    parser.add_argument("--workers", type=int, default=1, help="Render processes (0 = all cores)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Frames per worker task")
+    parser.add_argument("--backend", default="matplotlib", choices=["matplotlib", "raster"], help="Drawing backend")
+    parser.add_argument("--vfr", action="store_true", help="Drop repeated frames and write variable frame-rate timestamps")
+    parser.add_argument("--debug-frames", default=None, help="Also write every frame as PNG to this folder (debug)")
+    parser.add_argument("--warp-mode", default="horizontal", choices=["horizontal", "vertical", "radial", "swirl"], help="Photo warp for photo-based effects")
+    parser.add_argument("--draft", action="store_true", help="Draft quality: half resolution and frame rate, less effect detail")
+    parser.add_argument("--events-fd", type=int, default=None, help="Write JSON-lines progress/timing events to this file descriptor")
+    args = parser.parse_args()
+
+    make_preview(args.audio, args.effect, output=args.output, color=args.color, background=args.background,
+                 transparent=args.transparent, image=args.image, strength=args.strength, workers=args.workers,
+                 chunk_size=args.chunk_size, backend=args.backend, debug_frames=args.debug_frames,
+                 vfr=args.vfr, opacity=args.opacity, quality="draft" if args.draft else "final", warp_mode=args.warp_mode, events=fd_sink(args.events_fd) if args.events_fd is not None else None)
 
 if __name__ == "__main__":
     main()
@@ -1,56 +1,21 @@
 import os
 import sys
-import glob
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QPushButton, QVBoxLayout, QFileDialog,
     QLabel, QComboBox, QColorDialog, QHBoxLayout, QLineEdit, QTextEdit, QProgressBar
 )
 from PyQt6.QtGui import QPixmap, QColor
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-import subprocess
+from gui.worker_thread import WorkerJobThread
+from engine import registry
 
 
-def get_available_effects(effects_dir="effects"):
-    if not os.path.exists(effects_dir):
-        return []
-    return [
-        f.replace(".py", "")
-        for f in os.listdir(effects_dir)
-        if f.endswith(".py") and not f.startswith("__")
-    ]
+def get_available_effects():
+    return registry.available_effects()
 
 
-class RenderThread(QThread):
-    progress_signal = pyqtSignal(int)
-    max_progress_signal = pyqtSignal(int)
-    log_signal = pyqtSignal(str)
-    done_signal = pyqtSignal(bool, str)
-
-    def __init__(self, cmd, output_name):
-        super().__init__()
-        self.cmd = cmd
-        self.output_name = output_name
-
-    def run(self):
-        import re
-        try:
-            with subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
-                for line in proc.stdout:
-                    self.log_signal.emit(line.rstrip())
-                    if "Rendering" in line and "frames" in line:
-                        m = re.search(r"Rendering (\\d+) frames", line)
-                        if m:
-                            self.max_progress_signal.emit(int(m.group(1)))
-                    m = re.search(r"Frame (\\d+)/(\\d+)", line)
-                    if m:
-                        self.progress_signal.emit(int(m.group(1)))
-                proc.wait()
-                if proc.returncode == 0:
-                    self.done_signal.emit(True, os.path.abspath(self.output_name))
-                else:
-                    self.done_signal.emit(False, "❌ Geen output bestand")
-        except Exception as e:
-            self.done_signal.emit(False, f"❌ Error: {e}")
+class RenderThread(WorkerJobThread):
+    pass
 
 
 class VisualizerGUI(QWidget):
@@ -64,16 +29,7 @@ class VisualizerGUI(QWidget):
         # Effect selector
         self.effect_label = QLabel("🎨 Effect:")
         self.effect_dropdown = QComboBox()
-        available_effects = sorted([
-            os.path.splitext(os.path.basename(f))[0]
-            for f in glob.glob("effects/*.py")
-            if not f.endswith("__init__.py")
-        ])
-        available_previews = {
-            os.path.splitext(os.path.basename(f))[0]
-            for f in glob.glob("previews/*.gif")
-        }
-        effects_with_previews = [e for e in available_effects if e in available_previews]
+        available_effects = get_available_effects()
         self.effect_dropdown.addItems(available_effects)
         self.effect_dropdown.currentTextChanged.connect(self.update_preview)
 
@@ -102,6 +58,12 @@ class VisualizerGUI(QWidget):
         self.transparent_checkbox.clicked.connect(self.toggle_transparent_bg)
         layout.addWidget(self.transparent_checkbox)
 
+        # Draft: snelle kijkversie op halve resolutie en framerate
+        self.draft_btn = QPushButton("Draft kwaliteit uit")
+        self.draft_btn.setCheckable(True)
+        self.draft_btn.toggled.connect(lambda on: self.draft_btn.setText(f"Draft kwaliteit {'aan' if on else 'uit'}"))
+        layout.addWidget(self.draft_btn)
+
         # File chooser
         self.file_button = QPushButton("📂 Kies video")
         self.file_button.clicked.connect(self.choose_file)
@@ -155,8 +117,8 @@ class VisualizerGUI(QWidget):
         self.setLayout(layout)
 
     def update_preview(self, effect_name):
-        gif_path = f"previews1/{effect_name}.gif"
-        if os.path.exists(gif_path):
+        gif_path = registry.preview_asset(effect_name)
+        if gif_path:
             self.preview.setPixmap(QPixmap(gif_path).scaled(240, 135, Qt.AspectRatioMode.KeepAspectRatio))
         else:
             self.preview.clear()
@@ -201,29 +163,36 @@ class VisualizerGUI(QWidget):
         color = self.color
         bg_color = self.bg_color if not self.transparent_bg else "transparent"
         output_name = self.output_input.text().strip() or "output_supervisual.mp4"
-        cmd = [
-            sys.executable, "main.py", self.input_path,
-            "--effects", effect,
-            "--fps", str(fps),
-            "--opacity", str(opacity),
-            "--color", color,
-            "--output", output_name,
-            "--background", bg_color
-        ]
-        self.console.setPlainText(f"▶️ Running: {' '.join(cmd)}")
+        # Zelfde standaardmap als de engine, maar absoluut: de worker heeft een eigen werkmap
+        if not os.path.isabs(output_name):
+            output_name = os.path.join(os.getcwd(), "output", output_name)
+        args = {
+            "input_video": self.input_path,
+            "effects": [effect],
+            "fps": fps,
+            "opacity": opacity,
+            "color": color,
+            "output": output_name,
+            "bg_color": bg_color,
+            "segment_workers": 0,  # segmenten parallel over alle cores
+            "quality": "draft" if self.draft_btn.isChecked() else "final",
+        }
+        self.console.setPlainText(f"▶️ Render job: {effect} → {output_name}")
         self.progress.setValue(0)
         self.progress.setMaximum(100)
         self.log.setText("")
         self.run_button.setEnabled(False)
         self.cancel_button.setEnabled(True)
-        self.render_thread = RenderThread(cmd, output_name)
+        self.render_thread = RenderThread("render", args, output_name)
         self.render_thread.progress_signal.connect(self.progress.setValue)
         self.render_thread.max_progress_signal.connect(self.progress.setMaximum)
+        self.render_thread.status_signal.connect(lambda text: self.progress.setFormat(f"%p% — {text}"))
         self.render_thread.log_signal.connect(lambda msg: self.console.append(msg))
         def on_done(success, logmsg):
             self.log.setText(logmsg)
             self.run_button.setEnabled(True)
             self.cancel_button.setEnabled(False)
+            self.progress.setFormat("%p%")
             if success:
                 self.progress.setValue(self.progress.maximum())
             else:
@@ -233,11 +202,11 @@ class VisualizerGUI(QWidget):
 
     def cancel_render(self):
         if hasattr(self, 'render_thread') and self.render_thread.isRunning():
-            self.render_thread.terminate()
-            self.console.append("❌ Rendering gestopt door gebruiker.")
-            self.run_button.setEnabled(True)
-            self.cancel_button.setEnabled(False)
-            self.progress.setValue(0)
+            if self.render_thread.cancel():
+                self.console.append("❌ Rendering gestopt door gebruiker (klare segmenten worden bij een herstart hergebruikt).")
+                self.cancel_button.setEnabled(False)
+            else:
+                self.console.append("⚠️ Stoppen lukte niet: job niet gevonden bij de render worker.")
 
 
 if __name__ == "__main__":